@@ -8,6 +8,15 @@ from config.database import engine
 from src.models import Base
 from src.api.v1 import categories, products, auth, vender_auth, cart, addresses, orders, specifications, pricing, search, vendor_orders, vendor_products, vendor_analytics, payment
 from src.services.search import ElasticsearchService
+from src.search.indexer import index_queue
+from src.search.suggestions import suggestion_index
+from src.search.breaker import es_breaker
+from src.search.popularity import popularity_job
+from src.services.outbox import outbox_worker
+from src.services.vendor_stats import vendor_stats_job
+from src.services.cart_cache import cart_cache
+from config.settings import settings
+from config.elasticsearch import close_async_client
 import uvicorn
 import os
 import logging
@@ -81,6 +90,8 @@ def create_app() -> FastAPI:
     # Initialize Elasticsearch on startup
     @app.on_event("startup")
     async def startup_event():
+        # One bounded ping now; afterwards the breaker probes in the background
+        es_breaker.start()
         try:
             ElasticsearchService.initialize_index()
             logger.info("Elasticsearch initialized successfully")
@@ -89,6 +100,31 @@ def create_app() -> FastAPI:
             # Don't fail startup if Elasticsearch is not available
             logger.warning("Application starting without Elasticsearch search capabilities")
 
+        # Product changes are indexed in batches by a background worker
+        index_queue.start()
+
+        # Builds the autocomplete index/trie now and refreshes it periodically
+        suggestion_index.start()
+        popularity_job.start()
+
+        # Post-checkout side effects; may run as `python -m src.services.outbox` instead
+        if settings.outbox_worker_in_process:
+            outbox_worker.start()
+        # Nightly vendor rollup reconcile; may run from cron as `python -m src.services.vendor_stats`
+        if settings.vendor_stats_reconcile_in_process:
+            vendor_stats_job.start()
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        # Flush product changes that are still waiting to be indexed
+        index_queue.stop()
+        suggestion_index.stop()
+        popularity_job.stop()
+        outbox_worker.stop()
+        vendor_stats_job.stop()
+        es_breaker.stop()
+        await close_async_client()
+
     # Include API routers
     app.include_router(vender_auth.router, prefix="/api/vendor", tags=["vender_auth"])
     app.include_router(auth.router, prefix="/api/v1", tags=["auth"])
@@ -116,16 +152,15 @@ def create_app() -> FastAPI:
 
     @app.get("/health")
     async def health_check():
-        # Check Elasticsearch health
-        try:
-            from config.elasticsearch import es_client
-            es_health = es_client.ping()
-        except:
-            es_health = False
-
+        # Elasticsearch health comes from the circuit breaker; no ping here
+        breaker = es_breaker.metrics()
         return {
             "status": "healthy",
-            "elasticsearch": "connected" if es_health else "disconnected"
+            "elasticsearch": "connected" if breaker["state"] == "closed" else "disconnected",
+            "elasticsearch_breaker": breaker,
+            "outbox": outbox_worker.metrics(),
+            "vendor_stats": vendor_stats_job.metrics(),
+            "cart_cache": cart_cache.metrics()
         }
 
     return app
@@ -0,0 +1,210 @@
+"""Benchmark: parallel checkouts against a few hot products.
+
+Every worker thread repeatedly "checks out" a random cart of 1-3 products
+from a small hot set. Two stock paths are compared:
+
+  naive   the old create_order flow: read stock, check it, decrement,
+          commit once per line
+  locked  CheckoutService.reserve_stock: SELECT ... FOR UPDATE in product_id
+          order, check, one batched UPDATE plus ledger rows, one commit
+
+At the end the units sold (successful checkouts) are compared with the
+starting stock (oversold) and with the stock that actually came off
+(lost updates). Both must be 0 for the locked path; the exit code is 1 if
+they are not.
+
+Needs Postgres for real row locks. Tables are created in a throwaway schema
+that is dropped afterwards, so it can point at a development database:
+
+    python bench_checkout_concurrency.py                       # config/database.py URL
+    python bench_checkout_concurrency.py postgresql://u:p@localhost/shop --threads 64
+
+A sqlite:/// URL runs as a smoke test of the script only: SQLite ignores
+FOR UPDATE, so both paths race there and the numbers mean nothing.
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from src.models import Base, Category, Product
+from src.models.order import Order, OrderItem  # noqa: F401  (mapper registry)
+from src.services.checkout import CheckoutService, InsufficientStockError
+
+
+def make_engine(url, threads):
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 30})
+        Base.metadata.create_all(engine)
+        return engine, None
+
+    schema = f"bench_checkout_{uuid.uuid4().hex[:8]}"
+    engine = create_engine(url, pool_size=threads, max_overflow=0)
+
+    @event.listens_for(engine, "connect")
+    def set_search_path(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET search_path TO {schema}")
+        cursor.close()
+
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    engine.dispose()
+    # Full schema: the locked path also writes inventory_ledger and outbox_events
+    Base.metadata.create_all(engine)
+    return engine, schema
+
+
+def seed(Session, n_products, stock):
+    db = Session()
+    category = Category(name=f"Bench {uuid.uuid4().hex[:6]}")
+    db.add(category)
+    db.flush()
+    products = [
+        Product(
+            name=f"Hot product {i}",
+            category_id=category.category_id,
+            base_price=10000,
+            specifications={},
+            stock_quantity=stock,
+            sku=f"BENCH-{uuid.uuid4().hex[:10]}",
+            created_by="bench",
+            is_active=True,
+        )
+        for i in range(n_products)
+    ]
+    db.add_all(products)
+    db.commit()
+    ids = [p.product_id for p in products]
+    db.close()
+    return ids
+
+
+def total_stock(Session, ids):
+    db = Session()
+    try:
+        return {pid: stock for pid, stock in db.query(Product.product_id, Product.stock_quantity)
+                .filter(Product.product_id.in_(ids))}
+    finally:
+        db.close()
+
+
+def naive_checkout(db, quantities):
+    # The pre-CheckoutService flow: check from an unlocked read, then one
+    # read-decrement-commit per line in cart order.
+    products = {p.product_id: p for p in db.query(Product).filter(Product.product_id.in_(list(quantities)))}
+    for pid, qty in quantities.items():
+        if products[pid].stock_quantity < qty:
+            raise InsufficientStockError(pid, products[pid].name, products[pid].stock_quantity, qty)
+    for pid, qty in quantities.items():
+        product = db.query(Product).filter(Product.product_id == pid).first()
+        if product.stock_quantity >= qty:
+            product.stock_quantity -= qty
+            db.commit()
+        else:
+            raise InsufficientStockError(pid, product.name, product.stock_quantity, qty)
+
+
+def locked_checkout(db, quantities):
+    CheckoutService.reserve_stock(db, quantities)
+    db.commit()
+
+
+def run(Session, ids, mode, threads, attempts, max_qty):
+    checkout = locked_checkout if mode == "locked" else naive_checkout
+    sold = {pid: 0 for pid in ids}
+    stats = {"ok": 0, "out_of_stock": 0, "errors": 0}
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        for _ in range(attempts):
+            cart = {pid: rng.randint(1, max_qty) for pid in rng.sample(ids, rng.randint(1, min(3, len(ids))))}
+            db = Session()
+            started = time.perf_counter()
+            try:
+                checkout(db, cart)
+                outcome = "ok"
+            except InsufficientStockError:
+                db.rollback()
+                outcome = "out_of_stock"
+            except Exception:
+                db.rollback()
+                outcome = "errors"
+            finally:
+                db.close()
+            elapsed = time.perf_counter() - started
+            with lock:
+                stats[outcome] += 1
+                latencies.append(elapsed)
+                if outcome == "ok":
+                    for pid, qty in cart.items():
+                        sold[pid] += qty
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return sold, stats, sorted(latencies), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database_url", nargs="?", help="defaults to config/database.py")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--attempts", type=int, default=50, help="checkouts per thread")
+    parser.add_argument("--products", type=int, default=5, help="size of the hot product set")
+    parser.add_argument("--stock", type=int, default=500, help="starting stock per product")
+    parser.add_argument("--max-qty", type=int, default=3)
+    parser.add_argument("--modes", default="naive,locked")
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url is None:
+        from config.database import DATABASE_URL
+        url = DATABASE_URL
+
+    engine, schema = make_engine(url, args.threads)
+    Session = sessionmaker(bind=engine)
+    oversold_any = False
+    try:
+        print(f"{args.threads} threads x {args.attempts} checkouts, "
+              f"{args.products} hot products with {args.stock} units each")
+        for mode in args.modes.split(","):
+            ids = seed(Session, args.products, args.stock)
+            sold, stats, latencies, elapsed = run(Session, ids, mode, args.threads, args.attempts, args.max_qty)
+            remaining = total_stock(Session, ids)
+
+            # oversold: units confirmed to buyers beyond the starting stock.
+            # lost: confirmed units that never came off stock (lost updates).
+            oversold = sum(max(0, sold[pid] - args.stock) for pid in ids)
+            lost = sum(max(0, sold[pid] - (args.stock - remaining[pid])) for pid in ids)
+            oversold_any = oversold_any or (mode == "locked" and (oversold or lost))
+
+            total = sum(stats.values())
+            p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0
+            print(f"{mode:>7}: {total / elapsed:8.0f} checkouts/s  p50 {p50:6.1f} ms  p99 {p99:6.1f} ms  "
+                  f"ok {stats['ok']}  out-of-stock {stats['out_of_stock']}  errors {stats['errors']}  "
+                  f"units sold {sum(sold.values())}  oversold {oversold}  lost updates {lost}")
+    finally:
+        if schema:
+            engine.dispose()
+            with create_engine(url).begin() as conn:
+                conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    if url.startswith("sqlite"):
+        # FOR UPDATE is a no-op there, so both paths race; only Postgres counts.
+        print("(sqlite: smoke test only - no row locks, oversell numbers are meaningless)")
+        return 0
+    return 1 if oversold_any else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
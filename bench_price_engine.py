@@ -0,0 +1,72 @@
+"""Benchmark: pricing N products one at a time vs PriceEngine.price_many.
+
+The per-product path is the Decimal helper every module used to carry a copy
+of (CartService._get_product_price before src/services/price_engine.py); the
+batch path is `price_many`, integer paise over array columns. Products are
+transient rows, so no database is needed:
+
+    python bench_price_engine.py            # 100k products
+    python bench_price_engine.py 1000000
+"""
+import sys
+import time
+from decimal import Decimal
+
+from src.models import Product
+from src.models.order import Order, OrderItem  # noqa: F401  (mapper registry)
+from src.services.price_engine import NO_PRICE, PriceEngine
+
+
+def legacy_price(product):
+    if product.calculated_price is not None:
+        price = Decimal(str(product.calculated_price)) / Decimal('100')
+    elif product.base_price is not None:
+        price = Decimal(str(product.base_price)) / Decimal('100')
+    elif product.price is not None:
+        price = product.price
+    else:
+        raise ValueError(f"Product {product.product_id} has no price set")
+    pct = product.discount_percent or 0
+    if pct > 0:
+        price = (price * Decimal(100 - pct)) / Decimal(100)
+    return price
+
+
+def make_products(n_products):
+    return [
+        Product(
+            product_id=i,
+            base_price=10000 + i,
+            calculated_price=(9000 + i) if i % 3 else None,
+            discount_percent=i % 40,
+        )
+        for i in range(1, n_products + 1)
+    ]
+
+
+def measure(label, fn, n_products):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:>8.3f}s {elapsed / n_products * 1e9:>8.0f} ns/product")
+    return elapsed, result
+
+
+def main():
+    n_products = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    products = make_products(n_products)
+
+    print(f"Pricing {n_products} products\n")
+    legacy, legacy_prices = measure("per-product Decimal", lambda: [legacy_price(p) for p in products], n_products)
+    batch, unit_paise = measure("PriceEngine.price_many", lambda: PriceEngine.price_many(products), n_products)
+
+    # Same prices once the old path is rounded to the paisa like price_at_time is
+    mismatches = sum(
+        1 for old, new in zip(legacy_prices, unit_paise)
+        if new == NO_PRICE or PriceEngine.to_paise(old) != new
+    )
+    print(f"\nspeedup {legacy / batch:.1f}x, {mismatches} prices differ")
+
+
+if __name__ == "__main__":
+    main()
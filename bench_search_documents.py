@@ -0,0 +1,124 @@
+"""Benchmark: SQL statements needed to build search documents for N products.
+
+Compares the old per-product path (query the product, then lazy-load its
+category, subcategory and the subcategory's specification templates while
+building the document) with the shared batch builder in
+src/search/document_builder.py.
+
+Runs against an in-memory SQLite database seeded with synthetic rows, so it
+needs no Postgres or Elasticsearch:
+
+    python bench_search_documents.py            # 10k products
+    python bench_search_documents.py 50000
+"""
+import sys
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.models import Base, Category, Subcategory, Product
+from src.models.category import SpecificationTemplate
+from src.models.order import Order, OrderItem  # noqa: F401  (mapper registry)
+from src.search.document_builder import build_document, build_documents
+
+
+def seed(session, n_products, n_categories=20, subs_per_category=5):
+    categories = [Category(name=f"Category {c}") for c in range(n_categories)]
+    session.add_all(categories)
+    session.flush()
+    subcategories = [
+        Subcategory(category_id=cat.category_id, name=f"{cat.name} / Sub {s}")
+        for cat in categories for s in range(subs_per_category)
+    ]
+    session.add_all(subcategories)
+    session.flush()
+    session.add_all([
+        template
+        for sub in subcategories
+        for template in (
+            SpecificationTemplate(subcategory_id=sub.subcategory_id, spec_name="Brand", spec_type="select",
+                                  spec_options=[f"Brand {b}" for b in range(50)], display_order=1),
+            SpecificationTemplate(subcategory_id=sub.subcategory_id, spec_name="Weight", spec_type="number",
+                                  display_order=2),
+        )
+    ])
+    session.flush()
+    session.bulk_insert_mappings(Product, [
+        {
+            "product_id": i,
+            "name": f"Product {i}",
+            "description": f"Synthetic product number {i}",
+            "base_price": 10000 + i,
+            "calculated_price": 9000 + i,
+            "category_id": subcategories[i % len(subcategories)].category_id,
+            "subcategory_id": subcategories[i % len(subcategories)].subcategory_id,
+            "specifications": {"Brand": f"Brand {i % 50}", "Weight": str(100 + i % 900)},
+            "stock_quantity": 10,
+            "sku": f"SKU-{i}",
+            "created_by": "bench",
+            "is_active": True,
+        }
+        for i in range(1, n_products + 1)
+    ])
+    session.commit()
+
+
+def per_product(Session, ids):
+    # One session per product, like the old after_insert/after_update hooks.
+    for pid in ids:
+        db = Session()
+        try:
+            product = db.query(Product).filter(Product.product_id == pid).first()
+            build_document(product)
+        finally:
+            db.close()
+
+
+def batched(Session, ids):
+    db = Session()
+    try:
+        build_documents(db, ids)
+    finally:
+        db.close()
+
+
+def measure(engine, label, fn):
+    counter = {"statements": 0}
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    started = time.perf_counter()
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {counter['statements']:>8} queries {elapsed:>8.2f}s")
+    return counter["statements"]
+
+
+def main():
+    n_products = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(
+        engine,
+        tables=[Category.__table__, Subcategory.__table__, SpecificationTemplate.__table__, Product.__table__],
+    )
+    Session = sessionmaker(bind=engine)
+
+    with Session() as session:
+        seed(session, n_products)
+
+    ids = list(range(1, n_products + 1))
+    print(f"Building search documents for {n_products} products\n")
+    legacy = measure(engine, "per-product (lazy loads)", lambda: per_product(Session, ids))
+    shared = measure(engine, "document_builder (batched)", lambda: batched(Session, ids))
+    print(f"\nqueries per 10k products: {legacy * 10_000 // n_products} -> {shared * 10_000 // n_products}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Checks that cancelling or returning an order restores its stock exactly once.
+
+Drives the customer cancel and the vendor status endpoints against an
+in-memory SQLite database, including a vendor trying to reopen a cancelled
+order (cancelled -> shipped -> cancelled). No Postgres, Elasticsearch or
+payment gateway needed:
+
+    python check_order_restock.py      # exits 1 on any mismatch
+"""
+import asyncio
+import sys
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models import Base, Category, Customer, Product
+from src.models.order import Order, OrderItem, OrderStatus, PaymentMethod
+from src.models.vendor import Vendor
+from src.api.v1.orders import cancel_order
+from src.api.v1.vendor_orders import OrderStatusUpdate, update_order_status
+
+STOCK = 10
+ORDERED = 3
+
+
+def seed(db):
+    customer = Customer(customer_id=1, customer_email="c@example.com", customer_ph_no="1", customer_name="c")
+    vendor = Vendor(vendor_id=1, vendor_email="v@example.com")
+    category = Category(name="Checks")
+    db.add_all([customer, vendor, category])
+    db.flush()
+    product = Product(
+        name="Widget", category_id=category.category_id, base_price=10000, specifications={},
+        stock_quantity=STOCK, sku="CHECK-1", created_by="check", is_active=True, vendor_id=vendor.vendor_id,
+    )
+    db.add(product)
+    db.flush()
+    return customer, vendor, product
+
+
+def new_order(db, number, product, vendor):
+    order = Order(
+        order_number=number, customer_id=1, delivery_address_id=1, subtotal=300.0, total_amount=300.0,
+        payment_method=PaymentMethod.RAZORPAY, order_status=OrderStatus.CONFIRMED,
+    )
+    db.add(order)
+    db.flush()
+    db.add(OrderItem(
+        order_id=order.order_id, product_id=product.product_id, vendor_id=vendor.vendor_id,
+        quantity=ORDERED, unit_price=100.0, total_price=300.0, product_name=product.name,
+    ))
+    product.stock_quantity -= ORDERED
+    db.commit()
+    return order.order_id
+
+
+def main() -> int:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    customer, vendor, product = seed(db)
+    failures = []
+
+    def expect(label, got, want):
+        if got != want:
+            failures.append(f"{label}: got {got!r}, want {want!r}")
+
+    def stock():
+        db.expire_all()
+        return db.get(Product, product.product_id).stock_quantity
+
+    def vendor_status(order_id, new_status):
+        try:
+            asyncio.run(update_order_status(order_id, OrderStatusUpdate(status=new_status), vendor, db))
+            return 200
+        except HTTPException as e:
+            db.rollback()
+            return e.status_code
+
+    # Vendor: cancel, try to reopen, cancel again
+    order_id = new_order(db, "CHK-1", product, vendor)
+    expect("stock after order", stock(), STOCK - ORDERED)
+    expect("vendor cancel", vendor_status(order_id, OrderStatus.CANCELLED), 200)
+    expect("stock after cancel", stock(), STOCK)
+    expect("reopen cancelled", vendor_status(order_id, OrderStatus.SHIPPED), 400)
+    expect("cancel again", vendor_status(order_id, OrderStatus.CANCELLED), 200)
+    expect("returned after cancel", vendor_status(order_id, OrderStatus.RETURNED), 400)
+    expect("stock after cancel, reopen, cancel", stock(), STOCK)
+
+    # Vendor: deliver, return, try to reopen
+    order_id = new_order(db, "CHK-2", product, vendor)
+    expect("deliver", vendor_status(order_id, OrderStatus.DELIVERED), 200)
+    expect("return", vendor_status(order_id, OrderStatus.RETURNED), 200)
+    expect("reopen returned", vendor_status(order_id, OrderStatus.PROCESSING), 400)
+    expect("stock after return", stock(), STOCK)
+
+    # Customer cancel twice, then the vendor tries to reopen it
+    order_id = new_order(db, "CHK-3", product, vendor)
+    asyncio.run(cancel_order(order_id, customer, db))
+    try:
+        asyncio.run(cancel_order(order_id, customer, db))
+        failures.append("second customer cancel: accepted")
+    except HTTPException as e:
+        db.rollback()
+        expect("second customer cancel", e.status_code, 400)
+    expect("reopen customer-cancelled", vendor_status(order_id, OrderStatus.CONFIRMED), 400)
+    expect("stock after customer cancel", stock(), STOCK)
+
+    if failures:
+        print("\n".join(failures))
+        return 1
+    print("order restock: ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Golden values for src/services/price_engine.py.
+
+Pins the paise arithmetic (half-up discount rounding, legacy DECIMAL prices,
+tax and the free-shipping threshold) and checks that the cart, checkout,
+search documents and ProductUtils all price through it. No database needed:
+
+    python check_price_engine.py      # exits 1 on any mismatch
+"""
+import sys
+from decimal import Decimal
+
+from src.models import Product
+from src.models.order import Order, OrderItem  # noqa: F401  (mapper registry)
+from src.models.product import ProductUtils
+from src.search.document_builder import effective_price
+from src.services.cart_service import CartService
+from src.services.checkout import CheckoutError, get_product_price
+from src.services.price_engine import NO_PRICE, OrderTotals, PriceEngine
+
+# (calculated_price, base_price, price, discount_percent) -> (list, discount, unit), paise
+PRODUCTS = [
+    ((9999, 12000, None, 0), (9999, 0, 9999)),
+    ((None, 10000, None, 15), (10000, 1500, 8500)),
+    ((999, None, None, 33), (999, 330, 669)),                    # 669.33 -> 669
+    ((150, None, None, 25), (150, 37, 113)),                     # 112.5 -> 113 (half up)
+    ((None, None, Decimal("49.995"), 10), (5000, 500, 4500)),    # legacy rupees, half up
+    ((None, None, None, 20), (NO_PRICE, 0, NO_PRICE)),
+    ((None, 5000, None, 100), (5000, 5000, 0)),
+    ((25_000_000, None, None, 7), (25_000_000, 1_750_000, 23_250_000)),
+    ((1, None, None, None), (1, 0, 1)),
+]
+
+# (list_paise, unit_paise, quantities) -> OrderTotals
+ORDERS = [
+    (([10000, 999], [8500, 669], [2, 3]), OrderTotals(22997, 3990, 3421, 4000, 26428)),
+    (([60000], [60000], [1]), OrderTotals(60000, 0, 10800, 0, 70800)),
+    (([5000], [5500], [1]), OrderTotals(5500, 0, 990, 4000, 10490)),      # price went up since carted
+    (([49900], [49900], [1]), OrderTotals(49900, 0, 8982, 4000, 62882)),  # threshold is exclusive
+    (([NO_PRICE], [1250], [4]), OrderTotals(5000, 0, 900, 4000, 9900)),   # carted, now unpriced
+]
+
+
+def product(calculated, base, price, pct):
+    return Product(product_id=1, calculated_price=calculated, base_price=base, price=price, discount_percent=pct)
+
+
+def main():
+    failures = []
+
+    def expect(label, got, want):
+        if got != want:
+            failures.append(f"{label}: got {got!r}, want {want!r}")
+
+    products = [product(*fields) for fields, _ in PRODUCTS]
+    columns = PriceEngine.price_columns(products)
+    for i, (fields, want) in enumerate(PRODUCTS):
+        expect(f"price_columns{fields}", (columns.list_paise[i], columns.discount_paise[i], columns.unit_paise[i]), want)
+    expect("price_many", list(PriceEngine.price_many(products)), [want[2] for _, want in PRODUCTS])
+
+    for (lists, units, quantities), want in ORDERS:
+        expect(f"order_totals{lists, units, quantities}", PriceEngine.order_totals(lists, units, quantities), want)
+
+    # Every caller agrees with the engine
+    for p, (fields, (_, _, unit)) in zip(products, PRODUCTS):
+        if unit == NO_PRICE:
+            for label, fn, error in (("cart", CartService._get_product_price, ValueError),
+                                     ("checkout", get_product_price, CheckoutError)):
+                try:
+                    fn(p)
+                    failures.append(f"{label}{fields}: no error for an unpriced product")
+                except error:
+                    pass
+            expect(f"search{fields}", effective_price(p), None)
+            continue
+        rupees = PriceEngine.to_rupees(unit)
+        expect(f"cart{fields}", CartService._get_product_price(p), rupees)
+        expect(f"checkout{fields}", get_product_price(p), rupees)
+        expect(f"search{fields}", effective_price(p), unit / 100)
+        expect(f"ProductUtils{fields}", ProductUtils.get_effective_price(p), unit / 100)
+
+    for line in failures:
+        print(f"[price-engine] FAIL {line}")
+    print(f"[price-engine] FAILED: {len(failures)} mismatches" if failures else
+          f"[price-engine] ok ({len(PRODUCTS)} products, {len(ORDERS)} orders)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
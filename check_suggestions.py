@@ -0,0 +1,52 @@
+"""Checks for the local autocomplete trie in src/search/suggestions.py.
+
+Covers weight ordering, word-suffix completion and prefixes longer than
+TRIE_MAX_DEPTH, whose completions must not be limited to the TRIE_TOP_K
+heaviest entries at the depth cap. No database or Elasticsearch needed:
+
+    python check_suggestions.py      # exits 1 on any mismatch
+"""
+import sys
+
+from src.search.suggestions import TRIE_MAX_DEPTH, TRIE_TOP_K, SuggestionTrie
+
+
+def main() -> int:
+    failures = []
+
+    def expect(label, got, want):
+        if got != want:
+            failures.append(f"{label}: got {got!r}, want {want!r}")
+
+    trie = SuggestionTrie()
+    trie.insert("Galaxy S24 Ultra", 5)
+    trie.insert("Galaxy Buds", 9)
+    trie.insert("Pixel 9", 1)
+    expect("weight order", trie.lookup("gal"), ["Galaxy Buds", "Galaxy S24 Ultra"])
+    expect("word suffix", trie.lookup("ultra"), ["Galaxy S24 Ultra"])
+    expect("case and spaces", trie.lookup("  GALAXY   s2"), ["Galaxy S24 Ultra"])
+    expect("size", trie.lookup("g", 1), ["Galaxy Buds"])
+    expect("no match", trie.lookup("iphone"), [])
+
+    # More than TRIE_TOP_K names sharing the first TRIE_MAX_DEPTH characters;
+    # the lightest ones must still complete on a longer prefix.
+    names = [f"samsung galaxy s{i:02d} ultra phone" for i in range(TRIE_TOP_K + 10)]
+    assert len(set(name[:TRIE_MAX_DEPTH] for name in names)) == 1
+    deep = SuggestionTrie()
+    for weight, name in enumerate(names, 1):
+        deep.insert(name, weight)
+    expect("deep prefix, light entry", deep.lookup("samsung galaxy s05"), [names[5]])
+    expect("deep prefix, full name", deep.lookup(names[0]), [names[0]])
+    expect("deep prefix, order", deep.lookup("samsung galaxy s0", 3), [names[9], names[8], names[7]])
+    expect("at the cap", deep.lookup(names[0][:TRIE_MAX_DEPTH], 2), [names[-1], names[-2]])
+    expect("above the cap keeps top K", len(deep.lookup("samsung", 50)), TRIE_TOP_K)
+
+    if failures:
+        print("\n".join(failures))
+        return 1
+    print("suggestion trie: ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -268,44 +268,110 @@
 #     es_client = None
 
 
-from elasticsearch import Elasticsearch
+
+# config/elasticsearch.py - Client factory (pooled sync + async clients)
+#
+# Nothing here talks to the cluster at import time. Availability is tracked
+# by the circuit breaker in src/search/breaker.py, which pings in the
+# background; request handlers never ping.
+#
+# Every call picks a per-operation timeout with `client_for(op)` (search,
+# suggest, bulk, reindex, ping), so one slow bulk request cannot hold the
+# request path and a dead cluster costs at most the short search timeout.
+from typing import Optional
 import logging
 
-logger = logging.getLogger(__name__)
+from elasticsearch import Elasticsearch
 
-# Initialize Elasticsearch client
-es_client = None
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
 
 try:
-    print("🔄 Attempting to connect to Elasticsearch...")
-    
-    # Create Elasticsearch client
-    es_client = Elasticsearch(
-        ["http://localhost:9200"],
-        verify_certs=False,
-        ssl_show_warn=False,
-        request_timeout=30,
-        retry_on_timeout=True,
-        max_retries=3,
-        # Add these for better compatibility
-        ca_certs=None,
-        http_auth=None,
-        use_ssl=False
-    )
-    
-    # Test connection
-    if es_client.ping():
-        logger.info("✅ Successfully connected to Elasticsearch at localhost:9200")
-        print("✅ Elasticsearch connection successful!")
-    else:
-        logger.warning("⚠️ Could not ping Elasticsearch server")
-        print("⚠️ Elasticsearch ping failed - server may be starting up")
-        
+    from elasticsearch import AsyncElasticsearch
+except ImportError:  # needs the aiohttp extra
+    AsyncElasticsearch = None
+
+
+def _operation_timeouts() -> dict:
+    return {
+        "search": settings.elasticsearch_search_timeout,
+        "suggest": settings.elasticsearch_suggest_timeout,
+        "bulk": settings.elasticsearch_bulk_timeout,
+        "reindex": settings.elasticsearch_reindex_timeout,
+        "ping": settings.elasticsearch_ping_timeout,
+    }
+
+
+def _client_kwargs() -> dict:
+    kwargs = {
+        "request_timeout": settings.elasticsearch_search_timeout,
+        "max_retries": settings.elasticsearch_max_retries,
+        "retry_on_timeout": False,
+        "connections_per_node": settings.elasticsearch_max_connections,
+        "verify_certs": settings.elasticsearch_verify_certs,
+        "ssl_show_warn": False,
+    }
+    if settings.elasticsearch_ca_certs:
+        kwargs["ca_certs"] = settings.elasticsearch_ca_certs
+    if settings.elasticsearch_username:
+        kwargs["basic_auth"] = (settings.elasticsearch_username, settings.elasticsearch_password)
+    return kwargs
+
+
+def create_client(**overrides) -> Elasticsearch:
+    """Build a pooled sync client from settings (ELASTICSEARCH_* env vars)"""
+    kwargs = _client_kwargs()
+    kwargs.update(overrides)
+    return Elasticsearch(settings.elasticsearch_hosts, **kwargs)
+
+
+def create_async_client(**overrides):
+    """Build a pooled AsyncElasticsearch client, or None without aiohttp"""
+    if AsyncElasticsearch is None:
+        return None
+    kwargs = _client_kwargs()
+    kwargs.update(overrides)
+    try:
+        return AsyncElasticsearch(settings.elasticsearch_hosts, **kwargs)
+    except Exception as e:
+        logger.warning(f"Async Elasticsearch client unavailable: {str(e)}")
+        return None
+
+
+es_client: Optional[Elasticsearch] = None
+try:
+    es_client = create_client()
+    # elasticsearch_dsl Documents (ProductDocument.save/get) use the default connection
+    from elasticsearch_dsl import connections
+    connections.add_connection("default", es_client)
+    logger.info(f"Elasticsearch client configured for {', '.join(settings.elasticsearch_hosts)}")
 except Exception as e:
-    logger.warning(f"❌ Elasticsearch connection failed: {str(e)}")
-    print(f"❌ Elasticsearch error: {str(e)}")
-    print("🔧 To enable search features:")
-    print("   1. Run: docker-compose up -d elasticsearch")
-    print("   2. Wait 30 seconds for Elasticsearch to start")
-    print("   3. Test: curl http://localhost:9200")
-    es_client = None
\ No newline at end of file
+    logger.warning(f"Elasticsearch client configuration failed: {str(e)}")
+    es_client = None
+
+_async_client = None
+
+
+def get_async_client():
+    """Shared async client, created on first use inside the event loop"""
+    global _async_client
+    if _async_client is None:
+        _async_client = create_async_client()
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+def client_for(operation: str, client=None):
+    """`client` (default: the shared sync client) with the timeout for `operation`"""
+    client = client if client is not None else es_client
+    if client is None:
+        return None
+    timeout = _operation_timeouts().get(operation, settings.elasticsearch_search_timeout)
+    return client.options(request_timeout=timeout)
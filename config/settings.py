@@ -83,6 +83,105 @@ class Settings:
     otp_email_from_name: str = os.getenv("OTP_EMAIL_FROM_NAME", "Elakkiya Boutique")
     otp_email_subject: str = os.getenv("OTP_EMAIL_SUBJECT", "Your verification code")
 
+    # Razorpay client (src/services/payment.py): one pooled client per
+    # process. The timeout applies to every gateway call, in seconds.
+    razorpay_timeout_seconds: float = float(os.getenv("RAZORPAY_TIMEOUT_SECONDS", "5"))
+    razorpay_pool_size: int = int(os.getenv("RAZORPAY_POOL_SIZE", "10"))
+    razorpay_max_retries: int = int(os.getenv("RAZORPAY_MAX_RETRIES", "2"))
+
+    # Idempotent order creation (src/services/idempotency.py). Responses to
+    # an Idempotency-Key are replayed for this long; a Razorpay payment ID
+    # can only ever back one order, so it is remembered much longer.
+    idempotency_key_ttl_hours: int = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+    payment_dedup_ttl_days: int = int(os.getenv("PAYMENT_DEDUP_TTL_DAYS", "30"))
+
+    # Outbox worker (src/services/outbox.py). Runs inside the API process
+    # unless OUTBOX_WORKER_IN_PROCESS=false, in which case run
+    # `python -m src.services.outbox` separately.
+    outbox_worker_in_process: bool = os.getenv("OUTBOX_WORKER_IN_PROCESS", "true").lower() == "true"
+    outbox_batch_size: int = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+    outbox_poll_seconds: float = float(os.getenv("OUTBOX_POLL_SECONDS", "1"))
+    outbox_max_attempts: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+    # Retry delay doubles per attempt from this base, in seconds
+    outbox_retry_base_seconds: float = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "2"))
+    # Done events (and expired idempotency keys) are deleted after this long
+    outbox_retention_hours: int = int(os.getenv("OUTBOX_RETENTION_HOURS", "72"))
+
+    # Inventory holds (src/services/inventory.py): how long stock stays set
+    # aside for a customer after a Razorpay order is created for their cart.
+    inventory_hold_ttl_seconds: int = int(os.getenv("INVENTORY_HOLD_TTL_SECONDS", "900"))
+
+    # Vendor dashboard rollups (src/services/vendor_stats.py). Kept current by
+    # outbox events; a nightly pass at this local hour recomputes the last
+    # VENDOR_STATS_RECONCILE_DAYS days in case an event was missed.
+    vendor_stats_reconcile_in_process: bool = os.getenv("VENDOR_STATS_RECONCILE_IN_PROCESS", "true").lower() == "true"
+    vendor_stats_reconcile_hour: int = int(os.getenv("VENDOR_STATS_RECONCILE_HOUR", "2"))
+    vendor_stats_reconcile_days: int = int(os.getenv("VENDOR_STATS_RECONCILE_DAYS", "7"))
+
+    # Per-customer cart cache (src/services/cart_cache.py). With a Redis URL
+    # all workers share it; otherwise each process keeps its own, which is
+    # only coherent with a single worker.
+    cart_cache_enabled: bool = os.getenv("CART_CACHE_ENABLED", "true").lower() == "true"
+    cart_cache_max_entries: int = int(os.getenv("CART_CACHE_MAX_ENTRIES", "10000"))
+    cart_cache_ttl_seconds: int = int(os.getenv("CART_CACHE_TTL_SECONDS", "900"))
+    cart_cache_redis_url: str = os.getenv("CART_CACHE_REDIS_URL", "")
+
+    # Elasticsearch client (config/elasticsearch.py). ELASTICSEARCH_URL may
+    # list several nodes, comma-separated. Timeouts are seconds per operation.
+    elasticsearch_hosts: list = [
+        h.strip() for h in os.getenv("ELASTICSEARCH_URL", "http://localhost:9200").split(",") if h.strip()
+    ]
+    elasticsearch_username: str = os.getenv("ELASTICSEARCH_USERNAME", "")
+    elasticsearch_password: str = os.getenv("ELASTICSEARCH_PASSWORD", "")
+    elasticsearch_verify_certs: bool = os.getenv("ELASTICSEARCH_VERIFY_CERTS", "false").lower() == "true"
+    elasticsearch_ca_certs: str = os.getenv("ELASTICSEARCH_CA_CERTS", "")
+    elasticsearch_max_connections: int = int(os.getenv("ELASTICSEARCH_MAX_CONNECTIONS", "10"))
+    elasticsearch_max_retries: int = int(os.getenv("ELASTICSEARCH_MAX_RETRIES", "1"))
+    elasticsearch_search_timeout: float = float(os.getenv("ELASTICSEARCH_SEARCH_TIMEOUT", "2"))
+    elasticsearch_suggest_timeout: float = float(os.getenv("ELASTICSEARCH_SUGGEST_TIMEOUT", "0.5"))
+    elasticsearch_bulk_timeout: float = float(os.getenv("ELASTICSEARCH_BULK_TIMEOUT", "30"))
+    elasticsearch_reindex_timeout: float = float(os.getenv("ELASTICSEARCH_REINDEX_TIMEOUT", "120"))
+    elasticsearch_ping_timeout: float = float(os.getenv("ELASTICSEARCH_PING_TIMEOUT", "1"))
+    # Circuit breaker (src/search/breaker.py)
+    elasticsearch_breaker_failures: int = int(os.getenv("ELASTICSEARCH_BREAKER_FAILURES", "5"))
+    elasticsearch_breaker_cooldown_seconds: float = float(os.getenv("ELASTICSEARCH_BREAKER_COOLDOWN_SECONDS", "10"))
+
+    # Search indexing queue (src/search/indexer.py). Product writes are
+    # collected per transaction and shipped to Elasticsearch in bulk batches.
+    search_index_batch_size: int = int(os.getenv("SEARCH_INDEX_BATCH_SIZE", "500"))
+    search_index_linger_ms: int = int(os.getenv("SEARCH_INDEX_LINGER_MS", "250"))
+    # Failed or skipped batches are requeued; the retry delay doubles from
+    # the base up to the max while the backend keeps failing.
+    search_index_retry_base_ms: int = int(os.getenv("SEARCH_INDEX_RETRY_BASE_MS", "1000"))
+    search_index_retry_max_ms: int = int(os.getenv("SEARCH_INDEX_RETRY_MAX_MS", "60000"))
+
+    # Search backend (src/search/backends.py): elasticsearch | postgres | memory
+    search_backend: str = os.getenv("SEARCH_BACKEND", "elasticsearch").lower()
+
+    # Autocomplete (src/search/suggestions.py): how often the suggestion
+    # index and prefix trie are rebuilt.
+    search_suggest_refresh_seconds: int = int(os.getenv("SEARCH_SUGGEST_REFRESH_SECONDS", "900"))
+
+    # Popularity signal (src/search/popularity.py): decayed velocity of
+    # units sold, cart additions and search clicks, recomputed periodically
+    # and blended into relevance with function_score.
+    search_popularity_refresh_seconds: int = int(os.getenv("SEARCH_POPULARITY_REFRESH_SECONDS", "3600"))
+    search_popularity_half_life_days: float = float(os.getenv("SEARCH_POPULARITY_HALF_LIFE_DAYS", "14"))
+    search_popularity_window_days: int = int(os.getenv("SEARCH_POPULARITY_WINDOW_DAYS", "90"))
+    search_popularity_sale_weight: float = float(os.getenv("SEARCH_POPULARITY_SALE_WEIGHT", "1.0"))
+    search_popularity_cart_weight: float = float(os.getenv("SEARCH_POPULARITY_CART_WEIGHT", "0.3"))
+    search_popularity_click_weight: float = float(os.getenv("SEARCH_POPULARITY_CLICK_WEIGHT", "0.1"))
+    # Relevance multiplier is log10(2 + factor * popularity_score); 0 disables it.
+    search_popularity_boost_factor: float = float(os.getenv("SEARCH_POPULARITY_BOOST_FACTOR", "1.0"))
+
+    # Search result/facet cache (src/search/cache.py). The Redis tier is
+    # optional and only used when a URL is configured.
+    search_cache_enabled: bool = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+    search_cache_max_entries: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+    search_cache_ttl_seconds: int = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "60"))
+    search_facet_cache_ttl_seconds: int = int(os.getenv("SEARCH_FACET_CACHE_TTL_SECONDS", "300"))
+    search_cache_redis_url: str = os.getenv("SEARCH_CACHE_REDIS_URL", "")
+
 settings = Settings()
 
 
@@ -0,0 +1,72 @@
+"""One-off migration: discount-aware products.effective_price_cents.
+
+The Postgres search fallback filters, sorts and buckets on the generated
+column effective_price_cents, which migrate_search_fts.py defined as the
+list price. Search documents and every endpoint now show PriceEngine's unit
+price (src/services/price_engine.py): the list price less discount_percent,
+rounded half up to the paisa. This redefines the column with the same
+formula so the fallback filters on the price customers see:
+
+  (COALESCE(calculated_price, base_price, ROUND(price * 100)) * (100 - discount_percent) + 50) / 100
+
+computed in BIGINT so large prices cannot overflow.
+
+A generated column's expression cannot be altered, so the column is dropped
+and added again (Postgres rewrites the table and holds an exclusive lock
+while it does) and ix_products_active_effective_price is rebuilt, all in one
+transaction. Run it in a quiet period.
+
+Re-run-safe: it does nothing if the column already uses discount_percent.
+"""
+import sys
+from sqlalchemy import text
+from config.database import engine
+
+
+CURRENT_EXPRESSION = """
+    SELECT generation_expression FROM information_schema.columns
+     WHERE table_name = 'products' AND column_name = 'effective_price_cents';
+"""
+
+STEPS = [
+    ("drop products.effective_price_cents", """
+        ALTER TABLE products DROP COLUMN IF EXISTS effective_price_cents;
+    """),
+    ("add discount-aware products.effective_price_cents", """
+        ALTER TABLE products
+          ADD COLUMN effective_price_cents INTEGER
+          GENERATED ALWAYS AS (
+            ((COALESCE(calculated_price, base_price, ROUND(price * 100)::INTEGER)::BIGINT
+              * (100 - LEAST(GREATEST(COALESCE(discount_percent, 0), 0), 100)) + 50) / 100)::INTEGER
+          ) STORED;
+    """),
+    ("create index on active products by effective price", """
+        CREATE INDEX IF NOT EXISTS ix_products_active_effective_price
+          ON products (effective_price_cents)
+          WHERE is_active;
+    """),
+    ("refresh planner statistics for products", """
+        ANALYZE products;
+    """),
+]
+
+
+def main():
+    with engine.begin() as conn:
+        expression = conn.execute(text(CURRENT_EXPRESSION)).scalar()
+        if expression is not None and "discount_percent" in expression:
+            print("[migrate] effective_price_cents already applies discount_percent, nothing to do.")
+            return
+        for label, sql in STEPS:
+            print(f"[migrate] {label} ...", end=" ", flush=True)
+            try:
+                conn.execute(text(sql))
+                print("ok")
+            except Exception as exc:
+                print(f"FAILED: {exc}")
+                raise
+    print("[migrate] done.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
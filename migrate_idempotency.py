@@ -0,0 +1,55 @@
+"""One-off migration for idempotent order creation (src/services/idempotency.py).
+
+Adds:
+  - idempotency_keys: the stored POST /orders response per Idempotency-Key
+    (scoped to the customer) and per Razorpay payment ID, with an expiry.
+  - a unique index on (scope, key), which is what makes a concurrent
+    duplicate wait for the first request and then replay its response.
+
+Re-run-safe: every step is guarded with IF NOT EXISTS.
+"""
+import sys
+from sqlalchemy import text
+from config.database import engine
+
+
+STEPS = [
+    ("create idempotency_keys table", """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            record_id      SERIAL PRIMARY KEY,
+            scope          VARCHAR(50)  NOT NULL,
+            key            VARCHAR(255) NOT NULL,
+            customer_id    INTEGER NOT NULL REFERENCES customers(customer_id) ON DELETE CASCADE,
+            request_hash   VARCHAR(64)  NOT NULL,
+            order_id       INTEGER REFERENCES orders(order_id) ON DELETE SET NULL,
+            status_code    INTEGER,
+            response_body  JSON,
+            created_at     TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            expires_at     TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        );
+    """),
+    ("unique index idempotency_keys (scope, key)", """
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_idempotency_keys_scope_key
+            ON idempotency_keys (scope, key);
+    """),
+    ("index idempotency_keys.expires_at", """
+        CREATE INDEX IF NOT EXISTS ix_idempotency_keys_expires_at ON idempotency_keys (expires_at);
+    """),
+]
+
+
+def main():
+    with engine.begin() as conn:
+        for label, sql in STEPS:
+            print(f"[migrate] {label} ...", end=" ", flush=True)
+            try:
+                conn.execute(text(sql))
+                print("ok")
+            except Exception as exc:
+                print(f"FAILED: {exc}")
+                raise
+    print("[migrate] done.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""One-off migration for inventory holds (src/services/inventory.py).
+
+Adds:
+  - inventory_holds: units set aside for a customer while they pay, with
+    an expiry. Available-to-sell is stock minus other customers' live
+    holds.
+  - an index on (product_id, expires_at) for the per-product sum of live
+    holds, and on customer_id / expires_at for consuming and sweeping.
+
+Re-run-safe: every step is guarded with IF NOT EXISTS.
+"""
+import sys
+from sqlalchemy import text
+from config.database import engine
+
+
+STEPS = [
+    ("create inventory_holds table", """
+        CREATE TABLE IF NOT EXISTS inventory_holds (
+            hold_id            BIGSERIAL PRIMARY KEY,
+            customer_id        INTEGER NOT NULL REFERENCES customers(customer_id) ON DELETE CASCADE,
+            product_id         INTEGER NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+            quantity           INTEGER NOT NULL,
+            razorpay_order_id  VARCHAR(100),
+            expires_at         TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            created_at         TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        );
+    """),
+    ("index inventory_holds (product_id, expires_at)", """
+        CREATE INDEX IF NOT EXISTS ix_inventory_holds_product_expires
+            ON inventory_holds (product_id, expires_at);
+    """),
+    ("index inventory_holds.customer_id", """
+        CREATE INDEX IF NOT EXISTS ix_inventory_holds_customer_id ON inventory_holds (customer_id);
+    """),
+    ("index inventory_holds.expires_at", """
+        CREATE INDEX IF NOT EXISTS ix_inventory_holds_expires_at ON inventory_holds (expires_at);
+    """),
+]
+
+
+def main():
+    with engine.begin() as conn:
+        for label, sql in STEPS:
+            print(f"[migrate] {label} ...", end=" ", flush=True)
+            try:
+                conn.execute(text(sql))
+                print("ok")
+            except Exception as exc:
+                print(f"FAILED: {exc}")
+                raise
+    print("[migrate] done.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""One-off migration for the inventory ledger (src/services/inventory.py).
+
+Adds:
+  - inventory_ledger: one row per stock change of a product (checkout,
+    cancel, return, manual adjustment) with the resulting stock level and
+    the order it belongs to.
+  - indexes on product_id and order_id for per-product history and
+    per-order reconciliation.
+
+Re-run-safe: every step is guarded with IF NOT EXISTS.
+"""
+import sys
+from sqlalchemy import text
+from config.database import engine
+
+
+STEPS = [
+    ("create inventory_ledger table", """
+        CREATE TABLE IF NOT EXISTS inventory_ledger (
+            entry_id     BIGSERIAL PRIMARY KEY,
+            product_id   INTEGER NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+            delta        INTEGER NOT NULL,
+            stock_after  INTEGER NOT NULL,
+            reason       VARCHAR(30) NOT NULL,
+            order_id     INTEGER REFERENCES orders(order_id) ON DELETE SET NULL,
+            actor        VARCHAR(100),
+            created_at   TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        );
+    """),
+    ("index inventory_ledger.product_id", """
+        CREATE INDEX IF NOT EXISTS ix_inventory_ledger_product_id ON inventory_ledger (product_id);
+    """),
+    ("index inventory_ledger.order_id", """
+        CREATE INDEX IF NOT EXISTS ix_inventory_ledger_order_id ON inventory_ledger (order_id);
+    """),
+]
+
+
+def main():
+    with engine.begin() as conn:
+        for label, sql in STEPS:
+            print(f"[migrate] {label} ...", end=" ", flush=True)
+            try:
+                conn.execute(text(sql))
+                print("ok")
+            except Exception as exc:
+                print(f"FAILED: {exc}")
+                raise
+    print("[migrate] done.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
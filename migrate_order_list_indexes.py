@@ -0,0 +1,44 @@
+"""One-off migration for GET /orders keyset pagination.
+
+Adds:
+  - ix_orders_customer_created on orders (customer_id, created_at DESC,
+    order_id DESC): serves "newest orders of this customer after the
+    cursor" straight from the index.
+  - ix_order_items_order_id: the per-order item count and first item of
+    the list projection, and every order detail load.
+
+Re-run-safe: every step is guarded with IF NOT EXISTS. CONCURRENTLY keeps
+the orders table writable while the indexes build, so the steps run
+outside a transaction.
+"""
+import sys
+from sqlalchemy import text
+from config.database import engine
+
+
+STEPS = [
+    ("index orders (customer_id, created_at DESC, order_id DESC)", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_customer_created
+            ON orders (customer_id, created_at DESC, order_id DESC);
+    """),
+    ("index order_items.order_id", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_order_items_order_id ON order_items (order_id);
+    """),
+]
+
+
+def main():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for label, sql in STEPS:
+            print(f"[migrate] {label} ...", end=" ", flush=True)
+            try:
+                conn.execute(text(sql))
+                print("ok")
+            except Exception as exc:
+                print(f"FAILED: {exc}")
+                raise
+    print("[migrate] done.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""One-off migration for the transactional outbox (src/services/outbox.py).
+
+Adds:
+  - outbox_events: side effects of a checkout (search stock refresh,
+    payment method lookup, vendor notification), written in the order's
+    transaction and drained by the outbox worker.
+  - a partial index on the pending events by due time, which is all the
+    worker's claim query reads.
+
+Re-run-safe: every step is guarded with IF NOT EXISTS.
+"""
+import sys
+from sqlalchemy import text
+from config.database import engine
+
+
+STEPS = [
+    ("create outbox_events table", """
+        CREATE TABLE IF NOT EXISTS outbox_events (
+            event_id      BIGSERIAL PRIMARY KEY,
+            event_type    VARCHAR(50) NOT NULL,
+            aggregate_id  INTEGER,
+            payload       JSON NOT NULL,
+            status        VARCHAR(20) NOT NULL DEFAULT 'pending',
+            attempts      INTEGER NOT NULL DEFAULT 0,
+            last_error    TEXT,
+            available_at  TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            created_at    TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            processed_at  TIMESTAMP WITHOUT TIME ZONE
+        );
+    """),
+    ("index pending outbox_events by available_at", """
+        CREATE INDEX IF NOT EXISTS ix_outbox_events_pending
+            ON outbox_events (available_at)
+         WHERE status = 'pending';
+    """),
+    ("index done outbox_events by processed_at", """
+        CREATE INDEX IF NOT EXISTS ix_outbox_events_processed_at
+            ON outbox_events (processed_at)
+         WHERE status = 'done';
+    """),
+]
+
+
+def main():
+    with engine.begin() as conn:
+        for label, sql in STEPS:
+            print(f"[migrate] {label} ...", end=" ", flush=True)
+            try:
+                conn.execute(text(sql))
+                print("ok")
+            except Exception as exc:
+                print(f"FAILED: {exc}")
+                raise
+    print("[migrate] done.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""One-off migration for the Postgres full-text search fallback.
+
+Adds generated (STORED) columns that src/services/postgres_search.py searches,
+filters and facets on when Elasticsearch is unavailable:
+
+  - products.search_vector          weighted tsvector of name (A), brand (B)
+                                    and description (C)
+  - products.search_brand           Brand/brand from the specifications JSON
+  - products.effective_price_cents  calculated_price, else base_price, else the
+                                    legacy DECIMAL price converted to cents
+
+plus a GIN index on the tsvector, a pg_trgm GIN index on name for typo and
+partial-word matches, and btree indexes for the price and brand filters.
+
+Non-destructive: generated columns are maintained by Postgres on every write,
+so no application code writes them and no data changes.
+
+Re-run-safe: guarded with IF NOT EXISTS — rerunning is a no-op.
+"""
+import sys
+from sqlalchemy import text
+from config.database import engine
+
+
+STEPS = [
+    ("enable pg_trgm extension", """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    """),
+    ("add products.search_brand generated column", """
+        ALTER TABLE products
+          ADD COLUMN IF NOT EXISTS search_brand VARCHAR(255)
+          GENERATED ALWAYS AS (
+            COALESCE(specifications->>'Brand', specifications->>'brand')
+          ) STORED;
+    """),
+    ("add products.effective_price_cents generated column", """
+        ALTER TABLE products
+          ADD COLUMN IF NOT EXISTS effective_price_cents INTEGER
+          GENERATED ALWAYS AS (
+            COALESCE(calculated_price, base_price, ROUND(price * 100)::INTEGER)
+          ) STORED;
+    """),
+    ("add products.search_vector generated column", """
+        ALTER TABLE products
+          ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+          GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', COALESCE(name, '')), 'A') ||
+            setweight(to_tsvector('simple', COALESCE(specifications->>'Brand', specifications->>'brand', '')), 'B') ||
+            setweight(to_tsvector('simple', COALESCE(description, '')), 'C')
+          ) STORED;
+    """),
+    ("create GIN index on products.search_vector", """
+        CREATE INDEX IF NOT EXISTS ix_products_search_vector
+          ON products USING GIN (search_vector);
+    """),
+    ("create trigram index on products.name", """
+        CREATE INDEX IF NOT EXISTS ix_products_name_trgm
+          ON products USING GIN (name gin_trgm_ops);
+    """),
+    ("create index on active products by effective price", """
+        CREATE INDEX IF NOT EXISTS ix_products_active_effective_price
+          ON products (effective_price_cents)
+          WHERE is_active;
+    """),
+    ("create index on products.search_brand", """
+        CREATE INDEX IF NOT EXISTS ix_products_search_brand
+          ON products (search_brand);
+    """),
+    ("refresh planner statistics for products", """
+        ANALYZE products;
+    """),
+]
+
+
+def main():
+    with engine.begin() as conn:
+        for label, sql in STEPS:
+            print(f"[migrate] {label} ...", end=" ", flush=True)
+            try:
+                conn.execute(text(sql))
+                print("ok")
+            except Exception as exc:
+                print(f"FAILED: {exc}")
+                raise
+    print("[migrate] done.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
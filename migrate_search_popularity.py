@@ -0,0 +1,62 @@
+"""One-off migration for the search popularity signal (src/search/popularity.py).
+
+Adds:
+  - products.popularity_score: decayed sales/cart/click velocity, written
+    by the popularity job and read by every indexing path.
+  - search_clicks: one row per click on a search result.
+  - indexes on the timestamps the job scans over its window, and a partial
+    index on the products that currently have a score.
+
+Re-run-safe: every step is guarded with IF NOT EXISTS.
+"""
+import sys
+from sqlalchemy import text
+from config.database import engine
+
+
+STEPS = [
+    ("add products.popularity_score column", """
+        ALTER TABLE products
+          ADD COLUMN IF NOT EXISTS popularity_score DOUBLE PRECISION NOT NULL DEFAULT 0;
+    """),
+    ("index products with a popularity score", """
+        CREATE INDEX IF NOT EXISTS ix_products_popularity_score
+            ON products (popularity_score)
+         WHERE popularity_score > 0;
+    """),
+    ("create search_clicks table", """
+        CREATE TABLE IF NOT EXISTS search_clicks (
+            click_id    SERIAL PRIMARY KEY,
+            product_id  INTEGER NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+            query       VARCHAR(255),
+            position    INTEGER,
+            clicked_at  TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        );
+    """),
+    ("index search_clicks.clicked_at", """
+        CREATE INDEX IF NOT EXISTS ix_search_clicks_clicked_at ON search_clicks (clicked_at);
+    """),
+    ("index order_items.created_at", """
+        CREATE INDEX IF NOT EXISTS ix_order_items_created_at ON order_items (created_at);
+    """),
+    ("index cart_items.added_at", """
+        CREATE INDEX IF NOT EXISTS ix_cart_items_added_at ON cart_items (added_at);
+    """),
+]
+
+
+def main():
+    with engine.begin() as conn:
+        for label, sql in STEPS:
+            print(f"[migrate] {label} ...", end=" ", flush=True)
+            try:
+                conn.execute(text(sql))
+                print("ok")
+            except Exception as exc:
+                print(f"FAILED: {exc}")
+                raise
+    print("[migrate] done.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
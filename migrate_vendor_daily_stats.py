@@ -0,0 +1,74 @@
+"""One-off migration for the vendor dashboard rollup (src/services/vendor_stats.py).
+
+Adds:
+  - vendor_daily_stats: per vendor and day, order counts per status,
+    revenue and units of the vendor's lines, plus a product stock snapshot.
+    The primary key (vendor_id, stat_date) serves both the dashboard sums
+    and the date-range series.
+
+Then backfills it from all order history (same as
+`python -m src.services.vendor_stats --all`). Needs migrate_vendor_ids.py
+to have run first.
+
+Re-run-safe: the table is created IF NOT EXISTS and the backfill
+recomputes rows rather than adding to them.
+"""
+import sys
+from sqlalchemy import text
+from config.database import engine, SessionLocal
+from src.services.vendor_stats import VendorStatsService
+
+
+STEPS = [
+    ("create vendor_daily_stats table", """
+        CREATE TABLE IF NOT EXISTS vendor_daily_stats (
+            vendor_id                INTEGER NOT NULL REFERENCES vendors(vendor_id) ON DELETE CASCADE,
+            stat_date                DATE NOT NULL,
+            orders_total             INTEGER NOT NULL DEFAULT 0,
+            orders_pending           INTEGER NOT NULL DEFAULT 0,
+            orders_confirmed         INTEGER NOT NULL DEFAULT 0,
+            orders_processing        INTEGER NOT NULL DEFAULT 0,
+            orders_shipped           INTEGER NOT NULL DEFAULT 0,
+            orders_delivered         INTEGER NOT NULL DEFAULT 0,
+            orders_cancelled         INTEGER NOT NULL DEFAULT 0,
+            orders_returned          INTEGER NOT NULL DEFAULT 0,
+            orders_return_requested  INTEGER NOT NULL DEFAULT 0,
+            revenue                  DOUBLE PRECISION NOT NULL DEFAULT 0,
+            units_sold               INTEGER NOT NULL DEFAULT 0,
+            products_total           INTEGER,
+            products_low_stock       INTEGER,
+            products_out_of_stock    INTEGER,
+            updated_at               TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            PRIMARY KEY (vendor_id, stat_date)
+        );
+    """),
+]
+
+
+def main():
+    with engine.begin() as conn:
+        for label, sql in STEPS:
+            print(f"[migrate] {label} ...", end=" ", flush=True)
+            try:
+                conn.execute(text(sql))
+                print("ok")
+            except Exception as exc:
+                print(f"FAILED: {exc}")
+                raise
+
+    print("[migrate] backfill vendor_daily_stats ...", end=" ", flush=True)
+    db = SessionLocal()
+    try:
+        result = VendorStatsService.reconcile(db)
+        print(f"ok ({result})")
+    except Exception as exc:
+        db.rollback()
+        print(f"FAILED: {exc}")
+        raise
+    finally:
+        db.close()
+    print("[migrate] done.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""One-off migration: integer vendor_id on products and order_items.
+
+Vendor queries used to join order_items -> products and match
+products.created_by (a string) against the vendor's phone number. This adds:
+
+  - products.vendor_id -> vendors.vendor_id, backfilled from created_by =
+    vendor_ph_no (admin/sales products stay NULL)
+  - order_items.vendor_id, the product's vendor snapshotted at checkout,
+    backfilled from products
+  - ix_products_vendor_created (vendor_id, created_at)
+  - ix_order_items_vendor_created (vendor_id, created_at)
+  - ix_order_items_vendor_order (vendor_id, order_id)
+
+Re-run-safe: columns and indexes are guarded with IF NOT EXISTS and the
+backfills only touch rows that are still NULL. The backfills run in batches
+of BATCH_SIZE rows, each its own transaction, and the indexes are built
+CONCURRENTLY, so the tables stay writable throughout.
+"""
+import sys
+from sqlalchemy import text
+from config.database import engine
+
+BATCH_SIZE = 5000
+
+
+COLUMNS = [
+    ("add products.vendor_id", """
+        ALTER TABLE products
+            ADD COLUMN IF NOT EXISTS vendor_id INTEGER REFERENCES vendors (vendor_id);
+    """),
+    ("add order_items.vendor_id", """
+        ALTER TABLE order_items
+            ADD COLUMN IF NOT EXISTS vendor_id INTEGER REFERENCES vendors (vendor_id);
+    """),
+]
+
+BACKFILLS = [
+    ("backfill products.vendor_id", """
+        UPDATE products AS p
+           SET vendor_id = v.vendor_id
+          FROM vendors AS v
+         WHERE p.product_id IN (
+                   SELECT p2.product_id FROM products AS p2
+                     JOIN vendors AS v2 ON v2.vendor_ph_no = p2.created_by
+                    WHERE p2.vendor_id IS NULL
+                    LIMIT :batch)
+           AND v.vendor_ph_no = p.created_by;
+    """),
+    ("backfill order_items.vendor_id", """
+        UPDATE order_items AS oi
+           SET vendor_id = p.vendor_id
+          FROM products AS p
+         WHERE oi.order_item_id IN (
+                   SELECT oi2.order_item_id FROM order_items AS oi2
+                     JOIN products AS p2 ON p2.product_id = oi2.product_id
+                    WHERE oi2.vendor_id IS NULL AND p2.vendor_id IS NOT NULL
+                    LIMIT :batch)
+           AND p.product_id = oi.product_id;
+    """),
+]
+
+INDEXES = [
+    ("index products (vendor_id, created_at)", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_vendor_created
+            ON products (vendor_id, created_at);
+    """),
+    ("index order_items (vendor_id, created_at)", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_order_items_vendor_created
+            ON order_items (vendor_id, created_at);
+    """),
+    ("index order_items (vendor_id, order_id)", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_order_items_vendor_order
+            ON order_items (vendor_id, order_id);
+    """),
+]
+
+
+def main():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for label, sql in COLUMNS:
+            print(f"[migrate] {label} ...", end=" ", flush=True)
+            try:
+                conn.execute(text(sql))
+                print("ok")
+            except Exception as exc:
+                print(f"FAILED: {exc}")
+                raise
+
+        for label, sql in BACKFILLS:
+            print(f"[migrate] {label} ...", end=" ", flush=True)
+            total = 0
+            try:
+                while True:
+                    updated = conn.execute(text(sql), {"batch": BATCH_SIZE}).rowcount
+                    total += updated
+                    if updated == 0:
+                        break
+                print(f"ok ({total} rows)")
+            except Exception as exc:
+                print(f"FAILED: {exc}")
+                raise
+
+        for label, sql in INDEXES:
+            print(f"[migrate] {label} ...", end=" ", flush=True)
+            try:
+                conn.execute(text(sql))
+                print("ok")
+            except Exception as exc:
+                print(f"FAILED: {exc}")
+                raise
+    print("[migrate] done.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,8 @@ from config.database import get_db
 from src.schemas.cart import (
     AddToCartRequest, UpdateCartItemRequest,
     CartResponse, AddToCartResponse,
-    RemoveFromCartResponse, ClearCartResponse,CartItemResponse
+    RemoveFromCartResponse, ClearCartResponse,CartItemResponse,
+    CartSummary, CartItemsPatchRequest
 )
 from src.services.cart_service import CartService
 from src.models.customer import Customer
@@ -73,6 +74,27 @@ async def update_cart_item(
         db=db
     )
 
+@router.patch("/cart/items", response_model=CartResponse)
+async def patch_cart_items(
+    request: CartItemsPatchRequest,
+    current_user: Customer = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Add, set and remove several cart lines in one request.
+    
+    - Requires authentication
+    - Operations apply in order: `add` (quantity defaults to 1), `set`
+      (0 removes the line) and `remove`
+    - All or nothing: any missing product or stock shortage rejects the batch
+    - Returns the updated cart (cart merge at login, reorder)
+    """
+    return CartService.apply_operations(
+        customer_id=current_user.customer_id,
+        request=request,
+        db=db
+    )
+
 @router.delete("/cart/item/{product_id}", response_model=RemoveFromCartResponse)
 async def remove_from_cart(
     product_id: int,
@@ -117,14 +139,22 @@ async def get_cart_count(
     
     - Requires authentication
     - Returns total unique items and total quantity
+    - Served from the cart cache; no cart query when it is current
     """
-    cart = CartService.get_or_create_cart(current_user.customer_id, db)
-    cart_summary = CartService.get_cart_summary(cart.cart_id, db)
+    return CartService.get_cart_item_count(current_user.customer_id, db)
+
+@router.get("/cart/summary", response_model=CartSummary)
+async def get_cart_summary(
+    current_user: Customer = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get item count, quantity and total of the cart.
     
-    return {
-        "total_items": cart_summary.total_items,
-        "total_quantity": cart_summary.total_quantity
-    }
+    - Requires authentication
+    - Served from the cart cache; no cart query when it is current
+    """
+    return CartService.get_customer_cart_summary(current_user.customer_id, db)
 
 
 
@@ -508,93 +508,60 @@
 
 
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Response, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc
+from sqlalchemy import desc, func
 from typing import List, Optional
-from datetime import datetime, timedelta
-from decimal import Decimal
-import secrets
-import string
+from datetime import datetime
 
 from config.database import get_db
-from src.models.order import Order, OrderItem, PaymentStatus, PaymentMethod
-from src.models.product import Product
-from src.models.cart import CartItem, Cart
+from src.models.order import Order, OrderItem, PaymentMethod
 from src.models.address import CustomerAddress
 from src.models.customer import Customer
-from src.schemas.order import OrderCreate, OrderResponse, OrderListResponse, OrderCreateResponse
+from src.schemas.order import OrderCreate, OrderResponse, OrderCreateResponse, OrderSummary, OrderSummaryListResponse
+from src.models.product import Product
 from src.api.v1.auth import get_current_user
+from src.services.checkout import CheckoutService, CheckoutError, order_created_response
+from src.services.inventory import REASON_CANCEL
+from src.services.pagination import after_cursor, encode_cursor
+from src.services.vendor_stats import VendorStatsService
+from src.services.idempotency import IdempotencyService, IdempotencyError, DuplicateRequestError, MAX_KEY_LENGTH
+from src.services.payment import get_payment_service
 
 router = APIRouter()
 
 
-def get_product_price(product: Product) -> Decimal:
-    """Get the effective price for a product, handling the new pricing structure"""
-    if product.calculated_price is not None:
-        return Decimal(str(product.calculated_price)) / Decimal('100')  # Convert cents to dollars
-    elif product.base_price is not None:
-        return Decimal(str(product.base_price)) / Decimal('100')  # Convert cents to dollars
-    elif product.price is not None:
-        return product.price
-    else:
-        raise ValueError(f"Product {product.product_id} has no price set")
-
-
-def generate_order_number() -> str:
-    timestamp = datetime.now().strftime("%Y%m%d")
-    random_part = ''.join(secrets.choice(string.digits) for _ in range(6))
-    return f"ORD{timestamp}{random_part}"
-
-
-async def update_product_stock(db: Session, product_id: int, quantity: int):
-    product = db.query(Product).filter(Product.product_id == product_id).first()
-    if product:
-        if product.stock_quantity >= quantity:
-            product.stock_quantity -= quantity
-            db.commit()
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient stock for product {product.name}. Available: {product.stock_quantity}, Requested: {quantity}"
-            )
-
-
-async def clear_customer_cart(db: Session, customer_id: int):
-    """
-    Clear all cart items for a specific customer.
-    This function handles the case where CartItem doesn't have direct customer_id.
-    """
-    try:
-        # Find the customer's cart
-        cart = db.query(Cart).filter(Cart.customer_id == customer_id).first()
-        
-        if cart:
-            # Delete all items in the cart
-            deleted_count = db.query(CartItem).filter(
-                CartItem.cart_id == cart.cart_id
-            ).delete()
-            
-            db.commit()
-            print(f"Cleared {deleted_count} items from cart for customer {customer_id}")
-        else:
-            print(f"No cart found for customer {customer_id}")
-            
-    except Exception as e:
-        db.rollback()
-        print(f"Error clearing cart for customer {customer_id}: {str(e)}")
-        raise e
-
-
 @router.post("/orders", response_model=OrderCreateResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
     order_data: OrderCreate,
-    background_tasks: BackgroundTasks,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     customer: Customer = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     customer_id = customer.customer_id
 
+    if idempotency_key is not None and not (0 < len(idempotency_key) <= MAX_KEY_LENGTH):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"
+        )
+
+    # A retried request (same Idempotency-Key or same Razorpay payment) gets
+    # the original response back without touching the cart or stock.
+    payment_id = order_data.razorpay_payment_id if order_data.payment_method == PaymentMethod.RAZORPAY else None
+    idempotency_records = IdempotencyService.new_records(
+        customer_id, order_data.model_dump(mode="json"),
+        idempotency_key=idempotency_key, payment_id=payment_id
+    )
+    try:
+        replay = IdempotencyService.find_replay(db, idempotency_records)
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    if replay is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return OrderCreateResponse(**replay)
+
     delivery_address = db.query(CustomerAddress).filter(
         CustomerAddress.address_id == order_data.delivery_address_id,
         CustomerAddress.customer_id == customer_id,
@@ -607,21 +574,9 @@ async def create_order(
             detail="Delivery address not found"
         )
 
-    # Fixed: Join CartItem with Cart to access customer_id
-    cart_items = db.query(CartItem).options(
-        joinedload(CartItem.product)
-    ).join(Cart).filter(Cart.customer_id == customer_id).all()
-
-    if not cart_items:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cart is empty"
-        )
-
-    # Validate stock and collect price information
-    order_details = []
-    
-    # Verify Payment if Razorpay
+    # The signature check is a local HMAC; the payment method details need a
+    # gateway round trip, so the outbox worker fetches them after checkout.
+    payment_gateway_response = None
     if order_data.payment_method == PaymentMethod.RAZORPAY:
         if not all([order_data.razorpay_order_id, order_data.razorpay_payment_id, order_data.razorpay_signature]):
              raise HTTPException(
@@ -629,9 +584,7 @@ async def create_order(
                 detail="Missing Razorpay payment details"
             )
         try:
-            from src.services.payment import PaymentService
-            payment_service = PaymentService()
-            payment_service.verify_payment_signature(
+            get_payment_service().verify_payment_signature(
                 razorpay_order_id=order_data.razorpay_order_id,
                 razorpay_payment_id=order_data.razorpay_payment_id,
                 razorpay_signature=order_data.razorpay_signature
@@ -642,156 +595,119 @@ async def create_order(
                 detail=f"Payment verification failed: {str(e)}"
             )
 
-    for cart_item in cart_items:
-        if cart_item.product.stock_quantity < cart_item.quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient stock for {cart_item.product.name}. Available: {cart_item.product.stock_quantity}, Requested: {cart_item.quantity}"
-            )
-        
-        # Use price_at_time from cart (this is the price when item was added to cart)
-        # If price_at_time is None, fall back to current product price
-        if cart_item.price_at_time is not None:
-            item_price = cart_item.price_at_time
-        else:
-            try:
-                item_price = get_product_price(cart_item.product)
-            except ValueError as e:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=str(e)
-                )
-        
-        order_details.append({
-            'cart_item': cart_item,
-            'price': item_price,
-            'total': float(item_price) * cart_item.quantity
-        })
-
-    # Calculate order totals using the collected price information
-    # Calculate totals
-    subtotal = sum(detail['total'] for detail in order_details)
-    
-    # Standardized Logic:
-    # 1. Discount: 15% off MRP
-    discount_rate = 0.15
-    discount_amount = subtotal * discount_rate
-    
-    # 2. Tax: 18% GST on the discounted price (actual selling price)
-    tax_rate = 0.18
-    taxable_amount = subtotal - discount_amount
-    tax_amount = taxable_amount * tax_rate
-    
-    # 3. Shipping: Free if order value (after discount) > 499, else 40
-    shipping_amount = 0.0 if taxable_amount > 499 else 40.0
-    
-    # 4. Total Amount
-    total_amount = taxable_amount + tax_amount + shipping_amount
-
-    order_number = generate_order_number()
-    order = Order(
-        order_number=order_number,
-        customer_id=customer_id,
-        delivery_address_id=order_data.delivery_address_id,
-        subtotal=subtotal,
-        tax_amount=tax_amount,
-        shipping_amount=shipping_amount,
-        discount_amount=discount_amount,
-        total_amount=total_amount,
-        payment_method=order_data.payment_method,
-        special_instructions=order_data.special_instructions,
-        estimated_delivery_date=datetime.now() + timedelta(days=5)
-    )
+        payment_gateway_response = f"order_id:{order_data.razorpay_order_id}, signature:{order_data.razorpay_signature}"
 
-    if order_data.payment_method == PaymentMethod.RAZORPAY:
-        order.payment_status = PaymentStatus.PAID
-        order.payment_reference = order_data.razorpay_payment_id
-        
-        # Fetch detailed payment info to identify UPI, Card, etc.
-        payment_details_str = ""
+    # Locks the cart and its products, decrements stock, writes the order,
+    # its lines and its outbox events and empties the cart - one commit.
+    try:
+        order = CheckoutService.place_order(
+            db, customer_id, order_data,
+            payment_gateway_response=payment_gateway_response,
+            idempotency_records=idempotency_records
+        )
+    except DuplicateRequestError as e:
+        # A concurrent duplicate committed first; answer with its response
         try:
-            from src.services.payment import PaymentService
-            ps = PaymentService()
-            payment_info = ps.fetch_payment(order_data.razorpay_payment_id)
-            if payment_info:
-                method = payment_info.get('method', 'unknown')
-                payment_details_str = f", Method: {method.upper()}"
-                
-                # Add extra details if available
-                if method == 'card':
-                    card_network = payment_info.get('card', {}).get('network', '')
-                    if card_network:
-                        payment_details_str += f" ({card_network})"
-                elif method == 'upi':
-                    vpa = payment_info.get('vpa', '')
-                    if vpa:
-                        payment_details_str += f" ({vpa})"
-                elif method == 'netbanking':
-                     bank = payment_info.get('bank', '')
-                     if bank:
-                         payment_details_str += f" ({bank})"
-                         
-        except Exception as e:
-            print(f"Warning: Failed to fetch detailed payment info: {e}")
-
-        order.payment_gateway_response = f"order_id:{order_data.razorpay_order_id}, signature:{order_data.razorpay_signature}{payment_details_str}"
-
-    db.add(order)
-    db.flush()
-
-    # Create order items using the price information we collected
-    for detail in order_details:
-        cart_item = detail['cart_item']
-        item_price = detail['price']
-        
-        order_item = OrderItem(
-            order_id=order.order_id,
-            product_id=cart_item.product_id,
-            quantity=cart_item.quantity,
-            unit_price=float(item_price),
-            total_price=float(item_price) * cart_item.quantity,
-            product_name=cart_item.product.name,
-            product_description=cart_item.product.description
+            replay = IdempotencyService.find_replay(db, idempotency_records)
+        except IdempotencyError as conflict:
+            raise HTTPException(status_code=conflict.status_code, detail=str(conflict))
+        if replay is None:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        response.headers["Idempotent-Replayed"] = "true"
+        return OrderCreateResponse(**replay)
+    except CheckoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-        db.add(order_item)
-        await update_product_stock(db, cart_item.product_id, cart_item.quantity)
-
-    db.commit()
-    db.refresh(order)
 
-    background_tasks.add_task(clear_customer_cart, db, customer_id)
-
-    return OrderCreateResponse(
-        order_id=order.order_id,
-        order_number=order.order_number,
-        message="Order placed successfully!",
-        total_amount=order.total_amount
-    )
+    return OrderCreateResponse(**order_created_response(order))
 
 
-@router.get("/orders", response_model=OrderListResponse)
+@router.get("/orders", response_model=OrderSummaryListResponse)
 async def get_customer_orders(
-    page: int = 1,
-    size: int = 10,
+    cursor: Optional[str] = None,
+    size: int = Query(10, ge=1, le=100),
+    include_total: bool = False,
     customer: Customer = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    customer_id = customer.customer_id
-    offset = (page - 1) * size
+    """Newest orders first, one summary row each.
 
-    orders_query = db.query(Order).options(
-        joinedload(Order.order_items).joinedload(OrderItem.product),
-        joinedload(Order.delivery_address)
+    Keyset pagination on (created_at, order_id): pass `next_cursor` back as
+    `cursor` for the next page. Line items are only loaded by GET
+    /orders/{order_id}.
+    """
+    customer_id = customer.customer_id
+    try:
+        after = after_cursor(Order.created_at, Order.order_id, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    item_count = db.query(func.coalesce(func.sum(OrderItem.quantity), 0)).filter(
+        OrderItem.order_id == Order.order_id
+    ).correlate(Order).scalar_subquery()
+    first_item_id = db.query(func.min(OrderItem.order_item_id)).filter(
+        OrderItem.order_id == Order.order_id
+    ).correlate(Order).scalar_subquery()
+
+    query = db.query(
+        Order.order_id, Order.order_number, Order.order_status, Order.payment_status,
+        Order.payment_method, Order.order_date, Order.created_at, Order.estimated_delivery_date,
+        Order.subtotal, Order.total_amount,
+        item_count.label("item_count"), first_item_id.label("first_item_id")
     ).filter(Order.customer_id == customer_id)
-
-    total_count = orders_query.count()
-    orders = orders_query.order_by(desc(Order.created_at)).offset(offset).limit(size).all()
-
-    return OrderListResponse(
+    if after is not None:
+        query = query.filter(after)
+    # One extra row tells whether there is a next page
+    rows = query.order_by(desc(Order.created_at), desc(Order.order_id)).limit(size + 1).all()
+    has_more = len(rows) > size
+    rows = rows[:size]
+
+    first_items = {}
+    first_ids = [row.first_item_id for row in rows if row.first_item_id is not None]
+    if first_ids:
+        first_items = {
+            item_id: (name, image) for item_id, name, image in db.query(
+                OrderItem.order_item_id, OrderItem.product_name, Product.primary_image_url
+            ).outerjoin(Product, Product.product_id == OrderItem.product_id).filter(
+                OrderItem.order_item_id.in_(first_ids)
+            )
+        }
+
+    orders = []
+    for row in rows:
+        name, image = first_items.get(row.first_item_id, (None, None))
+        orders.append(OrderSummary(
+            order_id=row.order_id,
+            order_number=row.order_number,
+            order_status=row.order_status,
+            payment_status=row.payment_status,
+            payment_method=row.payment_method,
+            order_date=row.order_date,
+            created_at=row.created_at,
+            estimated_delivery_date=row.estimated_delivery_date,
+            subtotal=row.subtotal,
+            total_amount=row.total_amount,
+            item_count=int(row.item_count or 0),
+            first_item_name=name,
+            first_item_image=image
+        ))
+
+    total_count = None
+    if include_total:
+        # Plain count on orders - no joins
+        total_count = db.query(func.count(Order.order_id)).filter(Order.customer_id == customer_id).scalar()
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].order_id)
+
+    return OrderSummaryListResponse(
         orders=orders,
-        total_count=total_count,
-        page=page,
-        size=size
+        next_cursor=next_cursor,
+        size=size,
+        total_count=total_count
     )
 
 
@@ -828,10 +744,12 @@ async def cancel_order(
 ):
     customer_id = customer.customer_id
 
+    # Lock the order so two concurrent cancels cannot both pass the status
+    # check and restock twice; the second one waits and sees "cancelled".
     order = db.query(Order).filter(
         Order.order_id == order_id,
         Order.customer_id == customer_id
-    ).first()
+    ).with_for_update().populate_existing().first()
 
     if not order:
         raise HTTPException(
@@ -848,12 +766,12 @@ async def cancel_order(
     order.order_status = "cancelled"
     order.cancelled_date = datetime.now()
 
-    # Restore stock
-    order_items = db.query(OrderItem).filter(OrderItem.order_id == order_id).all()
-    for item in order_items:
-        product = db.query(Product).filter(Product.product_id == item.product_id).first()
-        if product:
-            product.stock_quantity += item.quantity
+    # Restore stock: one batched UPDATE plus ledger rows
+    quantities = dict(db.query(OrderItem.product_id, func.sum(OrderItem.quantity)).filter(
+        OrderItem.order_id == order_id
+    ).group_by(OrderItem.product_id).all())
+    CheckoutService.restore_stock(db, quantities, REASON_CANCEL, order_id=order_id)
+    VendorStatsService.mark_orders(db, [order_id])
 
     db.commit()
 
@@ -899,6 +817,7 @@ async def return_order(
         )
 
     order.order_status = "return_requested"
+    VendorStatsService.mark_orders(db, [order_id])
     db.commit()
 
     return {"message": "Return request submitted successfully", "order_id": order_id}
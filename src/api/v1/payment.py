@@ -1,43 +1,72 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from config.database import get_db
-from src.services.payment import PaymentService
+from src.models.cart import Cart, CartItem
+from src.models.inventory import InventoryHold
+from src.services.payment import get_payment_service
+from src.services.inventory import InventoryService, StockUnavailableError
 from src.schemas.payment import PaymentOrderCreate, PaymentOrderResponse, PaymentVerify
 from src.models.customer import Customer
 from src.api.v1.auth import get_current_user
 import os
 
 router = APIRouter()
-payment_service = PaymentService()
 
 @router.post("/create-order", response_model=PaymentOrderResponse)
 async def create_payment_order(
     order_data: PaymentOrderCreate,
-    current_user: Customer = Depends(get_current_user)
+    current_user: Customer = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """
     Create a Razorpay order id for the frontend to initialize payment.
+
+    The cart's quantities are held for the customer first (see
+    InventoryService.place_holds), so stock that runs out while they pay
+    fails here, before any money moves, rather than at POST /orders.
     """
+    customer_id = current_user.customer_id
+    quantities = dict(db.query(CartItem.product_id, func.sum(CartItem.quantity)).join(
+        Cart, Cart.cart_id == CartItem.cart_id
+    ).filter(Cart.customer_id == customer_id).group_by(CartItem.product_id).all())
+    try:
+        holds = InventoryService.place_holds(db, customer_id, quantities)
+        db.commit()
+    except StockUnavailableError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
     try:
         # Create Razorpay order
         # Amount in frontend is usually in standard units (INR), service converts to paise
-        order = payment_service.create_order(
+        order = await run_in_threadpool(
+            get_payment_service().create_order,
             amount=order_data.amount,
             currency=order_data.currency,
             notes={"customer_id": current_user.customer_id}
         )
-        
-        return {
-            **order,
-            "key_id": os.getenv('RAZORPAY_KEY_ID')
-        }
     except Exception as e:
+        InventoryService.release_holds(db, customer_id)
+        db.commit()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
+    if holds:
+        db.query(InventoryHold).filter(InventoryHold.customer_id == customer_id).update(
+            {InventoryHold.razorpay_order_id: order["id"]}, synchronize_session=False
+        )
+        db.commit()
+
+    return {
+        **order,
+        "key_id": os.getenv('RAZORPAY_KEY_ID')
+    }
+
 @router.post("/verify")
 async def verify_payment(
     payment_data: PaymentVerify,
@@ -47,11 +76,11 @@ async def verify_payment(
     Verify payment signature from Razorpay.
     """
     try:
-        payment_service.client.utility.verify_payment_signature({
-            'razorpay_order_id': payment_data.razorpay_order_id,
-            'razorpay_payment_id': payment_data.razorpay_payment_id,
-            'razorpay_signature': payment_data.razorpay_signature
-        })
+        get_payment_service().verify_payment_signature(
+            razorpay_order_id=payment_data.razorpay_order_id,
+            razorpay_payment_id=payment_data.razorpay_payment_id,
+            razorpay_signature=payment_data.razorpay_signature
+        )
         return {"status": "success", "message": "Payment verified successfully"}
     except Exception as e:
         raise HTTPException(
@@ -12,6 +12,10 @@ from src.schemas.product import ProductResponse, ProductListResponse
 from src.services.pricing_service import PricingService
 from src.services.file_service import FileService
 from src.services.product_service import ProductService
+from src.services.inventory import InventoryService
+from src.services.vendor_stats import VendorStatsService
+from src.services.cart_repricing import CartRepricingService
+from src.services.price_engine import PriceEngine, NO_PRICE
 from src.api.v1.vender_auth import get_current_user_optional
 import json
 import logging
@@ -24,17 +28,6 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-def _compute_discounted_price(product: Product) -> int:
-    """Apply discount_percent to the best-available price. Returns cents."""
-    base = product.calculated_price if product.calculated_price is not None else product.base_price
-    if base is None:
-        return 0
-    pct = product.discount_percent or 0
-    if pct <= 0:
-        return int(base)
-    return int(round(base * (100 - pct) / 100))
-
-
 # Your existing create_product endpoint remains unchanged
 @router.post("/products", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
@@ -121,10 +114,16 @@ async def create_product(
         # client sent in the form field.
         if current_vendor is not None:
             final_created_by = current_vendor.vendor_ph_no
-        elif sales_user and created_by == "admin":
-            final_created_by = sales_user
+            final_vendor_id = current_vendor.vendor_id
         else:
-            final_created_by = created_by
+            if sales_user and created_by == "admin":
+                final_created_by = sales_user
+            else:
+                final_created_by = created_by
+            # Admin listing on a vendor's behalf (created_by = their phone number)
+            final_vendor_id = db.query(Vendor.vendor_id).filter(
+                Vendor.vendor_ph_no == final_created_by
+            ).scalar()
 
         # Create product with validated data
         product = Product(
@@ -139,6 +138,7 @@ async def create_product(
             group_id=final_group_id,
             discount_percent=discount_percent_int,
             created_by=final_created_by,
+            vendor_id=final_vendor_id,
             is_active=is_active_bool
         )
         
@@ -162,6 +162,7 @@ async def create_product(
         db.add(product)
         db.flush()  # This assigns the product_id without committing
         logger.info(f"Product created with ID: {product.product_id}")
+        VendorStatsService.mark_products(db, [product.product_id])
         
         # Handle image uploads using your existing FileService
         if images and len(images) > 0:
@@ -247,7 +248,7 @@ async def create_product(
             "base_price": product_with_relations.base_price,
             "calculated_price": product_with_relations.calculated_price,
             "discount_percent": product_with_relations.discount_percent or 0,
-            "discounted_price": _compute_discounted_price(product_with_relations),
+            "discounted_price": PriceEngine.price(product_with_relations),
             "stock_quantity": product_with_relations.stock_quantity,
             "sku": product_with_relations.sku,
             "is_active": product_with_relations.is_active,
@@ -288,27 +289,11 @@ async def get_product_filters(
     """
     Get dynamic filters based on available product specifications.
     Returns a dictionary like: {"Color": ["Red", "Blue"], "Size": ["S", "M"]}
+
+    Every spec key with its raw values, whether or not it has a template;
+    typed, per-count spec facets come with search results instead.
     """
-    query = db.query(Product.specifications).filter(Product.is_active == True)
-    
-    if category_id:
-        query = query.filter(Product.category_id == category_id)
-    if subcategory_id:
-        query = query.filter(Product.subcategory_id == subcategory_id)
-        
-    products_specs = query.all()
-    
-    # Aggregate filters
-    filters = {}
-    for (specs,) in products_specs:
-        if specs and isinstance(specs, dict):
-            for key, value in specs.items():
-                if key not in filters:
-                    filters[key] = set()
-                filters[key].add(str(value))
-                
-    # Convert sets to sorted lists
-    return {k: sorted(list(v)) for k, v in filters.items()}
+    return ProductService(db).get_spec_filters(category_id, subcategory_id)
 
 # UPDATED: Enhanced get_products endpoint with proper price and sort filtering
 @router.get("/products", response_model=ProductListResponse)
@@ -418,10 +403,7 @@ async def get_products(
         
         # Convert products to response format
         product_responses = []
-        for product in products:
-            # Calculate display price (convert cents to rupees)
-            display_price = (product.calculated_price or product.base_price or 0) / 100
-            
+        for product, discounted in zip(products, PriceEngine.price_many(products)):
             response_data = {
                 "product_id": product.product_id,
                 "name": product.name,
@@ -432,7 +414,7 @@ async def get_products(
                 "base_price": product.base_price,
                 "calculated_price": product.calculated_price,
                 "discount_percent": product.discount_percent or 0,
-                "discounted_price": _compute_discounted_price(product),
+                "discounted_price": discounted if discounted != NO_PRICE else None,
                 "stock_quantity": product.stock_quantity,
                 "sku": product.sku,
                 # "group_id": product.group_id, # Can add if needed in list view
@@ -608,10 +590,11 @@ async def update_product(
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
 
-        if current_vendor is not None and product.created_by != current_vendor.vendor_ph_no:
+        if current_vendor is not None and product.vendor_id != current_vendor.vendor_id:
             raise HTTPException(status_code=404, detail="Product not found")
 
         logger.info(f"Updating product {product_id}")
+        price_before = CartRepricingService.price_fields(product)
         
         # Update fields if provided
         if name is not None:
@@ -657,9 +640,16 @@ async def update_product(
 
         if stock_quantity is not None:
             try:
-                product.stock_quantity = int(stock_quantity)
+                new_stock = int(stock_quantity)
             except (ValueError, TypeError):
                  raise HTTPException(status_code=400, detail="Invalid stock_quantity format")
+            if new_stock < 0:
+                raise HTTPException(status_code=400, detail="stock_quantity cannot be negative")
+            # Logged to the inventory ledger as a manual adjustment
+            InventoryService.set_stock(
+                db, product_id, new_stock,
+                actor=current_vendor.vendor_ph_no if current_vendor is not None else None
+            )
 
         if discount_percent is not None:
             try:
@@ -699,6 +689,10 @@ async def update_product(
             logger.warning(f"Price recalc failed: {e}")
             product.calculated_price = product.base_price
 
+        # Carts holding the product are repriced after commit
+        if CartRepricingService.price_fields(product) != price_before:
+            CartRepricingService.mark_products(db, [product.product_id])
+
         # Handle new images
         if images and len(images) > 0:
             valid_images = [img for img in images if img.filename and img.filename.strip()]
@@ -762,7 +756,7 @@ async def update_product(
             "base_price": product_with_relations.base_price,
             "calculated_price": product_with_relations.calculated_price,
             "discount_percent": product_with_relations.discount_percent or 0,
-            "discounted_price": _compute_discounted_price(product_with_relations),
+            "discounted_price": PriceEngine.price(product_with_relations),
             "stock_quantity": product_with_relations.stock_quantity,
             "sku": product_with_relations.sku,
             "group_id": product_with_relations.group_id,
@@ -807,7 +801,7 @@ async def delete_product_image(
         if current_vendor is not None:
             owning_product = db.query(Product).filter(
                 Product.product_id == product_id,
-                Product.created_by == current_vendor.vendor_ph_no,
+                Product.vendor_id == current_vendor.vendor_id,
             ).first()
             if not owning_product:
                 raise HTTPException(status_code=404, detail="Image not found")
@@ -200,7 +200,17 @@ import logging
 import json
 
 from config.database import get_db
+from config.settings import settings
 from src.services.search import ElasticsearchService
+from src.search.backends import get_search_backend
+from src.search.indexer import index_queue
+from src.search.cache import search_cache
+from src.search.suggestions import suggestion_index
+from src.search.breaker import es_breaker
+from src.search.specs import parse_spec_filters
+from src.search.popularity import popularity_job
+from src.models.search_click import SearchClick
+from src.search.reindex import reindex_jobs, INDEX_ALIAS
 from src.models.product import Product
 
 # Set up detailed logging
@@ -239,12 +249,18 @@ async def search_products(
     sort_by: str = Query('relevance', description="Sort by: relevance, price_low, price_high, newest, popularity"),
     page: int = Query(1, ge=1, description="Page number"),
     size: int = Query(20, ge=1, le=100, description="Number of results per page"),
+    spec: Optional[List[str]] = Query(None, description="Spec filter, repeatable: Size:M, RAM:8GB, RAM:4..16"),
     debug: bool = Query(False, description="Enable debug mode for detailed logging"),
     db: Session = Depends(get_db)
 ):
     """
     Advanced product search with filters and facets
     """
+    try:
+        spec_filters = parse_spec_filters(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         # Log the incoming search request
         search_params = {
@@ -255,6 +271,7 @@ async def search_products(
             "max_price": max_price,
             "brand": brand,
             "in_stock_only": in_stock_only,
+            "spec_filters": spec_filters,
             "sort_by": sort_by,
             "page": page,
             "size": size
@@ -267,76 +284,16 @@ async def search_products(
         print(f"🔧 Parameters: {json.dumps(search_params, indent=2)}")
         print("="*80)
         
-        # Check if Elasticsearch is available
-        if not ElasticsearchService.is_available():
-            print("⚠️ Elasticsearch is not available - falling back to Database Search")
-            
-            # SQL Fallback Implementation
-            query = db.query(Product).filter(
-                (Product.name.ilike(f"%{q}%")) | 
-                (Product.description.ilike(f"%{q}%"))
-            )
-            
-            if category_id:
-                query = query.filter(Product.category_id == category_id)
-            if subcategory_id:
-                query = query.filter(Product.subcategory_id == subcategory_id)
-            if min_price:
-                query = query.filter(Product.price >= min_price)
-            if max_price:
-                query = query.filter(Product.price <= max_price)
-            if in_stock_only:
-                query = query.filter(Product.stock_quantity > 0)
-                
-            # Count total before pagination
-            total = query.count()
-            
-            # Apply sorting
-            if sort_by == 'price_low':
-                query = query.order_by(Product.price.asc())
-            elif sort_by == 'price_high':
-                query = query.order_by(Product.price.desc())
-            elif sort_by == 'newest':
-                query = query.order_by(Product.created_at.desc())
-            
-            # Apply pagination
-            products = query.offset((page - 1) * size).limit(size).all()
-            
-            # Format results
-            product_list = []
-            for p in products:
-                # Calculate effective price logic if needed, simplify for fallback
-                price = getattr(p, 'calculated_price', None) or getattr(p, 'base_price', None) or p.price
-                if price and hasattr(p, 'calculated_price') and p.calculated_price: price = price / 100
-                elif price and hasattr(p, 'base_price') and p.base_price: price = price / 100
-                
-                product_list.append({
-                    "product_id": p.product_id,
-                    "name": p.name,
-                    "description": p.description,
-                    "price": float(price) if price else 0.0,
-                    "category_name": p.category.name if p.category else None,
-                    "subcategory_name": p.subcategory.name if p.subcategory else None,
-                    "brand": None, # Complex to extract from specs in fallback
-                    "stock_quantity": p.stock_quantity,
-                    "primary_image_url": p.primary_image_url,
-                    "sku": p.sku,
-                    "score": 1.0 # Dummy score
-                })
-
-            return SearchResponse(
-                products=product_list,
-                total=total,
-                page=page,
-                size=size,
-                total_pages=(total + size - 1) // size if size > 0 else 0,
-                facets={},
-                took=0
-            )
+        # Configured backend (SEARCH_BACKEND); Elasticsearch falls back to
+        # Postgres full-text search while the cluster is down.
+        backend = get_search_backend()
+        if backend.name != settings.search_backend:
+            print(f"⚠️ {settings.search_backend} is not available - falling back to {backend.name} search")
         
         # Perform the search
-        print("🚀 Executing Elasticsearch search...")
-        result = ElasticsearchService.search_products(
+        print(f"🚀 Executing {backend.name} search...")
+        result = await backend.search_async(
+            db,
             query=q,
             category_id=category_id,
             subcategory_id=subcategory_id,
@@ -346,12 +303,13 @@ async def search_products(
             in_stock_only=in_stock_only,
             sort_by=sort_by,
             page=page,
-            size=size
+            size=size,
+            spec_filters=spec_filters
         )
         
         # Print detailed results
         print("\n" + "="*80)
-        print("📊 ELASTICSEARCH SEARCH RESULTS")
+        print(f"📊 {backend.name.upper()} SEARCH RESULTS")
         print("="*80)
         print(f"📈 Total Results Found: {result.get('total', 0)}")
         print(f"⏱️  Search Time: {result.get('took', 0)}ms")
@@ -399,6 +357,10 @@ async def search_products(
                 print("💰 Price Ranges:")
                 for price_range in facets['price_ranges']:
                     print(f"   - ${price_range['range']} ({price_range['count']} products)")
+            
+            for spec_name, spec_facet in facets.get('specifications', {}).items():
+                values = ", ".join(f"{v['value']} ({v['count']})" for v in spec_facet['values'])
+                print(f"🔧 {spec_name}: {values}")
         
         print("="*80 + "\n")
         
@@ -416,6 +378,26 @@ async def search_products(
         logger.error(f"Search failed for query '{q}': {str(e)}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+class SearchClickRequest(BaseModel):
+    product_id: int
+    query: Optional[str] = None
+    position: Optional[int] = None
+
+@router.post("/search/click", status_code=202)
+async def record_search_click(click: SearchClickRequest, db: Session = Depends(get_db)):
+    """
+    Record a click on a search result (feeds the popularity score)
+    """
+    if db.get(Product, click.product_id) is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    db.add(SearchClick(
+        product_id=click.product_id,
+        query=(click.query or '')[:255] or None,
+        position=click.position
+    ))
+    db.commit()
+    return {"status": "recorded"}
+
 @router.get("/search/suggestions")
 async def get_search_suggestions(
     q: str = Query(..., min_length=2, description="Search query (minimum 2 characters)"),
@@ -428,27 +410,7 @@ async def get_search_suggestions(
     try:
         print(f"\n🔍 GETTING SUGGESTIONS for: '{q}'")
         
-        if not ElasticsearchService.is_available():
-            print("⚠️ Elasticsearch not available - falling back to DB Suggestions")
-            
-            # SQL Fallback
-            products = db.query(Product).filter(
-                Product.name.ilike(f"%{q}%")
-            ).limit(size * 3).all()  # Fetch more to allow for deduplication
-            
-            # Deduplicate names while preserving order
-            seen = set()
-            suggestions = []
-            for p in products:
-                if p.name not in seen:
-                    seen.add(p.name)
-                    suggestions.append(p.name)
-                    if len(suggestions) >= size:
-                        break
-            
-            return {"suggestions": suggestions}
-        
-        suggestions = ElasticsearchService.get_search_suggestions(q, size)
+        suggestions = await get_search_backend().suggest_async(db, q, size)
         
         print(f"💡 Found {len(suggestions)} suggestions:")
         for i, suggestion in enumerate(suggestions, 1):
@@ -461,47 +423,43 @@ async def get_search_suggestions(
         logger.error(f"Suggestions failed for query '{q}': {str(e)}")
         raise HTTPException(status_code=500, detail=f"Suggestions failed: {str(e)}")
 
-@router.post("/search/reindex")
+@router.post("/search/reindex", status_code=202)
 async def reindex_products(db: Session = Depends(get_db)):
     """
-    Reindex all products with detailed progress logging
+    Start a zero-downtime reindex.
+
+    A new versioned index is built in the background while searches keep
+    hitting the current one; the `ecommerce_products` alias is swapped when
+    the build finishes. Poll GET /search/reindex/{job_id} for progress.
     """
     try:
-        print("\n" + "="*80)
-        print("🔄 STARTING ELASTICSEARCH REINDEXING")
-        print("="*80)
-        
         if not ElasticsearchService.is_available():
             print("❌ Elasticsearch not available for reindexing")
             return {"error": "Elasticsearch not available"}
         
-        # Get product count first
-        total_products = db.query(Product).filter(Product.is_active == True).count()
-        print(f"📊 Total active products to index: {total_products}")
-        
-        result = ElasticsearchService.reindex_all_products(db)
-        
-        print("\n📈 REINDEXING RESULTS:")
-        print(f"   ✅ Successfully indexed: {result.get('success', 0)}")
-        print(f"   ❌ Errors: {result.get('errors', 0)}")
-        print(f"   📦 Total processed: {result.get('total', 0)}")
-        
-        if result.get('success', 0) > 0:
-            print("🎉 Reindexing completed successfully!")
-        else:
-            print("⚠️  Reindexing had issues. Check the logs.")
-        
-        print("="*80 + "\n")
+        job = reindex_jobs.start()
+        print(f"🔄 Reindex job {job.job_id} is {job.status}")
         
         return {
-            "message": "Reindexing completed",
-            "result": result
+            "message": "Reindexing started",
+            "job_id": job.job_id,
+            "job": job.to_dict()
         }
     except Exception as e:
         print(f"❌ REINDEXING ERROR: {str(e)}")
         logger.error(f"Reindexing failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Reindexing failed: {str(e)}")
 
+@router.get("/search/reindex/{job_id}")
+async def get_reindex_status(job_id: str):
+    """
+    Progress of a reindex job started with POST /search/reindex
+    """
+    job = reindex_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Reindex job not found")
+    return job.to_dict()
+
 @router.get("/search/debug")
 async def debug_search_status():
     """
@@ -523,11 +481,13 @@ async def debug_search_status():
             # Try to get index info
             try:
                 from config.elasticsearch import es_client
-                index_exists = es_client.indices.exists(index='ecommerce_products')
+                index_exists = es_client.indices.exists(index=INDEX_ALIAS)
                 status["index_exists"] = index_exists
                 
                 if index_exists:
-                    doc_count = es_client.count(index='ecommerce_products')
+                    if es_client.indices.exists_alias(name=INDEX_ALIAS):
+                        status["alias_targets"] = list(es_client.indices.get_alias(name=INDEX_ALIAS).keys())
+                    doc_count = es_client.count(index=INDEX_ALIAS)
                     status["document_count"] = doc_count['count']
                     print(f"📊 Index exists with {doc_count['count']} documents")
                 else:
@@ -558,7 +518,14 @@ async def search_health():
     """
     return {
         "elasticsearch_available": ElasticsearchService.is_available(),
-        "status": "healthy" if ElasticsearchService.is_available() else "elasticsearch_unavailable"
+        "backend": settings.search_backend,
+        "serving_backend": get_search_backend().name,
+        "status": "healthy" if ElasticsearchService.is_available() else "elasticsearch_unavailable",
+        "indexing": index_queue.metrics(),
+        "cache": search_cache.metrics(),
+        "suggestions": suggestion_index.metrics(),
+        "breaker": es_breaker.metrics(),
+        "popularity": popularity_job.metrics()
     }
 
 @router.post("/search/test")
@@ -4,16 +4,17 @@ import os
 import requests
 import json
 from urllib.parse import quote
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from typing import List, Optional
 
-from sqlalchemy import func
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
 
 from config.database import get_db
-from src.models.order import Order, OrderItem, OrderStatus
-from src.models.product import Product
+from src.models.customer import Customer
+from src.models.order import Order, OrderItem
 from src.models.vendor import Vendor
+from src.models.vendor_stats import VendorDailyStats
 from src.api.v1.vender_auth import get_current_user as get_current_vendor
 
 router = APIRouter()
@@ -88,130 +89,155 @@ class RecentOrderItem(BaseModel):
     created_at: datetime
 
 
+class DailyStatPoint(BaseModel):
+    date: date
+    orders: int
+    cancelled: int
+    revenue: float
+    units_sold: int
+
+
 class VendorSummaryResponse(BaseModel):
     orders: OrderSummary
     products: ProductSummary
     recent_orders: List[RecentOrderItem]
+    # Only when date_from/date_to is given; one point per day, zeros included
+    series: List[DailyStatPoint] = []
+
+
+MAX_SERIES_DAYS = 366
+RECENT_ORDERS = 5
+
+
+def _recent_orders(db: Session, vendor_id: int) -> List[RecentOrderItem]:
+    """Latest orders with a line of this vendor's, with the vendor's subtotal"""
+    # Newest lines straight off ix_order_items_vendor_created; a handful is
+    # enough to find the latest distinct orders
+    recent_ids = []
+    for (order_id,) in db.query(OrderItem.order_id).filter(
+        OrderItem.vendor_id == vendor_id
+    ).order_by(OrderItem.created_at.desc(), OrderItem.order_id.desc()).limit(RECENT_ORDERS * 10):
+        if order_id not in recent_ids:
+            recent_ids.append(order_id)
+        if len(recent_ids) == RECENT_ORDERS:
+            break
+    if not recent_ids:
+        return []
+
+    rows = db.query(
+        Order.order_id, Order.order_number, Order.customer_id, Customer.customer_name,
+        Order.order_status, Order.payment_status, Order.created_at,
+        func.coalesce(func.sum(OrderItem.total_price), 0)
+    ).join(OrderItem, OrderItem.order_id == Order.order_id).outerjoin(
+        Customer, Customer.customer_id == Order.customer_id
+    ).filter(
+        Order.order_id.in_(recent_ids),
+        OrderItem.vendor_id == vendor_id
+    ).group_by(
+        Order.order_id, Order.order_number, Order.customer_id, Customer.customer_name,
+        Order.order_status, Order.payment_status, Order.created_at
+    ).order_by(Order.created_at.desc(), Order.order_id.desc())
+
+    return [
+        RecentOrderItem(
+            id=order_id,
+            order_number=order_number,
+            customer_name=customer_name or f"Customer #{customer_id}",
+            status=order_status,
+            payment_status=payment_status.value if payment_status else None,
+            total_amount=float(vendor_subtotal),
+            created_at=created_at,
+        )
+        for order_id, order_number, customer_id, customer_name, order_status, payment_status,
+            created_at, vendor_subtotal in rows
+    ]
 
 
 @router.get('/summary', response_model=VendorSummaryResponse)
 def get_vendor_summary(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
     current_vendor: Vendor = Depends(get_current_vendor),
     db: Session = Depends(get_db),
 ):
-    """Aggregate counts, revenue, and the latest orders for the signed-in vendor."""
-    vendor_identifier = current_vendor.vendor_ph_no
-
-    # --- Orders: counts per status (distinct orders, since an order can hold
-    # many of this vendor's items) ---
-    base_orders_q = (
-        db.query(Order.order_id, Order.order_status)
-        .join(OrderItem, OrderItem.order_id == Order.order_id)
-        .join(Product, Product.product_id == OrderItem.product_id)
-        .filter(Product.created_by == vendor_identifier)
-        .distinct()
-    )
-    rows = base_orders_q.all()
-    counts = {
-        'total': len(rows),
-        'pending': 0, 'processing': 0, 'shipped': 0,
-        'delivered': 0, 'cancelled': 0,
-    }
-    for _, s in rows:
-        key = s.value if hasattr(s, 'value') else str(s or '').lower()
-        if key in counts:
-            counts[key] += 1
-
-    # --- Revenue: sum of line totals for this vendor's items on non-cancelled orders ---
-    revenue_total_q = (
-        db.query(func.coalesce(func.sum(OrderItem.total_price), 0))
-        .join(Product, Product.product_id == OrderItem.product_id)
-        .join(Order, Order.order_id == OrderItem.order_id)
-        .filter(
-            Product.created_by == vendor_identifier,
-            Order.order_status != OrderStatus.CANCELLED,
-        )
-    )
-    revenue_total = float(revenue_total_q.scalar() or 0)
-
-    month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    revenue_month_q = (
-        db.query(func.coalesce(func.sum(OrderItem.total_price), 0))
-        .join(Product, Product.product_id == OrderItem.product_id)
-        .join(Order, Order.order_id == OrderItem.order_id)
-        .filter(
-            Product.created_by == vendor_identifier,
-            Order.order_status != OrderStatus.CANCELLED,
-            Order.created_at >= month_start,
-        )
-    )
-    revenue_this_month = float(revenue_month_q.scalar() or 0)
-
-    # --- Products ---
-    products_total = db.query(func.count(Product.product_id)).filter(
-        Product.created_by == vendor_identifier
-    ).scalar() or 0
-    products_low = db.query(func.count(Product.product_id)).filter(
-        Product.created_by == vendor_identifier,
-        Product.stock_quantity > 0,
-        Product.stock_quantity <= 5,
-    ).scalar() or 0
-    products_out = db.query(func.count(Product.product_id)).filter(
-        Product.created_by == vendor_identifier,
-        Product.stock_quantity == 0,
-    ).scalar() or 0
-
-    # --- Recent orders (distinct, last 5 by created_at) ---
-    recent_query = (
-        db.query(Order)
-        .join(OrderItem, OrderItem.order_id == Order.order_id)
-        .join(Product, Product.product_id == OrderItem.product_id)
-        .filter(Product.created_by == vendor_identifier)
-        .options(
-            joinedload(Order.order_items).joinedload(OrderItem.product),
-            joinedload(Order.customer),
-        )
-        .distinct()
-        .order_by(Order.created_at.desc())
-        .limit(5)
-    )
-
-    recent = []
-    for order in recent_query.all():
-        vendor_subtotal = sum(
-            (item.total_price or 0)
-            for item in order.order_items
-            if item.product and item.product.created_by == vendor_identifier
-        )
-        customer_name = (
-            order.customer.customer_name if order.customer and order.customer.customer_name
-            else f"Customer #{order.customer_id}"
-        )
-        recent.append(RecentOrderItem(
-            id=order.order_id,
-            order_number=order.order_number,
-            customer_name=customer_name,
-            status=order.order_status,
-            payment_status=order.payment_status.value if order.payment_status else None,
-            total_amount=float(vendor_subtotal),
-            created_at=order.created_at,
-        ))
+    """Counts, revenue, stock buckets and the latest orders for the signed-in vendor.
+
+    Totals come from the vendor_daily_stats rollup (src/services/vendor_stats.py),
+    not from the orders themselves. With date_from and/or date_to (inclusive;
+    date_to defaults to today, date_from to 29 days before date_to) the
+    response also carries a daily series for that range.
+    """
+    vendor_id = current_vendor.vendor_id
+    month_start = date.today().replace(day=1)
+
+    # --- Orders and revenue: one pass over the vendor's rollup rows ---
+    stats = db.query(
+        func.coalesce(func.sum(VendorDailyStats.orders_total), 0),
+        func.coalesce(func.sum(VendorDailyStats.orders_pending), 0),
+        func.coalesce(func.sum(VendorDailyStats.orders_processing), 0),
+        func.coalesce(func.sum(VendorDailyStats.orders_shipped), 0),
+        func.coalesce(func.sum(VendorDailyStats.orders_delivered), 0),
+        func.coalesce(func.sum(VendorDailyStats.orders_cancelled), 0),
+        func.coalesce(func.sum(VendorDailyStats.revenue), 0),
+        func.coalesce(func.sum(case(
+            (VendorDailyStats.stat_date >= month_start, VendorDailyStats.revenue), else_=0
+        )), 0),
+    ).filter(VendorDailyStats.vendor_id == vendor_id).one()
+    total, pending, processing, shipped, delivered, cancelled, revenue_total, revenue_this_month = stats
+
+    # --- Products: latest stock snapshot ---
+    snapshot = db.query(
+        VendorDailyStats.products_total,
+        VendorDailyStats.products_low_stock,
+        VendorDailyStats.products_out_of_stock,
+    ).filter(
+        VendorDailyStats.vendor_id == vendor_id,
+        VendorDailyStats.products_total.isnot(None)
+    ).order_by(VendorDailyStats.stat_date.desc()).first() or (0, 0, 0)
+
+    # --- Daily series ---
+    series = []
+    if date_from is not None or date_to is not None:
+        end = date_to or date.today()
+        start = date_from or end - timedelta(days=29)
+        if start > end:
+            raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+        if (end - start).days >= MAX_SERIES_DAYS:
+            raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_SERIES_DAYS} days")
+        by_day = {
+            row.stat_date: row for row in db.query(VendorDailyStats).filter(
+                VendorDailyStats.vendor_id == vendor_id,
+                VendorDailyStats.stat_date >= start,
+                VendorDailyStats.stat_date <= end
+            )
+        }
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            row = by_day.get(day)
+            series.append(DailyStatPoint(
+                date=day,
+                orders=row.orders_total if row else 0,
+                cancelled=row.orders_cancelled if row else 0,
+                revenue=float(row.revenue) if row else 0.0,
+                units_sold=row.units_sold if row else 0,
+            ))
 
     return VendorSummaryResponse(
         orders=OrderSummary(
-            total=counts['total'],
-            pending=counts['pending'],
-            processing=counts['processing'],
-            shipped=counts['shipped'],
-            delivered=counts['delivered'],
-            cancelled=counts['cancelled'],
-            revenue_total=revenue_total,
-            revenue_this_month=revenue_this_month,
+            total=int(total),
+            pending=int(pending),
+            processing=int(processing),
+            shipped=int(shipped),
+            delivered=int(delivered),
+            cancelled=int(cancelled),
+            revenue_total=float(revenue_total),
+            revenue_this_month=float(revenue_this_month),
         ),
         products=ProductSummary(
-            total=int(products_total),
-            low_stock=int(products_low),
-            out_of_stock=int(products_out),
+            total=int(snapshot[0] or 0),
+            low_stock=int(snapshot[1] or 0),
+            out_of_stock=int(snapshot[2] or 0),
         ),
-        recent_orders=recent,
+        recent_orders=_recent_orders(db, vendor_id),
+        series=series,
     )
@@ -1,17 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import desc, func
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+import csv
+import io
 
-from config.database import get_db
+from config.database import get_db, SessionLocal
+from src.models.customer import Customer
 from src.models.order import Order, OrderItem, OrderStatus
 from src.models.product import Product
 from src.models.vendor import Vendor
 from src.api.v1.vender_auth import get_current_user as get_current_vendor
+from src.services.checkout import CheckoutService
+from src.services.inventory import REASON_CANCEL, REASON_RETURN
+from src.services.pagination import after_cursor, encode_cursor
+from src.services.vendor_stats import VendorStatsService
 from pydantic import BaseModel, field_validator
 
 router = APIRouter()
 
+# Statuses whose stock has been put back; orders in them are final.
+RESTOCKED_STATUSES = (OrderStatus.CANCELLED, OrderStatus.RETURNED)
+
 # --- Schemas ---
 
 class VendorOrderItemResponse(BaseModel):
@@ -51,78 +63,198 @@ class OrderStatusUpdate(BaseModel):
 
 # --- Endpoints ---
 
-@router.get("/orders", response_model=List[VendorOrderResponse])
-async def get_vendor_orders(
-    status: Optional[str] = None,
-    current_vendor: Vendor = Depends(get_current_vendor),
-    db: Session = Depends(get_db)
-):
-    """
-    Get all orders that contain products created by this vendor.
+class VendorOrderListResponse(BaseModel):
+    orders: List[VendorOrderResponse]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
+    size: int
+
+EXPORT_PAGE_SIZE = 500
+CSV_COLUMNS = [
+    "order_number", "order_date", "status", "customer_name", "shipping_address",
+    "payment_method", "payment_status", "product_name", "quantity", "unit_price", "total_price",
+]
+
+# --- Feed queries ---
+
+def _status_filter(status_value: Optional[str]) -> Optional[OrderStatus]:
+    if not status_value or status_value.lower() == 'all orders':
+        return None
+    try:
+        return OrderStatus(status_value.lower())
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Unknown order status: {status_value}")
+
+
+def _vendor_orders_page(
+    db: Session,
+    vendor_id: int,
+    order_status: Optional[OrderStatus],
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    cursor: Optional[str],
+    size: int,
+) -> Tuple[List[VendorOrderResponse], Optional[str]]:
+    """One keyset page of the vendor's orders, with only the vendor's lines.
+
+    Two queries: the page of orders (filtered, ordered and limited in SQL),
+    then the vendor's lines of just those orders.
     """
-    # Find products by this vendor
-    # We assume 'created_by' in Product matches vendor_ph_no or potentially vendor_name. 
-    # To be safe, checking both or relying on ph_no which is unique.
-    
-    vendor_identifier = current_vendor.vendor_ph_no
-    
-    # Query Orders that have items matching this vendor's products
-    orders = db.query(Order).join(OrderItem).join(Product).filter(
-        Product.created_by == vendor_identifier
-    ).options(
-        joinedload(Order.order_items).joinedload(OrderItem.product),
+    vendor_lines = db.query(OrderItem.order_item_id).filter(
+        OrderItem.vendor_id == vendor_id,
+        OrderItem.order_id == Order.order_id
+    ).correlate(Order)
+
+    query = db.query(Order).options(
         joinedload(Order.delivery_address),
-        joinedload(Order.customer)
-    ).distinct().all()
+        joinedload(Order.customer).load_only(Customer.customer_name)
+    ).filter(vendor_lines.exists())
+    if order_status is not None:
+        query = query.filter(Order.order_status == order_status)
+    if date_from is not None:
+        query = query.filter(Order.created_at >= date_from)
+    if date_to is not None:
+        query = query.filter(Order.created_at < date_to)
+    try:
+        after = after_cursor(Order.created_at, Order.order_id, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if after is not None:
+        query = query.filter(after)
+
+    orders = query.order_by(desc(Order.created_at), desc(Order.order_id)).limit(size + 1).all()
+    has_more = len(orders) > size
+    orders = orders[:size]
+    if not orders:
+        return [], None
 
-    # Apply status filter if provided
-    if status and status.lower() != 'all orders':
-        # API usually receives lowercase, but strict check
-        orders = [o for o in orders if o.order_status.lower() == status.lower()]
+    lines: Dict[int, List[VendorOrderItemResponse]] = {}
+    rows = db.query(
+        OrderItem.order_id, OrderItem.product_name, OrderItem.quantity,
+        OrderItem.unit_price, OrderItem.total_price, Product.primary_image_url
+    ).outerjoin(Product, Product.product_id == OrderItem.product_id).filter(
+        OrderItem.order_id.in_([o.order_id for o in orders]),
+        OrderItem.vendor_id == vendor_id
+    ).order_by(OrderItem.order_id, OrderItem.order_item_id)
+    for order_id, product_name, quantity, unit_price, total_price, image in rows:
+        lines.setdefault(order_id, []).append(VendorOrderItemResponse(
+            product_name=product_name,
+            quantity=quantity,
+            unit_price=unit_price,
+            total_price=total_price,
+            product_image=image
+        ))
 
-    # Transform to response
     response = []
     for order in orders:
-        # Filter items for this vendor
-        vendor_items = []
-        vendor_order_total = 0.0
-        
-        for item in order.order_items:
-            if item.product.created_by == vendor_identifier:
-                vendor_items.append(VendorOrderItemResponse(
-                    product_name=item.product_name,
-                    quantity=item.quantity,
-                    unit_price=item.unit_price,
-                    total_price=item.total_price,
-                    product_image=item.product.primary_image_url
-                ))
-                vendor_order_total += item.total_price
-
-        # Skip if somehow no items for this vendor (shouldn't happen due to filter)
-        if not vendor_items:
-            continue
-            
-        # Format address
+        vendor_items = lines.get(order.order_id, [])
         addr = order.delivery_address
         address_str = f"{addr.address_line1}, {addr.city}, {addr.state} - {addr.pincode}" if addr else "N/A"
-        
-        # Get customer name
         customer_name = order.customer.customer_name if order.customer else f"Customer #{order.customer_id}"
-        
         response.append(VendorOrderResponse(
             order_id=order.order_id,
             order_number=order.order_number,
             order_date=order.created_at,
             customer_name=customer_name,
             status=order.order_status,
-            total_amount=vendor_order_total, # Showing total for THIS vendor's items only
+            total_amount=sum(item.total_price for item in vendor_items), # Total for THIS vendor's items only
             items=vendor_items,
             shipping_address=address_str,
             payment_method=order.payment_method.value if order.payment_method else None,
             payment_status=order.payment_status.value if order.payment_status else None,
         ))
 
-    return response
+    next_cursor = encode_cursor(orders[-1].created_at, orders[-1].order_id) if has_more else None
+    return response, next_cursor
+
+# --- Endpoints ---
+
+@router.get("/orders", response_model=VendorOrderListResponse)
+async def get_vendor_orders(
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    size: int = Query(50, ge=1, le=200),
+    current_vendor: Vendor = Depends(get_current_vendor),
+    db: Session = Depends(get_db)
+):
+    """
+    Orders that contain products created by this vendor, newest first.
+
+    Filtered by status and created_at range [date_from, date_to) in SQL and
+    keyset-paginated: pass `next_cursor` back as `cursor`. Each order only
+    carries this vendor's lines.
+    """
+    orders, next_cursor = _vendor_orders_page(
+        db, current_vendor.vendor_id, _status_filter(status), date_from, date_to, cursor, size
+    )
+    return VendorOrderListResponse(orders=orders, next_cursor=next_cursor, size=size)
+
+
+@router.get("/orders/export")
+async def export_vendor_orders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    current_vendor: Vendor = Depends(get_current_vendor),
+):
+    """
+    Stream the whole filtered feed for fulfilment batches.
+
+    ndjson: one order per line. csv: one row per order line. Rows are read
+    in keyset pages of EXPORT_PAGE_SIZE and written as they arrive, so
+    memory stays flat however many orders match.
+    """
+    vendor_id = current_vendor.vendor_id
+    order_status = _status_filter(status)
+
+    def pages():
+        # Own session: the request's one is closed before streaming starts
+        db = SessionLocal()
+        try:
+            cursor = None
+            while True:
+                orders, cursor = _vendor_orders_page(
+                    db, vendor_id, order_status, date_from, date_to, cursor, EXPORT_PAGE_SIZE
+                )
+                yield orders
+                db.expunge_all()
+                if cursor is None:
+                    return
+        finally:
+            db.close()
+
+    def ndjson():
+        for orders in pages():
+            yield "".join(order.model_dump_json() + "\n" for order in orders)
+
+    def csv_rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        for orders in pages():
+            for order in orders:
+                for item in order.items:
+                    writer.writerow([
+                        order.order_number, order.order_date.isoformat() if order.order_date else "",
+                        order.status, order.customer_name, order.shipping_address,
+                        order.payment_method, order.payment_status, item.product_name,
+                        item.quantity, item.unit_price, item.total_price,
+                    ])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    if format == "csv":
+        return StreamingResponse(csv_rows(), media_type="text/csv", headers={
+            "Content-Disposition": f'attachment; filename="orders-{stamp}.csv"'
+        })
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson", headers={
+        "Content-Disposition": f'attachment; filename="orders-{stamp}.ndjson"'
+    })
 
 @router.put("/orders/{order_id}/status")
 async def update_order_status(
@@ -135,14 +267,16 @@ async def update_order_status(
     Update status of an order. 
     NOTE: This updates the Global Order Status. 
     """
-    # 1. Verify order contains vendor's products
-    vendor_identifier = current_vendor.vendor_ph_no
-    
-    # Check if order exists and belongs to vendor (at least partially)
-    order = db.query(Order).join(OrderItem).join(Product).filter(
+    # 1. Verify order contains vendor's products (at least partially).
+    # Locked until commit so concurrent status changes see each other's
+    # result before deciding whether to restock.
+    order = db.query(Order).filter(
         Order.order_id == order_id,
-        Product.created_by == vendor_identifier
-    ).first()
+        db.query(OrderItem.order_item_id).filter(
+            OrderItem.vendor_id == current_vendor.vendor_id,
+            OrderItem.order_id == Order.order_id
+        ).correlate(Order).exists()
+    ).with_for_update().populate_existing().first()
     
     if not order:
         raise HTTPException(
@@ -150,8 +284,26 @@ async def update_order_status(
             detail="Order not found or you do not have permission to modify it"
         )
 
-    # 2. Update status
+    # 2. Update status. Cancelling or accepting a return puts the stock back,
+    # once: cancelled and returned orders are final, so an order that already
+    # gave its stock back can never be reopened and restocked again.
+    if order.order_status in RESTOCKED_STATUSES and update_data.status != order.order_status:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot change status of an order that is {OrderStatus(order.order_status).value}"
+        )
+    restocks = update_data.status in RESTOCKED_STATUSES and order.order_status not in RESTOCKED_STATUSES
+    if restocks:
+        quantities = dict(db.query(OrderItem.product_id, func.sum(OrderItem.quantity)).filter(
+            OrderItem.order_id == order.order_id
+        ).group_by(OrderItem.product_id).all())
+        reason = REASON_RETURN if update_data.status == OrderStatus.RETURNED else REASON_CANCEL
+        CheckoutService.restore_stock(db, quantities, reason, order_id=order.order_id)
+        if update_data.status == OrderStatus.CANCELLED:
+            order.cancelled_date = datetime.now()
+
     order.order_status = update_data.status
+    VendorStatsService.mark_orders(db, [order.order_id])
     if update_data.tracking_number:
         order.tracking_number = update_data.tracking_number
         
@@ -12,6 +12,7 @@ from src.models.product import Product
 from src.models.product_image import ProductImage
 from src.models.vendor import Vendor
 from src.schemas.product import ProductResponse, ProductListResponse
+from src.services.price_engine import PriceEngine, NO_PRICE
 from src.api.v1.vender_auth import get_current_user as get_current_vendor
 
 logger = logging.getLogger(__name__)
@@ -19,16 +20,6 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-def _vendor_discounted_price(product: Product) -> int:
-    base = product.calculated_price if product.calculated_price is not None else product.base_price
-    if base is None:
-        return 0
-    pct = product.discount_percent or 0
-    if pct <= 0:
-        return int(base)
-    return int(round(base * (100 - pct) / 100))
-
-
 @router.get("/products", response_model=ProductListResponse)
 async def list_vendor_products(
     page: int = Query(1, ge=1),
@@ -45,19 +36,19 @@ async def list_vendor_products(
     current_vendor: Vendor = Depends(get_current_vendor),
     db: Session = Depends(get_db),
 ):
-    """List products owned by the current vendor (filtered by `created_by == vendor_ph_no`)."""
-    vendor_identifier = current_vendor.vendor_ph_no
+    """List products owned by the current vendor (filtered by `vendor_id`)."""
+    vendor_id = current_vendor.vendor_id
 
     query = db.query(Product).options(
         joinedload(Product.category),
         joinedload(Product.subcategory),
         joinedload(Product.images),
-    ).filter(Product.created_by == vendor_identifier)
+    ).filter(Product.vendor_id == vendor_id)
 
     if group_products:
         subquery = (
             db.query(func.min(Product.product_id).label("min_id"))
-            .filter(Product.created_by == vendor_identifier)
+            .filter(Product.vendor_id == vendor_id)
             .group_by(Product.group_id)
             .subquery()
         )
@@ -94,7 +85,7 @@ async def list_vendor_products(
     products = query.offset(offset).limit(per_page).all()
 
     product_responses = []
-    for product in products:
+    for product, discounted in zip(products, PriceEngine.price_many(products)):
         product_responses.append(ProductResponse(
             product_id=product.product_id,
             name=product.name,
@@ -105,7 +96,7 @@ async def list_vendor_products(
             base_price=product.base_price,
             calculated_price=product.calculated_price,
             discount_percent=product.discount_percent or 0,
-            discounted_price=_vendor_discounted_price(product),
+            discounted_price=discounted if discounted != NO_PRICE else None,
             stock_quantity=product.stock_quantity,
             sku=product.sku,
             is_active=product.is_active,
@@ -149,7 +140,7 @@ async def get_vendor_product(
         joinedload(Product.images),
     ).filter(
         Product.product_id == product_id,
-        Product.created_by == current_vendor.vendor_ph_no,
+        Product.vendor_id == current_vendor.vendor_id,
     ).first()
 
     if not product:
@@ -165,7 +156,7 @@ async def get_vendor_product(
         base_price=product.base_price,
         calculated_price=product.calculated_price,
         discount_percent=product.discount_percent or 0,
-        discounted_price=_vendor_discounted_price(product),
+        discounted_price=PriceEngine.price(product),
         stock_quantity=product.stock_quantity,
         sku=product.sku,
         is_active=product.is_active,
@@ -196,7 +187,7 @@ async def get_vendor_product_images(
     """Get images for a product owned by the current vendor."""
     product = db.query(Product).filter(
         Product.product_id == product_id,
-        Product.created_by == current_vendor.vendor_ph_no,
+        Product.vendor_id == current_vendor.vendor_id,
     ).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
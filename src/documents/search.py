@@ -211,7 +211,7 @@
 
 
 
-from elasticsearch_dsl import Document, Text, Keyword, Integer, Float, Boolean, Date, analyzer
+from elasticsearch_dsl import Document, InnerDoc, Nested, Text, Keyword, Integer, Float, Double, Boolean, Date, Completion, analyzer
 
 print("🔄 Loading ProductDocument class...")
 
@@ -222,6 +222,16 @@ autocomplete_analyzer = analyzer(
     filters=['lowercase']
 )
 
+class SpecKeyword(InnerDoc):
+    """A select/boolean specification, e.g. Size=M"""
+    name = Keyword()
+    value = Keyword()
+
+class SpecNumber(InnerDoc):
+    """A numeric specification, e.g. RAM=8"""
+    name = Keyword()
+    value = Double()
+
 class ProductDocument(Document):
     """Elasticsearch document for products"""
     
@@ -268,6 +278,9 @@ class ProductDocument(Document):
     stock_quantity = Integer()
     storage_capacity = Keyword()
     specifications = Text()
+    # Typed specs from the subcategory's SpecificationTemplates (src/search/specs.py)
+    spec_keywords = Nested(SpecKeyword)
+    spec_numbers = Nested(SpecNumber)
     
     # Media and additional info
     primary_image_url = Keyword()
@@ -302,4 +315,25 @@ class ProductDocument(Document):
             }
         }
 
-print("✅ ProductDocument class loaded successfully")
\ No newline at end of file
+print("✅ ProductDocument class loaded successfully")
+
+
+class SuggestionDocument(Document):
+    """Autocomplete entry (product name, category, brand or popular query).
+
+    Lives in its own small index so keystrokes hit the completion FST
+    instead of running a search over ecommerce_products. Built by
+    src/search/suggestions.py behind the `ecommerce_suggestions` alias.
+    """
+
+    text = Keyword()
+    kind = Keyword()
+    weight = Integer()
+    suggest = Completion(analyzer='simple')
+
+    class Index:
+        name = 'ecommerce_suggestions'
+        settings = {
+            'number_of_shards': 1,
+            'number_of_replicas': 0,
+        }
\ No newline at end of file
@@ -9,8 +9,13 @@ from .jagath import Jagath
 from .address import CustomerAddress
 from .vendor import Vendor
 from .product_image import ProductImage
+from .search_click import SearchClick
+from .idempotency import IdempotencyRecord
+from .outbox import OutboxEvent
+from .inventory import InventoryLedger, InventoryHold
+from .vendor_stats import VendorDailyStats
 
 # from
 
-__all__ = ["Base", "Category", "Product","OTP","Customer", "Jagath","Cart", "CartItem","CustomerAddress", "Vendor","Subcategory", "SpecificationTemplate", "PriceRule", "ProductImage"]
+__all__ = ["Base", "Category", "Product","OTP","Customer", "Jagath","Cart", "CartItem","CustomerAddress", "Vendor","Subcategory", "SpecificationTemplate", "PriceRule", "ProductImage", "SearchClick", "IdempotencyRecord", "OutboxEvent", "InventoryLedger", "InventoryHold", "VendorDailyStats"]
 
@@ -0,0 +1,28 @@
+# src/models/idempotency.py
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, UniqueConstraint
+from datetime import datetime
+from config.database import Base
+
+class IdempotencyRecord(Base):
+    """Stored response of a request that must not be applied twice.
+
+    One row per (scope, key): an Idempotency-Key header is scoped to its
+    customer ("orders:<customer_id>"), a Razorpay payment ID is global
+    ("razorpay_payment"). Rows are written in the same transaction as the
+    order, so a stored response always belongs to a committed order.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+    )
+
+    record_id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(50), nullable=False)
+    key = Column(String(255), nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.customer_id", ondelete="CASCADE"), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # sha256 of the request body
+    order_id = Column(Integer, ForeignKey("orders.order_id", ondelete="SET NULL"), nullable=True)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,37 @@
+# src/models/inventory.py
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, ForeignKey, Index
+from datetime import datetime
+from config.database import Base
+
+class InventoryLedger(Base):
+    """One stock change of one product; written by InventoryService"""
+    __tablename__ = "inventory_ledger"
+
+    entry_id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.product_id", ondelete="CASCADE"), nullable=False, index=True)
+    delta = Column(Integer, nullable=False)
+    stock_after = Column(Integer, nullable=False)
+    reason = Column(String(30), nullable=False)  # checkout | cancel | return | adjustment
+    order_id = Column(Integer, ForeignKey("orders.order_id", ondelete="SET NULL"), nullable=True, index=True)
+    actor = Column(String(100), nullable=True)  # vendor/admin for manual adjustments
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class InventoryHold(Base):
+    """Stock set aside for a customer while they pay, until expires_at.
+
+    At most one set of holds per customer; checkout consumes them and
+    expired rows are swept by the outbox worker.
+    """
+    __tablename__ = "inventory_holds"
+    __table_args__ = (
+        Index("ix_inventory_holds_product_expires", "product_id", "expires_at"),
+    )
+
+    hold_id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    customer_id = Column(Integer, ForeignKey("customers.customer_id", ondelete="CASCADE"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.product_id", ondelete="CASCADE"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    razorpay_order_id = Column(String(100), nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,5 +1,5 @@
 # src/models/order.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum
@@ -70,12 +70,18 @@ class Order(Base):
     delivery_address = relationship("CustomerAddress", back_populates="orders")
     order_items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
+# GET /orders keyset pagination: newest first per customer
+Index("ix_orders_customer_created", Order.customer_id, Order.created_at.desc(), Order.order_id.desc())
+
 class OrderItem(Base):
     __tablename__ = "order_items"
     
     order_item_id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.order_id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.order_id"), nullable=False, index=True)
     product_id = Column(Integer, ForeignKey("products.product_id"), nullable=False)
+    # Product.vendor_id snapshotted at checkout, so vendor queries don't go
+    # through products
+    vendor_id = Column(Integer, ForeignKey("vendors.vendor_id"), nullable=True)
     
     quantity = Column(Integer, nullable=False)
     unit_price = Column(Float, nullable=False)
@@ -89,4 +95,9 @@ class OrderItem(Base):
     
     # Relationships
     order = relationship("Order", back_populates="order_items")
-    product = relationship("Product")
\ No newline at end of file
+    product = relationship("Product")
+
+# Vendor feeds: "this vendor's lines, newest first" and "does this order
+# have a line of this vendor's"
+Index("ix_order_items_vendor_created", OrderItem.vendor_id, OrderItem.created_at)
+Index("ix_order_items_vendor_order", OrderItem.vendor_id, OrderItem.order_id)
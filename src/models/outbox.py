@@ -0,0 +1,26 @@
+# src/models/outbox.py
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, JSON, Index
+from datetime import datetime
+from config.database import Base
+
+class OutboxEvent(Base):
+    """A side effect to run after the transaction that wrote it commits.
+
+    Written in the same transaction as the change it describes and drained
+    by the outbox worker (src/services/outbox.py).
+    """
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        Index("ix_outbox_events_pending", "available_at", postgresql_where="status = 'pending'"),
+    )
+
+    event_id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    event_type = Column(String(50), nullable=False)
+    aggregate_id = Column(Integer, nullable=True)  # e.g. the order_id
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String(20), nullable=False, default="pending")  # pending | done | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # next attempt
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = Column(DateTime, nullable=True)
@@ -1,8 +1,9 @@
 # src/models/product.py - Updated with Elasticsearch integration
-from sqlalchemy import Column, Integer, String, Text, DECIMAL, ForeignKey, JSON, Boolean, DateTime, event
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DECIMAL, Float, ForeignKey, JSON, Boolean, DateTime, Index, event
+from sqlalchemy.orm import relationship, object_session
 from sqlalchemy.sql import func
 from config.database import Base
+from src.search.indexer import mark_product_dirty, OP_INDEX, OP_DELETE
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,8 +36,14 @@ class Product(Base):
     sku = Column(String(100), unique=True, nullable=True, index=True)
     group_id = Column(String(50), nullable=True, index=True)  # For grouping variants (e.g., same product, different sizes)
     created_by = Column(String(100), nullable=False)
+    # Owning vendor; NULL for admin/sales catalogue products. created_by stays
+    # as the display/legacy owner string.
+    vendor_id = Column(Integer, ForeignKey("vendors.vendor_id"), nullable=True)
     is_active = Column(Boolean, default=True)
     
+    # Decayed sales/cart/click velocity, written by src/search/popularity.py
+    popularity_score = Column(Float, nullable=False, default=0.0, server_default="0")
+    
     # Image fields
     primary_image_url = Column(String(500), nullable=True)
     primary_image_filename = Column(String(255), nullable=True)
@@ -51,87 +58,44 @@ class Product(Base):
     cart_items = relationship("CartItem", back_populates="product")
     images = relationship("ProductImage", back_populates="product", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_products_vendor_created", "vendor_id", "created_at"),
+    )
+
 
 # ===================================================================
 # ELASTICSEARCH AUTO-INDEXING EVENT LISTENERS
 # ===================================================================
+# The listeners only record the product ID on the flushing session. The IDs
+# are shipped to the search index queue after the transaction commits (and
+# dropped on rollback), so a flush never waits on Elasticsearch.
 
 def auto_index_product(product_id: int):
-    """Automatically index a product when it's created/updated"""
-    try:
-        # Import here to avoid circular imports
-        from src.services.search import ElasticsearchService
-        from config.database import SessionLocal
-        
-        db = SessionLocal()
-        try:
-            product = db.query(Product).filter(Product.product_id == product_id).first()
-            
-            if product:
-                if product.is_active:
-                    ElasticsearchService.index_product(product)
-                    logger.info(f"Auto-indexed product {product_id}")
-                else:
-                    ElasticsearchService.delete_product(product_id)
-                    logger.info(f"Removed inactive product {product_id} from index")
-            
-        except Exception as e:
-            logger.error(f"Auto-indexing failed for product {product_id}: {str(e)}")
-        finally:
-            db.close()
-            
-    except ImportError:
-        # Elasticsearch service not available, skip indexing
-        logger.debug(f"Elasticsearch service not available, skipping auto-indexing for product {product_id}")
-    except Exception as e:
-        logger.error(f"Auto-indexing error for product {product_id}: {str(e)}")
+    """Queue a product for (re)indexing outside of any transaction"""
+    mark_product_dirty(None, product_id, OP_INDEX)
 
 
 def auto_remove_product(product_id: int):
-    """Automatically remove a product from index when deleted"""
-    try:
-        # Import here to avoid circular imports
-        from src.services.search import ElasticsearchService
-        
-        ElasticsearchService.delete_product(product_id)
-        logger.info(f"Auto-removed product {product_id} from index")
-        
-    except ImportError:
-        # Elasticsearch service not available, skip removal
-        logger.debug(f"Elasticsearch service not available, skipping auto-removal for product {product_id}")
-    except Exception as e:
-        logger.error(f"Auto-removal failed for product {product_id}: {str(e)}")
+    """Queue a product for removal from the index outside of any transaction"""
+    mark_product_dirty(None, product_id, OP_DELETE)
 
 
-# Event listeners for automatic Elasticsearch indexing
 @event.listens_for(Product, 'after_insert')
 def auto_index_on_insert(mapper, connection, target):
-    """Auto-index product after creation"""
-    try:
-        # Use a background task or queue for production
-        auto_index_product(target.product_id)
-    except Exception as e:
-        logger.error(f"Auto-indexing after insert failed: {str(e)}")
+    """Mark product for indexing once the transaction commits"""
+    mark_product_dirty(object_session(target), target.product_id, OP_INDEX)
 
 
 @event.listens_for(Product, 'after_update')
 def auto_index_on_update(mapper, connection, target):
-    """Auto-index product after update"""
-    try:
-        # Use a background task or queue for production
-        auto_index_product(target.product_id)
-    except Exception as e:
-        logger.error(f"Auto-indexing after update failed: {str(e)}")
+    """Mark product for reindexing once the transaction commits"""
+    mark_product_dirty(object_session(target), target.product_id, OP_INDEX)
 
 
-@event.listens_for(Product, 'before_delete')
+@event.listens_for(Product, 'after_delete')
 def auto_remove_on_delete(mapper, connection, target):
-    """Auto-remove product before deletion"""
-    try:
-        # Use a background task or queue for production
-        auto_remove_product(target.product_id)
-    except Exception as e:
-        logger.error(f"Auto-removal before delete failed: {str(e)}")
+    """Mark product for removal from the index once the transaction commits"""
+    mark_product_dirty(object_session(target), target.product_id, OP_DELETE)
 
 
 # ===================================================================
@@ -143,15 +107,11 @@ class ProductUtils:
     
     @staticmethod
     def get_effective_price(product: Product) -> float:
-        """Get the effective price for a product"""
-        if product.calculated_price is not None:
-            return product.calculated_price / 100  # Convert cents to dollars
-        elif product.base_price is not None:
-            return product.base_price / 100  # Convert cents to dollars
-        elif product.price is not None:
-            return float(product.price)
-        else:
-            return 0.0
+        """Get the effective price for a product (PriceEngine unit price, in rupees)"""
+        from src.services.price_engine import PriceEngine
+
+        paise = PriceEngine.price(product)
+        return paise / 100 if paise is not None else 0.0
     
     @staticmethod
     def format_price(product: Product) -> str:
@@ -230,16 +190,11 @@ def reindex_all_products():
     """
     try:
         from src.services.search import ElasticsearchService
-        from config.database import SessionLocal
         
-        db = SessionLocal()
-        try:
-            products = db.query(Product).filter(Product.is_active == True).all()
-            result = ElasticsearchService.bulk_index_products(products)
-            logger.info(f"Reindexed {len(products)} products: {result}")
-            return result
-        finally:
-            db.close()
+        # Blue/green rebuild: streams products in chunks and swaps the alias
+        result = ElasticsearchService.reindex_all_products()
+        logger.info(f"Reindexed products: {result}")
+        return result
             
     except ImportError:
         logger.error("Elasticsearch service not available")
@@ -259,14 +214,13 @@ def index_single_product_by_id(product_id: int):
         
         db = SessionLocal()
         try:
-            product = db.query(Product).filter(Product.product_id == product_id).first()
-            if product:
-                success = ElasticsearchService.index_product(product)
-                logger.info(f"Indexed product {product_id}: {success}")
-                return {"success": success, "product_id": product_id}
-            else:
+            if not db.query(Product.product_id).filter(Product.product_id == product_id).first():
                 logger.warning(f"Product {product_id} not found")
                 return {"error": f"Product {product_id} not found"}
+            result = ElasticsearchService.index_products_by_ids(db, [product_id])
+            success = result["errors"] == 0
+            logger.info(f"Indexed product {product_id}: {result}")
+            return {"success": success, "product_id": product_id}
         finally:
             db.close()
             
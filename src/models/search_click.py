@@ -0,0 +1,14 @@
+# src/models/search_click.py
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import datetime
+from config.database import Base
+
+class SearchClick(Base):
+    """A click on a search result; one of the popularity job's signals"""
+    __tablename__ = "search_clicks"
+
+    click_id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.product_id", ondelete="CASCADE"), nullable=False)
+    query = Column(String(255), nullable=True)
+    position = Column(Integer, nullable=True)  # 1-based rank in the results page
+    clicked_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
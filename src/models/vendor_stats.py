@@ -0,0 +1,35 @@
+# src/models/vendor_stats.py
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey
+from datetime import datetime
+from config.database import Base
+
+class VendorDailyStats(Base):
+    """Dashboard rollup for one vendor and day; maintained by VendorStatsService.
+
+    Order columns cover the vendor's lines of orders created that day, in
+    their current status. Product columns are a stock snapshot, written on
+    the day it was taken (NULL on days without one).
+    """
+    __tablename__ = "vendor_daily_stats"
+
+    vendor_id = Column(Integer, ForeignKey("vendors.vendor_id", ondelete="CASCADE"), primary_key=True)
+    stat_date = Column(Date, primary_key=True)
+
+    orders_total = Column(Integer, nullable=False, default=0)
+    orders_pending = Column(Integer, nullable=False, default=0)
+    orders_confirmed = Column(Integer, nullable=False, default=0)
+    orders_processing = Column(Integer, nullable=False, default=0)
+    orders_shipped = Column(Integer, nullable=False, default=0)
+    orders_delivered = Column(Integer, nullable=False, default=0)
+    orders_cancelled = Column(Integer, nullable=False, default=0)
+    orders_returned = Column(Integer, nullable=False, default=0)
+    orders_return_requested = Column(Integer, nullable=False, default=0)
+    # Line totals and units of orders that were not cancelled
+    revenue = Column(Float, nullable=False, default=0)
+    units_sold = Column(Integer, nullable=False, default=0)
+
+    products_total = Column(Integer, nullable=True)
+    products_low_stock = Column(Integer, nullable=True)
+    products_out_of_stock = Column(Integer, nullable=True)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -102,8 +102,8 @@
 
 
 # src/schemas/cart.py
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from pydantic import BaseModel, Field, validator, model_validator
+from typing import List, Literal, Optional
 from datetime import datetime
 from decimal import Decimal
 
@@ -130,6 +130,26 @@ class UpdateCartItemRequest(BaseModel):
             raise ValueError('Quantity cannot exceed 100')
         return v
 
+class CartItemOperation(BaseModel):
+    """One line change of a PATCH /cart/items batch"""
+    op: Literal["add", "set", "remove"] = Field(..., description="add to, set or remove the line")
+    product_id: int = Field(..., gt=0, description="Product ID")
+    quantity: Optional[int] = Field(default=None, ge=0, le=100, description="Units to add, or the new quantity for set")
+    
+    @model_validator(mode='after')
+    def validate_quantity(self):
+        if self.op == "add":
+            if self.quantity is None:
+                self.quantity = 1
+            if self.quantity <= 0:
+                raise ValueError('Quantity to add must be greater than 0')
+        elif self.op == "set" and self.quantity is None:
+            raise ValueError('Quantity is required for set')
+        return self
+
+class CartItemsPatchRequest(BaseModel):
+    operations: List[CartItemOperation] = Field(..., min_length=1, max_length=100, description="Applied in order")
+
 class ProductInCart(BaseModel):
     product_id: int
     name: str
@@ -157,10 +177,10 @@ class CartItemResponse(BaseModel):
         from_attributes = True
 
 class CartResponse(BaseModel):
-    cart_id: int
+    cart_id: Optional[int] = None  # None until the customer's first cart write
     customer_id: int
-    created_at: datetime
-    updated_at: datetime
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
     items: List[CartItemResponse]
     total_items: int
     total_quantity: int
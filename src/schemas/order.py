@@ -69,6 +69,28 @@ class OrderListResponse(BaseModel):
     page: int
     size: int
 
+class OrderSummary(BaseModel):
+    """List row: totals and the first line only; details via GET /orders/{id}"""
+    order_id: int
+    order_number: str
+    order_status: OrderStatus
+    payment_status: PaymentStatus
+    payment_method: PaymentMethod
+    order_date: Optional[datetime]
+    created_at: Optional[datetime]
+    estimated_delivery_date: Optional[datetime]
+    subtotal: float
+    total_amount: float
+    item_count: int
+    first_item_name: Optional[str] = None
+    first_item_image: Optional[str] = None
+
+class OrderSummaryListResponse(BaseModel):
+    orders: List[OrderSummary]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
+    size: int
+    total_count: Optional[int] = None  # only with ?include_total=true
+
 class OrderCreateResponse(BaseModel):
     order_id: int
     order_number: str
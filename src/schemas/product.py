@@ -49,7 +49,7 @@ class ProductResponse(ProductBase):
     category_id: int
     subcategory_id: int
     calculated_price: int  # Final price after applying rules
-    discounted_price: Optional[int] = None  # base/calculated minus discount_percent
+    discounted_price: Optional[int] = None  # PriceEngine unit price; None if unpriced
     primary_image_url: Optional[str] = None
     primary_image_filename: Optional[str] = None
     created_by: str
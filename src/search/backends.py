@@ -0,0 +1,191 @@
+# src/search/backends.py
+"""
+Pluggable search backends.
+
+Everything that serves or feeds product search (the /search endpoints and the
+indexing queue) talks to a `SearchBackend` instead of a concrete engine:
+
+  - "elasticsearch" (default): ElasticsearchService, falling back to Postgres
+    for reads while the cluster is down.
+  - "postgres": PostgresSearchService full-text search. Nothing to index; the
+    generated columns from migrate_search_fts.py follow product writes.
+  - "memory": InMemorySearchBackend (src/search/memory.py), a pure-Python
+    BM25 index for tests, offline load testing and small shops without ES.
+
+Pick one with SEARCH_BACKEND (see config/settings.py).
+"""
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Protocol
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_ELASTICSEARCH = "elasticsearch"
+BACKEND_POSTGRES = "postgres"
+BACKEND_MEMORY = "memory"
+
+
+class SearchBackend(Protocol):
+    """What the API and the indexing queue need from a search engine"""
+
+    name: str
+
+    def is_available(self) -> bool:
+        ...
+
+    def search(
+        self,
+        db: Session,
+        query: str,
+        category_id: Optional[int] = None,
+        subcategory_id: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        brand: Optional[str] = None,
+        in_stock_only: bool = True,
+        sort_by: str = 'relevance',
+        page: int = 1,
+        size: int = 20,
+        spec_filters: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Same response shape as ElasticsearchService.search_products"""
+        ...
+
+    async def search_async(self, db: Session, query: str, **params: Any) -> Dict[str, Any]:
+        """`search` for async handlers without blocking the event loop"""
+        ...
+
+    def suggest(self, db: Session, query: str, size: int = 10) -> List[str]:
+        ...
+
+    async def suggest_async(self, db: Session, query: str, size: int = 10) -> List[str]:
+        """`suggest` for async handlers without blocking the event loop"""
+        ...
+
+    def index_products(self, db: Session, product_ids: List[int]) -> Dict[str, int]:
+        """(Re)index products by ID. Returns indexed / deleted / errors counts,
+        plus failed_ids when the backend can tell which products failed."""
+        ...
+
+    def delete_products(self, product_ids: List[int]) -> Dict[str, int]:
+        """Remove products by ID. Returns deleted / errors counts."""
+        ...
+
+    def update_popularity(self, scores: Dict[int, float]) -> Dict[str, int]:
+        """Set popularity_score without resending documents. Returns updated / missing / errors."""
+        ...
+
+
+class ElasticsearchBackend:
+    name = BACKEND_ELASTICSEARCH
+
+    def is_available(self) -> bool:
+        from src.services.search import ElasticsearchService
+        return ElasticsearchService.is_available()
+
+    def search(self, db: Session, query: str, **params: Any) -> Dict[str, Any]:
+        from src.services.search import ElasticsearchService
+        return ElasticsearchService.search_products(query=query, **params)
+
+    async def search_async(self, db: Session, query: str, **params: Any) -> Dict[str, Any]:
+        from src.services.search import ElasticsearchService
+        return await ElasticsearchService.search_products_async(query=query, **params)
+
+    def suggest(self, db: Session, query: str, size: int = 10) -> List[str]:
+        from src.services.search import ElasticsearchService
+        return ElasticsearchService.get_search_suggestions(query, size)
+
+    async def suggest_async(self, db: Session, query: str, size: int = 10) -> List[str]:
+        from src.services.search import ElasticsearchService
+        return await ElasticsearchService.get_search_suggestions_async(query, size)
+
+    def index_products(self, db: Session, product_ids: List[int]) -> Dict[str, int]:
+        from src.services.search import ElasticsearchService
+        return ElasticsearchService.index_products_by_ids(db, product_ids)
+
+    def delete_products(self, product_ids: List[int]) -> Dict[str, int]:
+        from src.services.search import ElasticsearchService
+        result = ElasticsearchService.bulk_delete_products(product_ids)
+        return {'deleted': result.get('success', 0), 'errors': result.get('errors', 0),
+                'failed_ids': result.get('failed_ids', [])}
+
+    def update_popularity(self, scores: Dict[int, float]) -> Dict[str, int]:
+        from src.services.search import ElasticsearchService
+        return ElasticsearchService.update_popularity_scores(scores)
+
+
+class PostgresBackend:
+    name = BACKEND_POSTGRES
+
+    def is_available(self) -> bool:
+        return True
+
+    def search(self, db: Session, query: str, **params: Any) -> Dict[str, Any]:
+        from src.services.postgres_search import PostgresSearchService
+        return PostgresSearchService.search_products(db, query=query, **params)
+
+    async def search_async(self, db: Session, query: str, **params: Any) -> Dict[str, Any]:
+        return await run_in_threadpool(self.search, db, query, **params)
+
+    def suggest(self, db: Session, query: str, size: int = 10) -> List[str]:
+        from src.search.suggestions import suggestion_index
+        return suggestion_index.suggest_local(query, size, db)
+
+    async def suggest_async(self, db: Session, query: str, size: int = 10) -> List[str]:
+        return await run_in_threadpool(self.suggest, db, query, size)
+
+    def index_products(self, db: Session, product_ids: List[int]) -> Dict[str, int]:
+        # Search columns are generated by Postgres on write.
+        return {'indexed': 0, 'deleted': 0, 'errors': 0}
+
+    def delete_products(self, product_ids: List[int]) -> Dict[str, int]:
+        return {'deleted': 0, 'errors': 0}
+
+    def update_popularity(self, scores: Dict[int, float]) -> Dict[str, int]:
+        # Reads products.popularity_score directly.
+        return {'updated': 0, 'missing': 0, 'errors': 0}
+
+
+_backends: Dict[str, SearchBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def _create_backend(name: str) -> SearchBackend:
+    if name == BACKEND_ELASTICSEARCH:
+        return ElasticsearchBackend()
+    if name == BACKEND_POSTGRES:
+        return PostgresBackend()
+    if name == BACKEND_MEMORY:
+        from src.search.memory import InMemorySearchBackend
+        return InMemorySearchBackend()
+    raise ValueError(
+        f"Unknown SEARCH_BACKEND '{name}' "
+        f"(expected {BACKEND_ELASTICSEARCH}, {BACKEND_POSTGRES} or {BACKEND_MEMORY})"
+    )
+
+
+def get_backend(name: str) -> SearchBackend:
+    """Process-wide backend instance by name"""
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            backend = _backends[name] = _create_backend(name)
+        return backend
+
+
+def get_search_backend(fallback: bool = True) -> SearchBackend:
+    """The configured backend.
+
+    With `fallback`, reads go to Postgres while a configured Elasticsearch
+    is unreachable. The indexing queue asks without fallback so it never
+    mistakes the Postgres no-op for a successful index write.
+    """
+    backend = get_backend(settings.search_backend)
+    if fallback and backend.name == BACKEND_ELASTICSEARCH and not backend.is_available():
+        return get_backend(BACKEND_POSTGRES)
+    return backend
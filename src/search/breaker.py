@@ -0,0 +1,214 @@
+# src/search/breaker.py
+"""
+Circuit breaker for Elasticsearch.
+
+Request handlers never ping the cluster. They ask `es_breaker.allow()`,
+which only reads local state, and report connection-level outcomes through
+`with es_breaker.guard(): ...`. After `failure_threshold` consecutive
+failures the breaker opens and every caller goes straight to its fallback
+(Postgres search, the suggestion trie, skipped index batches).
+
+While open, a background thread waits out the cooldown, moves the breaker
+to half-open and pings with a short timeout. Success closes it; failure
+re-opens it for another cooldown. Requests are not let through while
+half-open, so a dead cluster never costs a request its timeout.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+def _is_connection_error(exc: BaseException) -> bool:
+    """Errors that say the cluster is unreachable or overloaded, as opposed
+    to a bad query or a missing document."""
+    try:
+        from elastic_transport import ConnectionError as TransportConnectionError
+        from elastic_transport import ConnectionTimeout
+    except ImportError:
+        return isinstance(exc, (ConnectionError, TimeoutError))
+    if isinstance(exc, (TransportConnectionError, ConnectionTimeout, ConnectionError, TimeoutError)):
+        return True
+    status = getattr(getattr(exc, "meta", None), "status", None)
+    return status in (429, 502, 503, 504)
+
+
+class CircuitBreaker:
+
+    def __init__(
+        self,
+        name: str,
+        probe: Callable[[], bool],
+        failure_threshold: int = 5,
+        cooldown_seconds: float = 10.0,
+    ):
+        self.name = name
+        self._probe = probe
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats: Dict[str, Any] = {
+            "trips_total": 0,
+            "rejected_total": 0,
+            "probes_total": 0,
+            "last_probe_at": None,
+            "last_error": None,
+        }
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    # ------------------------------------------------------------------
+    # Request path
+    # ------------------------------------------------------------------
+
+    def allow(self) -> bool:
+        if self._state == STATE_CLOSED:
+            return True
+        with self._lock:
+            self._stats["rejected_total"] += 1
+        return False
+
+    def record_success(self) -> None:
+        if self._consecutive_failures or self._state != STATE_CLOSED:
+            with self._lock:
+                self._consecutive_failures = 0
+                if self._state != STATE_CLOSED:
+                    self._close()
+
+    def record_failure(self, exc: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            if exc is not None:
+                self._stats["last_error"] = f"{type(exc).__name__}: {exc}"
+            if self._state == STATE_CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._trip()
+
+    @contextmanager
+    def guard(self):
+        """Record the outcome of an Elasticsearch call. Only connection-level
+        errors count as failures; everything is re-raised."""
+        try:
+            yield
+        except Exception as e:
+            if _is_connection_error(e):
+                self.record_failure(e)
+            raise
+        else:
+            self.record_success()
+
+    # ------------------------------------------------------------------
+    # Transitions (hold self._lock)
+    # ------------------------------------------------------------------
+
+    def _trip(self) -> None:
+        self._state = STATE_OPEN
+        self._opened_at = time.monotonic()
+        self._stats["trips_total"] += 1
+        logger.warning(f"Circuit breaker {self.name} opened after {self._consecutive_failures} failures")
+        self._wake.set()
+
+    def _close(self) -> None:
+        self._state = STATE_CLOSED
+        self._opened_at = None
+        logger.info(f"Circuit breaker {self.name} closed")
+
+    # ------------------------------------------------------------------
+    # Background probing
+    # ------------------------------------------------------------------
+
+    def probe_now(self) -> bool:
+        """Ping once and move the breaker accordingly"""
+        with self._lock:
+            if self._state == STATE_OPEN:
+                self._state = STATE_HALF_OPEN
+            self._stats["probes_total"] += 1
+            self._stats["last_probe_at"] = time.time()
+        try:
+            healthy = bool(self._probe())
+            error = None if healthy else "ping failed"
+        except Exception as e:
+            healthy = False
+            error = f"{type(e).__name__}: {e}"
+
+        with self._lock:
+            if healthy:
+                self._consecutive_failures = 0
+                if self._state != STATE_CLOSED:
+                    self._close()
+            else:
+                self._stats["last_error"] = error
+                if self._state != STATE_OPEN:
+                    self._consecutive_failures = max(self._consecutive_failures, self.failure_threshold)
+                    self._trip()
+                else:
+                    self._opened_at = time.monotonic()
+        return healthy
+
+    def start(self) -> None:
+        """Probe once now, then keep probing in the background while open"""
+        self.probe_now()
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"breaker-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self._state == STATE_CLOSED:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            remaining = self.cooldown_seconds - (time.monotonic() - (self._opened_at or 0))
+            if remaining > 0:
+                self._stop.wait(remaining)
+                continue
+            self.probe_now()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "cooldown_seconds": self.cooldown_seconds,
+                "open_for_seconds": round(time.monotonic() - self._opened_at, 1) if self._opened_at else 0.0,
+            })
+        return stats
+
+
+def _ping() -> bool:
+    from config.elasticsearch import client_for
+    client = client_for("ping")
+    return client is not None and client.ping()
+
+
+es_breaker = CircuitBreaker(
+    "elasticsearch",
+    probe=_ping,
+    failure_threshold=settings.elasticsearch_breaker_failures,
+    cooldown_seconds=settings.elasticsearch_breaker_cooldown_seconds,
+)
@@ -0,0 +1,273 @@
+# src/search/cache.py
+"""
+Tiered cache for product search results and facets.
+
+Tier 1 is an in-process LRU with per-entry TTL. Tier 2 is an optional shared
+Redis cache (set SEARCH_CACHE_REDIS_URL and install `redis`) so workers behind
+the same load balancer reuse each other's results; without it only tier 1 is
+used.
+
+Two kinds of entries are kept:
+  - results, keyed on every normalized search parameter (query, filters, sort,
+    page, size);
+  - facets, keyed on the query and filters only, so paging or re-sorting the
+    same search reuses the aggregations instead of recomputing them.
+
+Invalidation is generation based: every key embeds the current generation,
+and any write to the product index calls `invalidate()`, which bumps it.
+Entries from older generations are never read again and age out of the LRU
+or expire in Redis. With the shared tier the generation lives in Redis too,
+so an index write on one worker invalidates all of them.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha1
+from typing import Any, Dict, Optional, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # the shared tier is optional
+    redis = None
+
+_GENERATION_KEY = "search_cache:generation"
+
+# How long a worker trusts its copy of the shared generation before asking
+# Redis again. Bounds cross-worker staleness after an index write.
+_GENERATION_REFRESH_SECONDS = 1.0
+
+# Index writes become searchable after the next refresh (refresh_interval 1s),
+# so results are not stored for this long after an invalidation; otherwise a
+# search racing the refresh would cache pre-write results for a full TTL.
+_SETTLE_SECONDS = 1.5
+
+
+def normalize_query(query: Optional[str]) -> str:
+    return " ".join((query or "").lower().split())
+
+
+class _LRUTier:
+    """Thread-safe LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SearchCache:
+    """Result and facet cache in front of the search backend"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_entries: int = 1024,
+        result_ttl: int = 60,
+        facet_ttl: int = 300,
+        redis_url: Optional[str] = None,
+    ):
+        self.enabled = enabled
+        self.result_ttl = result_ttl
+        self.facet_ttl = facet_ttl
+        self._local = _LRUTier(max_entries)
+        self._shared = None
+        self._generation = 0
+        self._generation_checked_at = 0.0
+        self._invalidated_at = float("-inf")
+        self._lock = threading.Lock()
+        self._stats = {
+            "result_hits_local": 0,
+            "result_hits_shared": 0,
+            "result_misses": 0,
+            "facet_hits_local": 0,
+            "facet_hits_shared": 0,
+            "facet_misses": 0,
+            "invalidations": 0,
+            "shared_errors": 0,
+        }
+
+        if enabled and redis_url:
+            if redis is None:
+                logger.warning("SEARCH_CACHE_REDIS_URL is set but the redis package is not installed")
+            else:
+                try:
+                    self._shared = redis.Redis.from_url(
+                        redis_url, socket_timeout=0.05, socket_connect_timeout=0.1
+                    )
+                except Exception as e:
+                    logger.warning(f"Search cache shared tier disabled: {str(e)}")
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _digest(kind: str, generation: int, params: Dict[str, Any]) -> str:
+        raw = json.dumps(params, sort_keys=True, default=str)
+        return f"search_cache:{kind}:{generation}:{sha1(raw.encode()).hexdigest()}"
+
+    @staticmethod
+    def filter_params(query: Optional[str], **filters: Any) -> Dict[str, Any]:
+        """Query plus filters - the key shared by every page/sort of a search"""
+        params = {"q": normalize_query(query)}
+        params.update({k: v for k, v in filters.items() if v is not None})
+        return params
+
+    # ------------------------------------------------------------------
+    # Generation
+    # ------------------------------------------------------------------
+
+    def generation(self) -> int:
+        if self._shared is None:
+            return self._generation
+        now = time.monotonic()
+        if now - self._generation_checked_at < _GENERATION_REFRESH_SECONDS:
+            return self._generation
+        try:
+            value = self._shared.get(_GENERATION_KEY)
+            generation = int(value) if value is not None else 0
+            if generation != self._generation:
+                self._generation = generation
+                self._invalidated_at = now
+        except Exception:
+            self._count("shared_errors")
+        self._generation_checked_at = now
+        return self._generation
+
+    def invalidate(self) -> None:
+        """Forget everything cached so far. Called on every index write."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at = time.monotonic()
+            self._stats["invalidations"] += 1
+        self._local.clear()
+        if self._shared is not None:
+            try:
+                self._generation = int(self._shared.incr(_GENERATION_KEY))
+                self._generation_checked_at = time.monotonic()
+            except Exception:
+                self._count("shared_errors")
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get_results(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return self._get("result", params)
+
+    def set_results(self, params: Dict[str, Any], value: Dict[str, Any]) -> None:
+        self._set("result", params, value, self.result_ttl)
+
+    def get_facets(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return self._get("facet", params)
+
+    def set_facets(self, params: Dict[str, Any], value: Dict[str, Any]) -> None:
+        self._set("facet", params, value, self.facet_ttl)
+
+    def _get(self, kind: str, params: Dict[str, Any]) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        key = self._digest(kind, self.generation(), params)
+
+        value = self._local.get(key)
+        if value is not None:
+            self._count(f"{kind}_hits_local")
+            return value
+
+        if self._shared is not None:
+            try:
+                raw = self._shared.get(key)
+            except Exception:
+                raw = None
+                self._count("shared_errors")
+            if raw is not None:
+                value = json.loads(raw)
+                ttl = self.result_ttl if kind == "result" else self.facet_ttl
+                self._local.set(key, value, ttl)
+                self._count(f"{kind}_hits_shared")
+                return value
+
+        self._count(f"{kind}_misses")
+        return None
+
+    def _set(self, kind: str, params: Dict[str, Any], value: Any, ttl: int) -> None:
+        if not self.enabled:
+            return
+        generation = self.generation()
+        if time.monotonic() - self._invalidated_at < _SETTLE_SECONDS:
+            return
+        key = self._digest(kind, generation, params)
+        self._local.set(key, value, ttl)
+        if self._shared is not None:
+            try:
+                self._shared.set(key, json.dumps(value, default=str), ex=ttl)
+            except Exception:
+                self._count("shared_errors")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        result_hits = stats["result_hits_local"] + stats["result_hits_shared"]
+        facet_hits = stats["facet_hits_local"] + stats["facet_hits_shared"]
+        result_total = result_hits + stats["result_misses"]
+        facet_total = facet_hits + stats["facet_misses"]
+        stats.update({
+            "enabled": self.enabled,
+            "shared_tier": self._shared is not None,
+            "generation": self._generation,
+            "local_entries": len(self._local),
+            "result_hit_ratio": round(result_hits / result_total, 3) if result_total else 0.0,
+            "facet_hit_ratio": round(facet_hits / facet_total, 3) if facet_total else 0.0,
+        })
+        return stats
+
+
+search_cache = SearchCache(
+    enabled=settings.search_cache_enabled,
+    max_entries=settings.search_cache_max_entries,
+    result_ttl=settings.search_cache_ttl_seconds,
+    facet_ttl=settings.search_facet_cache_ttl_seconds,
+    redis_url=settings.search_cache_redis_url,
+)
@@ -0,0 +1,112 @@
+# src/search/document_builder.py
+"""
+Single source of truth for turning Product rows into search documents.
+
+Every indexing path (single product, post-commit queue, bulk, blue/green
+reindex) goes through `build_document`, so the document shape cannot drift
+between them again. `load_products` fetches a batch of products together with
+their category, subcategory and the subcategory's specification templates
+in one query plus one `selectinload` query per relationship, instead of lazy
+SELECTs per product.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, selectinload
+
+from src.models.category import Subcategory
+from src.models.product import Product
+from src.search.specs import spec_types, specifications_text, typed_specs
+from src.services.price_engine import PriceEngine
+
+# Max IDs per SELECT ... IN (...) when loading a batch.
+LOAD_CHUNK_SIZE = 1000
+
+
+def product_load_options():
+    """Loader options that make `build_document` free of lazy loads"""
+    return (
+        selectinload(Product.category),
+        selectinload(Product.subcategory).selectinload(Subcategory.spec_templates),
+    )
+
+
+def load_products(db: Session, product_ids: Iterable[int]) -> List[Product]:
+    """Load products (with category, subcategory and spec templates) for a batch of IDs"""
+    ids = list(dict.fromkeys(pid for pid in product_ids if pid is not None))
+    products: List[Product] = []
+    for start in range(0, len(ids), LOAD_CHUNK_SIZE):
+        chunk = ids[start:start + LOAD_CHUNK_SIZE]
+        products.extend(
+            db.query(Product)
+            .options(*product_load_options())
+            .filter(Product.product_id.in_(chunk))
+            .all()
+        )
+    return products
+
+
+def effective_price(product: Product) -> Optional[float]:
+    """Unit price in rupees as the cart charges it (PriceEngine), None if unpriced"""
+    paise = PriceEngine.price(product)
+    return paise / 100 if paise is not None else None
+
+
+def extract_brand(product: Product) -> Optional[str]:
+    if product.specifications and isinstance(product.specifications, dict):
+        return product.specifications.get('Brand') or product.specifications.get('brand')
+    return None
+
+
+def build_document(product: Product) -> Dict[str, Any]:
+    """Build the `_source` body for one product"""
+    category_name = product.category.name if product.category else None
+    subcategory_name = product.subcategory.name if product.subcategory else None
+    templates = product.subcategory.spec_templates if product.subcategory else []
+    spec_keywords, spec_numbers = typed_specs(product.specifications, spec_types(templates))
+
+    search_keywords = [
+        value for value in (product.name, product.description, category_name, subcategory_name)
+        if value
+    ]
+
+    return {
+        'product_id': product.product_id,
+        'name': product.name,
+        'description': product.description,
+        'price': effective_price(product),
+        'base_price': product.base_price,
+        'calculated_price': product.calculated_price,
+        'category_id': product.category_id,
+        'category_name': category_name,
+        'subcategory_id': product.subcategory_id,
+        'subcategory_name': subcategory_name,
+        'brand': extract_brand(product),
+        'sku': product.sku,
+        'stock_quantity': product.stock_quantity,
+        'storage_capacity': product.storage_capacity,
+        'specifications': specifications_text(product.specifications),
+        'spec_keywords': spec_keywords,
+        'spec_numbers': spec_numbers,
+        'primary_image_url': product.primary_image_url,
+        'search_keywords': ' '.join(search_keywords),
+        'popularity_score': product.popularity_score or 0.0,
+        'is_active': product.is_active,
+        'created_at': product.created_at,
+        'updated_at': product.updated_at,
+    }
+
+
+def build_documents(db: Session, product_ids: Iterable[int]) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Build documents for a batch of product IDs.
+
+    Returns (documents for active products, IDs that should be removed from
+    the index because they are inactive or no longer exist).
+    """
+    ids = list(dict.fromkeys(product_ids))
+    products = load_products(db, ids)
+    found = {p.product_id for p in products}
+
+    documents = [build_document(p) for p in products if p.is_active]
+    removed = [p.product_id for p in products if not p.is_active]
+    removed.extend(pid for pid in ids if pid not in found)
+    return documents, removed
@@ -0,0 +1,337 @@
+# src/search/indexer.py
+"""
+Change-capture queue for search indexing.
+
+Product writes no longer talk to Elasticsearch inside the caller's flush. The
+mapper listeners in src/models/product.py only record dirty product IDs on the
+session (`mark_product_dirty`). When the transaction commits, those IDs are
+handed to the process-wide `index_queue`; a rollback discards them. The queue
+merges repeated updates to the same product and a background thread ships them
+to the configured search backend (src/search/backends.py) in batches.
+
+Code that writes products with Core statements (bulk UPDATEs bypass the mapper
+events) should call `mark_products_dirty(session, ids)` before committing. Stock
+changes are the exception: InventoryService sends them through the
+transactional outbox (src/services/outbox.py).
+
+Tuning (env, see config/settings.py):
+  - SEARCH_INDEX_BATCH_SIZE: max product IDs per bulk request (default 500).
+  - SEARCH_INDEX_LINGER_MS: how long the worker waits for more changes before
+    flushing a partial batch (default 250).
+  - SEARCH_INDEX_RETRY_BASE_MS / SEARCH_INDEX_RETRY_MAX_MS: backoff for
+    changes that could not be shipped (default 1000 / 60000).
+
+Nothing is dropped while the backend is down: a batch it could not take
+(backend unavailable, request failed, per-document errors) goes back into
+the queue with its original timestamps, unless a newer change to the same
+product arrived meanwhile, and the worker waits with exponential backoff
+before the next attempt. Only changes still pending when the process stops
+are lost; a full reindex repairs those.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config.database import SessionLocal
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+OP_INDEX = "index"
+OP_DELETE = "delete"
+
+# Key under Session.info holding {product_id: op} for the open transaction.
+_SESSION_KEY = "search_dirty_products"
+
+
+class SearchIndexQueue:
+    """Merging, batching queue of product IDs waiting to be (re)indexed."""
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        linger_ms: int = 250,
+        retry_base_ms: int = 1000,
+        retry_max_ms: int = 60000,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.linger_seconds = max(0, linger_ms) / 1000.0
+        self.retry_base_seconds = max(1, retry_base_ms) / 1000.0
+        self.retry_max_seconds = max(retry_base_ms, retry_max_ms) / 1000.0
+
+        # product_id -> (op, monotonic time the ID first entered the queue).
+        # Re-enqueueing an ID keeps its original timestamp so lag is measured
+        # from the first unsent change, and the latest op wins.
+        self._pending: "OrderedDict[int, Tuple[str, float]]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        # Backoff after a batch had to be requeued; 0 while healthy
+        self._retry_delay = 0.0
+        self._retry_at = 0.0
+
+        self._stats = {
+            "enqueued_total": 0,
+            "merged_total": 0,
+            "indexed_total": 0,
+            "deleted_total": 0,
+            "failed_total": 0,  # per-document errors and failed requests (requeued)
+            "retried_total": 0,  # product IDs put back in the queue
+            "dropped_total": 0,  # still unsent at shutdown
+            "batches_total": 0,
+            "last_batch_size": 0,
+            "last_batch_lag_ms": 0.0,
+            "max_batch_lag_ms": 0.0,
+            "last_flush_at": None,
+        }
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def enqueue_many(self, changes: Dict[int, str]) -> None:
+        """Queue {product_id: op} changes collected from one committed transaction."""
+        if not changes:
+            return
+        self._ensure_started()
+        now = time.monotonic()
+        with self._cond:
+            for product_id, op in changes.items():
+                existing = self._pending.get(product_id)
+                if existing is not None:
+                    self._stats["merged_total"] += 1
+                    self._pending[product_id] = (op, existing[1])
+                else:
+                    self._pending[product_id] = (op, now)
+                self._stats["enqueued_total"] += 1
+            self._cond.notify()
+
+    def enqueue(self, product_id: int, op: str = OP_INDEX) -> None:
+        self.enqueue_many({product_id: op})
+
+    # ------------------------------------------------------------------
+    # Worker lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="search-index-queue", daemon=True
+            )
+            self._thread.start()
+        logger.info(
+            "Search index queue started (batch_size=%d, linger_ms=%d)",
+            self.batch_size, int(self.linger_seconds * 1000),
+        )
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the worker after it drains whatever is still pending."""
+        with self._cond:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._cond.notify()
+        thread.join(timeout)
+        with self._cond:
+            self._thread = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if batch:
+                self._flush(batch)
+
+    def _next_batch(self) -> Optional[List[Tuple[int, str, float]]]:
+        """Block until a batch is ready. Returns None once stopped and drained."""
+        with self._cond:
+            while not self._pending and not self._stopping:
+                self._cond.wait()
+            if not self._pending and self._stopping:
+                return None
+
+            # Back off after a failed batch; stopping skips the wait
+            while not self._stopping and time.monotonic() < self._retry_at:
+                self._cond.wait(self._retry_at - time.monotonic())
+
+            # Linger so bursts (e.g. one checkout touching many products) go out
+            # as a single bulk request instead of one request per change.
+            deadline = time.monotonic() + self.linger_seconds
+            while not self._stopping and len(self._pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                product_id, (op, enqueued_at) = self._pending.popitem(last=False)
+                batch.append((product_id, op, enqueued_at))
+            return batch
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+
+    def _flush(self, batch: List[Tuple[int, str, float]]) -> None:
+        # Imported lazily: the backends import the Product model, which
+        # imports this module for its mapper listeners.
+        from src.search.backends import get_search_backend
+
+        index_ids = [pid for pid, op, _ in batch if op == OP_INDEX]
+        delete_ids = [pid for pid, op, _ in batch if op == OP_DELETE]
+        indexed = deleted = failed = 0
+        retry_ids: set = set()
+
+        backend = get_search_backend(fallback=False)
+        if not backend.is_available():
+            retry_ids.update(pid for pid, _, _ in batch)
+            logger.warning(f"Search backend {backend.name} not available - requeued {len(batch)} index changes")
+        else:
+            try:
+                if index_ids:
+                    db = SessionLocal()
+                    try:
+                        # Inactive or vanished products are removed here too.
+                        result = backend.index_products(db, index_ids)
+                    finally:
+                        db.close()
+                    indexed += result["indexed"]
+                    deleted += result["deleted"]
+                    failed += result["errors"]
+                    retry_ids.update(_failed_ids(result, index_ids))
+
+                if delete_ids:
+                    result = backend.delete_products(delete_ids)
+                    deleted += result["deleted"]
+                    failed += result["errors"]
+                    retry_ids.update(_failed_ids(result, delete_ids))
+            except Exception as e:
+                failed = len(batch)
+                retry_ids.update(pid for pid, _, _ in batch)
+                logger.error(f"Search index batch of {len(batch)} failed, requeued: {str(e)}")
+
+        self._requeue([entry for entry in batch if entry[0] in retry_ids])
+
+        lag_ms = (time.monotonic() - min(enqueued_at for _, _, enqueued_at in batch)) * 1000
+        with self._cond:
+            self._stats["indexed_total"] += indexed
+            self._stats["deleted_total"] += deleted
+            self._stats["failed_total"] += failed
+            self._stats["batches_total"] += 1
+            self._stats["last_batch_size"] = len(batch)
+            self._stats["last_batch_lag_ms"] = round(lag_ms, 1)
+            self._stats["max_batch_lag_ms"] = round(max(self._stats["max_batch_lag_ms"], lag_ms), 1)
+            self._stats["last_flush_at"] = time.time()
+
+    def _requeue(self, entries: List[Tuple[int, str, float]]) -> None:
+        """Put unsent changes back and back off, or reset the backoff if there are none"""
+        with self._cond:
+            if not entries:
+                self._retry_delay = 0.0
+                self._retry_at = 0.0
+                return
+            if self._stopping:
+                self._stats["dropped_total"] += len(entries)
+                logger.warning(f"Search index queue stopping - dropped {len(entries)} unsent index changes")
+                return
+            for product_id, op, enqueued_at in entries:
+                newer = self._pending.get(product_id)
+                if newer is not None:
+                    # A later change to the product wins; keep the older timestamp
+                    self._pending[product_id] = (newer[0], min(newer[1], enqueued_at))
+                else:
+                    self._pending[product_id] = (op, enqueued_at)
+            self._stats["retried_total"] += len(entries)
+            self._retry_delay = min(
+                self.retry_max_seconds, max(self.retry_base_seconds, self._retry_delay * 2)
+            )
+            self._retry_at = time.monotonic() + self._retry_delay
+            self._cond.notify()
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def metrics(self) -> Dict[str, object]:
+        with self._cond:
+            oldest = next(iter(self._pending.values()), None)
+            stats = dict(self._stats)
+            stats["queue_depth"] = len(self._pending)
+            stats["oldest_pending_age_ms"] = (
+                round((time.monotonic() - oldest[1]) * 1000, 1) if oldest else 0.0
+            )
+            stats["worker_running"] = self._thread is not None and self._thread.is_alive()
+            stats["batch_size"] = self.batch_size
+            stats["linger_ms"] = int(self.linger_seconds * 1000)
+            stats["retry_delay_ms"] = int(self._retry_delay * 1000)
+        return stats
+
+
+def _failed_ids(result: Dict[str, object], product_ids: List[int]) -> List[int]:
+    """IDs of a backend call to retry: its failed_ids, or all of them if it only counted errors"""
+    if not result.get("errors"):
+        return []
+    failed = result.get("failed_ids")
+    return list(failed) if failed is not None else list(product_ids)
+
+
+index_queue = SearchIndexQueue(
+    batch_size=settings.search_index_batch_size,
+    linger_ms=settings.search_index_linger_ms,
+    retry_base_ms=settings.search_index_retry_base_ms,
+    retry_max_ms=settings.search_index_retry_max_ms,
+)
+atexit.register(index_queue.stop)
+
+
+# ----------------------------------------------------------------------
+# Per-transaction change capture
+# ----------------------------------------------------------------------
+
+def mark_products_dirty(session: Optional[Session], product_ids: Iterable[int], op: str = OP_INDEX) -> None:
+    """Record products to reindex once `session` commits.
+
+    Without a session (detached object, script context) the change is queued
+    immediately since there is no transaction to wait for.
+    """
+    ids = [pid for pid in product_ids if pid is not None]
+    if not ids:
+        return
+    if session is None:
+        index_queue.enqueue_many({pid: op for pid in ids})
+        return
+    dirty = session.info.setdefault(_SESSION_KEY, {})
+    for pid in ids:
+        dirty[pid] = op
+
+
+def mark_product_dirty(session: Optional[Session], product_id: int, op: str = OP_INDEX) -> None:
+    mark_products_dirty(session, [product_id], op)
+
+
+@event.listens_for(Session, "after_commit")
+def _ship_dirty_products(session: Session) -> None:
+    dirty = session.info.pop(_SESSION_KEY, None)
+    if dirty:
+        index_queue.enqueue_many(dirty)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_dirty_products(session: Session) -> None:
+    session.info.pop(_SESSION_KEY, None)
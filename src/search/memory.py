@@ -0,0 +1,364 @@
+# src/search/memory.py
+"""
+Pure-Python in-memory search backend.
+
+An inverted index over the same documents Elasticsearch gets
+(src/search/document_builder.py), scored with BM25. Meant for tests, offline
+load testing and small deployments that don't want to run a cluster; it holds
+every active product in process memory and is rebuilt from the database on
+first use.
+
+Query semantics follow the Elasticsearch path: every query term must match
+(operator "and"), the last term also matches as a prefix so search-as-you-type
+works, and the same filters (typed spec filters included), sort options and
+facets are supported.
+"""
+import bisect
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from config.settings import settings
+from src.search.document_builder import build_documents
+from src.search.popularity import popularity_multiplier
+from src.search.specs import matches_spec_filters, spec_facets
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters (Elasticsearch defaults).
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Field weights, applied by repeating a field's terms when computing tf.
+FIELD_WEIGHTS = {
+    'name': 3,
+    'brand': 2,
+    'category_name': 1,
+    'subcategory_name': 1,
+    'description': 1,
+}
+
+POPULARITY_FACTOR = settings.search_popularity_boost_factor
+
+FACET_SIZE = 10
+PRICE_RANGES = [('0-50', 0, 50), ('50-100', 50, 100), ('100-500', 100, 500), ('500+', 500, None)]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+class InMemorySearchBackend:
+    name = "memory"
+
+    def __init__(self):
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Set[str]] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._total_len = 0
+        # Sorted vocabulary / names for prefix lookups, rebuilt lazily.
+        self._terms: List[str] = []
+        self._names_lower: List[str] = []
+        self._names: List[str] = []
+        self._sorted_dirty = False
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+
+    def is_available(self) -> bool:
+        return True
+
+    def load(self, db: Session) -> int:
+        """(Re)build the whole index from the database"""
+        from src.models.product import Product
+
+        ids = [pid for (pid,) in db.query(Product.product_id).filter(Product.is_active == True)]
+        documents, _ = build_documents(db, ids)
+        with self._lock:
+            self._clear()
+            for doc in documents:
+                self._add(doc)
+            self._loaded = True
+        logger.info(f"In-memory search index loaded with {len(documents)} products")
+        return len(documents)
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+
+    def add_documents(self, documents: Iterable[Dict[str, Any]]) -> None:
+        """Index prebuilt documents directly (tests, load-test fixtures)"""
+        with self._lock:
+            for doc in documents:
+                self._remove(doc['product_id'])
+                self._add(doc)
+            self._loaded = True
+
+    def index_products(self, db: Session, product_ids: List[int]) -> Dict[str, int]:
+        documents, removed_ids = build_documents(db, product_ids)
+        with self._lock:
+            for doc in documents:
+                self._remove(doc['product_id'])
+                self._add(doc)
+            deleted = sum(1 for pid in removed_ids if self._remove(pid))
+        return {'indexed': len(documents), 'deleted': deleted, 'errors': 0}
+
+    def delete_products(self, product_ids: List[int]) -> Dict[str, int]:
+        with self._lock:
+            deleted = sum(1 for pid in product_ids if self._remove(pid))
+        return {'deleted': deleted, 'errors': 0}
+
+    def update_popularity(self, scores: Dict[int, float]) -> Dict[str, int]:
+        updated = 0
+        with self._lock:
+            for pid, score in scores.items():
+                doc = self._docs.get(pid)
+                if doc is not None:
+                    doc['popularity_score'] = score
+                    updated += 1
+        return {'updated': updated, 'missing': len(scores) - updated, 'errors': 0}
+
+    def _clear(self) -> None:
+        self._docs.clear()
+        self._postings.clear()
+        self._doc_terms.clear()
+        self._doc_len.clear()
+        self._total_len = 0
+        self._sorted_dirty = True
+
+    def _add(self, doc: Dict[str, Any]) -> None:
+        pid = doc['product_id']
+        tf: Counter = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(doc.get(field)):
+                tf[term] += weight
+        for term, count in tf.items():
+            self._postings[term][pid] = count
+        self._docs[pid] = doc
+        self._doc_terms[pid] = set(tf)
+        self._doc_len[pid] = sum(tf.values())
+        self._total_len += self._doc_len[pid]
+        self._sorted_dirty = True
+
+    def _remove(self, pid: int) -> bool:
+        if pid not in self._docs:
+            return False
+        for term in self._doc_terms.pop(pid):
+            postings = self._postings[term]
+            postings.pop(pid, None)
+            if not postings:
+                del self._postings[term]
+        self._total_len -= self._doc_len.pop(pid)
+        del self._docs[pid]
+        self._sorted_dirty = True
+        return True
+
+    def _refresh_sorted(self) -> None:
+        if self._sorted_dirty:
+            self._terms = sorted(self._postings)
+            names: Dict[str, str] = {}
+            for pid in sorted(self._docs):
+                name = self._docs[pid].get('name')
+                if name:
+                    names.setdefault(name.lower(), name)
+            self._names_lower = sorted(names)
+            self._names = [names[lower] for lower in self._names_lower]
+            self._sorted_dirty = False
+
+    @staticmethod
+    def _prefix_range(items: List[str], prefix: str) -> List[str]:
+        start = bisect.bisect_left(items, prefix)
+        end = bisect.bisect_left(items, prefix + '\U0010ffff', start)
+        return items[start:end]
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        db: Session,
+        query: str,
+        category_id: Optional[int] = None,
+        subcategory_id: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        brand: Optional[str] = None,
+        in_stock_only: bool = True,
+        sort_by: str = 'relevance',
+        page: int = 1,
+        size: int = 20,
+        spec_filters: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        self._ensure_loaded(db)
+
+        with self._lock:
+            self._refresh_sorted()
+            scores = self._score(tokenize(query))
+
+            def keep(doc: Dict[str, Any]) -> bool:
+                if not doc.get('is_active'):
+                    return False
+                if in_stock_only and not (doc.get('stock_quantity') or 0) > 0:
+                    return False
+                if category_id and doc.get('category_id') != category_id:
+                    return False
+                if subcategory_id and doc.get('subcategory_id') != subcategory_id:
+                    return False
+                price = doc.get('price')
+                if min_price is not None and (price is None or price < min_price):
+                    return False
+                if max_price is not None and (price is None or price > max_price):
+                    return False
+                if brand and doc.get('brand') != brand:
+                    return False
+                return matches_spec_filters(doc, spec_filters)
+
+            matched = [
+                (pid, score) for pid, score in scores.items() if keep(self._docs[pid])
+            ]
+            docs = self._docs
+
+            def created_desc(m):
+                created = docs[m[0]].get('created_at')
+                return (created is None, -created.timestamp() if created else 0, m[0])
+
+            if sort_by == 'price_low':
+                matched.sort(key=lambda m: (docs[m[0]].get('price') is None, docs[m[0]].get('price') or 0, m[0]))
+            elif sort_by == 'price_high':
+                matched.sort(key=lambda m: (docs[m[0]].get('price') is None, -(docs[m[0]].get('price') or 0), m[0]))
+            elif sort_by == 'newest':
+                matched.sort(key=created_desc)
+            elif sort_by == 'popularity':
+                matched.sort(key=lambda m: (-(docs[m[0]].get('popularity_score') or 0), -m[1], m[0]))
+            elif query and POPULARITY_FACTOR > 0:
+                # Same blend as the Elasticsearch function_score
+                matched.sort(key=lambda m: (
+                    -m[1] * popularity_multiplier(docs[m[0]].get('popularity_score'), POPULARITY_FACTOR), m[0]
+                ))
+            else:
+                matched.sort(key=lambda m: (-m[1], m[0]))
+
+            total = len(matched)
+            start = (page - 1) * size
+            products = []
+            for pid, score in matched[start:start + size]:
+                doc = docs[pid]
+                products.append({
+                    'product_id': pid,
+                    'name': doc.get('name'),
+                    'description': doc.get('description'),
+                    'price': doc.get('price'),
+                    'category_name': doc.get('category_name'),
+                    'subcategory_name': doc.get('subcategory_name'),
+                    'brand': doc.get('brand'),
+                    'stock_quantity': doc.get('stock_quantity'),
+                    'primary_image_url': doc.get('primary_image_url'),
+                    'sku': doc.get('sku'),
+                    'score': round(score, 4),
+                })
+            facets = self._facets(docs[pid] for pid, _ in matched)
+
+        return {
+            'products': products,
+            'total': total,
+            'page': page,
+            'size': size,
+            'total_pages': (total + size - 1) // size,
+            'facets': facets,
+            'took': int((time.perf_counter() - started) * 1000)
+        }
+
+    async def search_async(self, db: Session, query: str, **params: Any) -> Dict[str, Any]:
+        return await run_in_threadpool(self.search, db, query, **params)
+
+    def _score(self, terms: List[str]) -> Dict[int, float]:
+        """BM25 scores of every doc containing all terms (last one as prefix)"""
+        if not terms:
+            return {pid: 0.0 for pid in self._docs}
+
+        n_docs = len(self._docs) or 1
+        avg_len = (self._total_len / n_docs) or 1.0
+
+        scores: Optional[Dict[int, float]] = None
+        for i, term in enumerate(terms):
+            expansions = [term]
+            if i == len(terms) - 1:
+                expansions = self._prefix_range(self._terms, term) or [term]
+
+            term_scores: Dict[int, float] = {}
+            for expansion in expansions:
+                postings = self._postings.get(expansion)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for pid, tf in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[pid] / avg_len)
+                    value = idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    if value > term_scores.get(pid, 0.0):
+                        term_scores[pid] = value
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pid: s + term_scores[pid] for pid, s in scores.items() if pid in term_scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+    @staticmethod
+    def _facets(docs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        categories: Counter = Counter()
+        brands: Counter = Counter()
+        prices = {key: 0 for key, _, _ in PRICE_RANGES}
+        docs = list(docs)
+        for doc in docs:
+            if doc.get('category_name'):
+                categories[doc['category_name']] += 1
+            if doc.get('brand'):
+                brands[doc['brand']] += 1
+            price = doc.get('price')
+            if price is not None:
+                for key, low, high in PRICE_RANGES:
+                    if price >= low and (high is None or price < high):
+                        prices[key] += 1
+                        break
+        return {
+            'specifications': spec_facets(docs),
+            'categories': [{'name': k, 'count': v} for k, v in categories.most_common(FACET_SIZE)],
+            'brands': [{'name': k, 'count': v} for k, v in brands.most_common(FACET_SIZE)],
+            'price_ranges': [{'range': key, 'count': prices[key]} for key, _, _ in PRICE_RANGES],
+        }
+
+    # ------------------------------------------------------------------
+    # Autocomplete
+    # ------------------------------------------------------------------
+
+    def suggest(self, db: Session, query: str, size: int = 10) -> List[str]:
+        """Product names starting with `query` (case-insensitive)"""
+        self._ensure_loaded(db)
+        prefix = (query or '').strip().lower()
+        if not prefix:
+            return []
+        with self._lock:
+            self._refresh_sorted()
+            start = bisect.bisect_left(self._names_lower, prefix)
+            end = bisect.bisect_left(self._names_lower, prefix + '\U0010ffff', start)
+            return self._names[start:min(end, start + size)]
+
+    async def suggest_async(self, db: Session, query: str, size: int = 10) -> List[str]:
+        return await run_in_threadpool(self.suggest, db, query, size)
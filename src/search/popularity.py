@@ -0,0 +1,271 @@
+# src/search/popularity.py
+"""
+Popularity signal behind `popularity_score`.
+
+A periodic job folds three signals into one exponentially decayed velocity
+per product:
+
+  - units sold      (order_items of orders that were not cancelled/returned)
+  - cart additions  (cart_items.added_at)
+  - search clicks   (search_clicks, recorded by POST /search/click)
+
+Each event counts `weight * 0.5 ** (age_days / half_life_days)`, so a sale
+today is worth twice one from a half-life ago and events older than the
+window are ignored. Counts are grouped per product and day in SQL; only the
+decay happens in Python.
+
+Scores are stored in products.popularity_score (so full reindexes carry
+them) and pushed to the search backend as partial updates, only for the
+products whose score actually moved. Elasticsearch blends the score into
+relevance with a function_score (see ElasticsearchService._build_search).
+"""
+import logging
+import math
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+
+from config.database import SessionLocal
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Rows per executemany UPDATE of products.popularity_score.
+WRITE_CHUNK_SIZE = 1000
+
+# A score is re-sent when it moves by more than this (absolute or relative).
+MIN_ABS_CHANGE = 0.001
+MIN_REL_CHANGE = 0.01
+
+
+def _as_date(value: Any) -> date:
+    # func.date() returns a date on Postgres and an ISO string on SQLite.
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def decay(age_days: float, half_life_days: float) -> float:
+    return 0.5 ** (max(age_days, 0.0) / half_life_days)
+
+
+def changed_scores(
+    previous: Dict[int, float],
+    current: Dict[int, float],
+) -> Dict[int, float]:
+    """Scores that moved enough to be written, including ones that fell to 0"""
+    changed: Dict[int, float] = {}
+    for pid in set(previous) | set(current):
+        old = previous.get(pid, 0.0)
+        new = current.get(pid, 0.0)
+        delta = abs(new - old)
+        if delta > MIN_ABS_CHANGE and delta > MIN_REL_CHANGE * old:
+            changed[pid] = new
+    return changed
+
+
+class PopularityJob:
+    """Computes popularity scores and pushes the changed ones to search"""
+
+    def __init__(
+        self,
+        refresh_seconds: int = 3600,
+        half_life_days: float = 14.0,
+        window_days: int = 90,
+        sale_weight: float = 1.0,
+        cart_weight: float = 0.3,
+        click_weight: float = 0.1,
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.half_life_days = half_life_days
+        self.window_days = window_days
+        self.weights = {"sales": sale_weight, "cart": cart_weight, "clicks": click_weight}
+        # Scores written to the database but not yet accepted by the search
+        # backend (e.g. Elasticsearch was down); retried on the next run.
+        self._pending: Dict[int, float] = {}
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats: Dict[str, Any] = {
+            "runs": 0,
+            "last_run_at": None,
+            "last_run_ms": 0.0,
+            "scored_products": 0,
+            "changed": 0,
+            "pushed": 0,
+            "push_errors": 0,
+            "last_error": None,
+        }
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def _signal_rows(self, db: Session, since: datetime) -> Iterable[Tuple[str, int, Any, float]]:
+        """(signal, product_id, day, count) grouped per product and day"""
+        from src.models.cart import CartItem
+        from src.models.order import Order, OrderItem, OrderStatus
+        from src.models.search_click import SearchClick
+
+        sales_day = func.date(OrderItem.created_at)
+        sales = db.query(
+            OrderItem.product_id, sales_day, func.sum(OrderItem.quantity)
+        ).join(Order, Order.order_id == OrderItem.order_id).filter(
+            OrderItem.created_at >= since,
+            Order.order_status.notin_([OrderStatus.CANCELLED, OrderStatus.RETURNED]),
+        ).group_by(OrderItem.product_id, sales_day)
+        for pid, day, count in sales:
+            yield "sales", pid, day, count
+
+        cart_day = func.date(CartItem.added_at)
+        carts = db.query(CartItem.product_id, cart_day, func.count()).filter(
+            CartItem.added_at >= since
+        ).group_by(CartItem.product_id, cart_day)
+        for pid, day, count in carts:
+            yield "cart", pid, day, count
+
+        click_day = func.date(SearchClick.clicked_at)
+        clicks = db.query(SearchClick.product_id, click_day, func.count()).filter(
+            SearchClick.clicked_at >= since
+        ).group_by(SearchClick.product_id, click_day)
+        for pid, day, count in clicks:
+            yield "clicks", pid, day, count
+
+    def compute_scores(self, db: Session, now: Optional[datetime] = None) -> Dict[int, float]:
+        now = now or datetime.utcnow()
+        since = now - timedelta(days=self.window_days)
+        today = now.date()
+
+        scores: Dict[int, float] = {}
+        for signal, pid, day, count in self._signal_rows(db, since):
+            age = (today - _as_date(day)).days
+            value = self.weights[signal] * float(count or 0) * decay(age, self.half_life_days)
+            if value > 0:
+                scores[pid] = scores.get(pid, 0.0) + value
+        return {pid: round(score, 4) for pid, score in scores.items()}
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _stored_scores(db: Session) -> Dict[int, float]:
+        from src.models.product import Product
+        rows = db.query(Product.product_id, Product.popularity_score).filter(Product.popularity_score > 0)
+        return {pid: score for pid, score in rows}
+
+    @staticmethod
+    def _write_scores(db: Session, scores: Dict[int, float]) -> None:
+        """Core UPDATE, so the ORM indexing hooks don't re-send whole documents"""
+        from src.models.product import Product
+
+        products = Product.__table__
+        stmt = update(products).where(
+            products.c.product_id == bindparam("b_product_id")
+        ).values(
+            popularity_score=bindparam("b_score"),
+            # Keep the Core onupdate from touching updated_at on every run.
+            updated_at=products.c.updated_at,
+        )
+        items = [{"b_product_id": pid, "b_score": score} for pid, score in scores.items()]
+        for start in range(0, len(items), WRITE_CHUNK_SIZE):
+            db.execute(stmt, items[start:start + WRITE_CHUNK_SIZE])
+        db.commit()
+
+    def run_once(self, db: Optional[Session] = None) -> Dict[str, Any]:
+        """Recompute every score, store the changed ones and push them to search"""
+        from src.search.backends import get_search_backend
+
+        with self._run_lock:
+            started = time.perf_counter()
+            own_session = db is None
+            if own_session:
+                db = SessionLocal()
+            try:
+                scores = self.compute_scores(db)
+                changed = changed_scores(self._stored_scores(db), scores)
+                if changed:
+                    self._write_scores(db, changed)
+            finally:
+                if own_session:
+                    db.close()
+
+            self._pending.update(changed)
+            pushed = 0
+            if self._pending:
+                backend = get_search_backend(fallback=False)
+                if backend.is_available():
+                    try:
+                        result = backend.update_popularity(dict(self._pending))
+                        pushed = result.get("updated", 0)
+                        self._stats["push_errors"] += result.get("errors", 0)
+                        if not result.get("errors"):
+                            self._pending.clear()
+                    except Exception as e:
+                        self._stats["push_errors"] += 1
+                        self._stats["last_error"] = str(e)
+                        logger.error(f"Popularity push failed: {str(e)}")
+
+            self._stats["runs"] += 1
+            self._stats["last_run_at"] = time.time()
+            self._stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self._stats["scored_products"] = len(scores)
+            self._stats["changed"] = len(changed)
+            self._stats["pushed"] = pushed
+            logger.info(
+                f"Popularity: {len(scores)} scored, {len(changed)} changed, "
+                f"{pushed} pushed, {len(self._pending)} pending"
+            )
+            return {"scored": len(scores), "changed": len(changed), "pushed": pushed,
+                    "pending": len(self._pending)}
+
+    # ------------------------------------------------------------------
+    # Background refresh
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="search-popularity", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self._stats["last_error"] = str(e)
+                logger.error(f"Popularity refresh failed: {str(e)}")
+            self._stop.wait(self.refresh_seconds)
+
+    def metrics(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["pending"] = len(self._pending)
+        stats["half_life_days"] = self.half_life_days
+        stats["window_days"] = self.window_days
+        return stats
+
+
+def popularity_multiplier(score: Optional[float], factor: float) -> float:
+    """Relevance multiplier matching the ES field_value_factor (modifier log2p)"""
+    return math.log10(2 + factor * (score or 0.0))
+
+
+popularity_job = PopularityJob(
+    refresh_seconds=settings.search_popularity_refresh_seconds,
+    half_life_days=settings.search_popularity_half_life_days,
+    window_days=settings.search_popularity_window_days,
+    sale_weight=settings.search_popularity_sale_weight,
+    cart_weight=settings.search_popularity_cart_weight,
+    click_weight=settings.search_popularity_click_weight,
+)
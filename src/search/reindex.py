@@ -0,0 +1,337 @@
+# src/search/reindex.py
+"""
+Zero-downtime (blue/green) reindexing behind the `ecommerce_products` alias.
+
+Searches and incremental index writes always go through the alias. A reindex
+builds a fresh versioned index (`ecommerce_products_v<N>`) next to the live
+one, streams active products into it in keyset-paginated chunks through
+`parallel_bulk` with refresh disabled, and then points the alias at it in one
+atomic `update_aliases` call. The previous index keeps serving until the swap.
+
+Writes made during the build went to the old index through the alias. After
+the swap, products updated since the job started are requeued, and documents
+of products that were deleted (or deactivated) meanwhile are removed from the
+new index, so nothing deleted during the build comes back as a ghost result.
+This is checked against the products table, so deletes made by any worker
+process are caught.
+
+Jobs run on a background thread; progress is kept in-process and polled via
+GET /search/reindex/{job_id}. Only one job runs at a time.
+"""
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.database import SessionLocal
+from src.search.document_builder import build_document, product_load_options
+
+logger = logging.getLogger(__name__)
+
+INDEX_ALIAS = "ecommerce_products"
+
+REINDEX_CHUNK_SIZE = 1000
+REINDEX_BULK_THREADS = 4
+
+# Applied while the new index is loading and restored before the swap.
+_BUILD_SETTINGS = {"index": {"refresh_interval": "-1", "number_of_replicas": 0}}
+_LIVE_SETTINGS = {"index": {"refresh_interval": "1s"}}
+
+
+def _es():
+    # Resolved at call time so the job always uses the service's current
+    # client, with the long reindex timeout instead of the search one.
+    from config.elasticsearch import client_for
+    from src.services import search as search_service
+    return client_for("reindex", search_service.es_client)
+
+
+def versioned_index_name() -> str:
+    return f"{INDEX_ALIAS}_v{int(time.time() * 1000)}"
+
+
+def create_versioned_index(name: str) -> None:
+    """Create an index with the ProductDocument mapping under a versioned name"""
+    from src.documents.search import ProductDocument
+
+    ProductDocument._index.clone(name=name).create(using=_es())
+
+
+def alias_targets() -> List[str]:
+    """Indices the alias currently points at (empty if the alias does not exist)"""
+    client = _es()
+    if not client.indices.exists_alias(name=INDEX_ALIAS):
+        return []
+    return list(client.indices.get_alias(name=INDEX_ALIAS).keys())
+
+
+def ensure_alias() -> None:
+    """Make sure `ecommerce_products` resolves to something searchable.
+
+    A legacy concrete index with the alias name is left alone; the first
+    blue/green reindex replaces it atomically.
+    """
+    client = _es()
+    if client.indices.exists_alias(name=INDEX_ALIAS) or client.indices.exists(index=INDEX_ALIAS):
+        add_missing_fields(client)
+        return
+    name = versioned_index_name()
+    create_versioned_index(name)
+    client.indices.update_aliases(actions=[{"add": {"index": name, "alias": INDEX_ALIAS}}])
+    logger.info(f"Created search index {name} behind alias {INDEX_ALIAS}")
+
+
+def add_missing_fields(client=None) -> List[str]:
+    """Put fields added to ProductDocument since the live index was created.
+
+    New fields are an additive mapping change, so queries and aggregations on
+    them work right away; existing documents only get values after a reindex.
+    """
+    from src.documents.search import ProductDocument
+
+    client = client or _es()
+    wanted = ProductDocument._doc_type.mapping.to_dict()["properties"]
+    missing: Dict[str, Any] = {}
+    for mapping in client.indices.get_mapping(index=INDEX_ALIAS).body.values():
+        existing = mapping.get("mappings", {}).get("properties", {})
+        missing.update({name: field for name, field in wanted.items() if name not in existing})
+    if missing:
+        client.indices.put_mapping(index=INDEX_ALIAS, properties=missing)
+        logger.info(f"Added fields {sorted(missing)} to {INDEX_ALIAS}; reindex to populate them")
+    return sorted(missing)
+
+
+def swap_alias(new_index: str) -> List[str]:
+    """Atomically point the alias at `new_index`. Returns the indices it left."""
+    client = _es()
+    old_indices = alias_targets()
+    actions: List[Dict[str, Any]] = [{"add": {"index": new_index, "alias": INDEX_ALIAS}}]
+    actions.extend({"remove": {"index": old, "alias": INDEX_ALIAS}} for old in old_indices)
+    if not old_indices and client.indices.exists(index=INDEX_ALIAS):
+        # Pre-alias deployments have a concrete index with the alias name;
+        # drop it in the same call so the name never resolves to nothing.
+        actions.append({"remove_index": {"index": INDEX_ALIAS}})
+    client.indices.update_aliases(actions=actions)
+
+    from src.search.cache import search_cache
+    search_cache.invalidate()
+    return old_indices
+
+
+class ReindexJob:
+    """State and runner for one blue/green reindex"""
+
+    def __init__(self, chunk_size: int = REINDEX_CHUNK_SIZE, thread_count: int = REINDEX_BULK_THREADS):
+        self.job_id = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.thread_count = thread_count
+        self.status = "pending"
+        self.index_name: Optional[str] = None
+        self.total = 0
+        self.processed = 0
+        self.success = 0
+        self.errors = 0
+        self.pruned = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "index": self.index_name,
+            "alias": INDEX_ALIAS,
+            "total": self.total,
+            "processed": self.processed,
+            "success": self.success,
+            "errors": self.errors,
+            "pruned": self.pruned,
+            "progress": round(self.processed / self.total * 100, 1) if self.total else (100.0 if self.status == "completed" else 0.0),
+            "error": self.error,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def run(self) -> Dict[str, Any]:
+        from elasticsearch.helpers import parallel_bulk
+        from src.models.product import Product
+
+        self.status = "running"
+        self.started_at = datetime.now(timezone.utc)
+        client = _es()
+        try:
+            db = SessionLocal()
+            try:
+                self.total = db.query(Product).filter(Product.is_active == True).count()
+            finally:
+                db.close()
+
+            self.index_name = versioned_index_name()
+            create_versioned_index(self.index_name)
+            client.indices.put_settings(index=self.index_name, settings=_BUILD_SETTINGS)
+            logger.info(f"Reindex {self.job_id}: building {self.index_name} for {self.total} products")
+
+            def actions() -> Iterator[Dict[str, Any]]:
+                for product in self._stream_products(Product):
+                    yield {
+                        '_index': self.index_name,
+                        '_id': product.product_id,
+                        '_source': build_document(product),
+                    }
+
+            for ok, item in parallel_bulk(
+                client,
+                actions(),
+                thread_count=self.thread_count,
+                chunk_size=min(self.chunk_size, 500),
+                raise_on_error=False,
+            ):
+                self.processed += 1
+                if ok:
+                    self.success += 1
+                else:
+                    self.errors += 1
+                    logger.warning(f"Reindex {self.job_id}: failed item {item}")
+
+            client.indices.put_settings(index=self.index_name, settings=_LIVE_SETTINGS)
+            client.indices.refresh(index=self.index_name)
+
+            old_indices = swap_alias(self.index_name)
+            for old in old_indices:
+                client.indices.delete(index=old, ignore_unavailable=True)
+
+            self._catch_up(Product)
+            self._prune_deleted(client, Product)
+            self.status = "completed"
+            logger.info(f"Reindex {self.job_id}: alias {INDEX_ALIAS} now points at {self.index_name}")
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            logger.error(f"Reindex {self.job_id} failed: {str(e)}")
+            if self.index_name:
+                try:
+                    if self.index_name not in alias_targets():
+                        client.indices.delete(index=self.index_name, ignore_unavailable=True)
+                except Exception:
+                    pass
+        finally:
+            self.finished_at = datetime.now(timezone.utc)
+        return self.to_dict()
+
+    def _stream_products(self, Product) -> Iterator[Any]:
+        """Yield active products in primary-key order, one bounded chunk at a time"""
+        last_id = 0
+        while True:
+            db = SessionLocal()
+            try:
+                query = db.query(Product).options(*product_load_options()).filter(
+                    Product.is_active == True,
+                    Product.product_id > last_id,
+                ).order_by(Product.product_id).limit(self.chunk_size)
+                count = 0
+                for product in query.yield_per(self.chunk_size):
+                    count += 1
+                    last_id = product.product_id
+                    yield product
+            finally:
+                db.close()
+            if count < self.chunk_size:
+                return
+
+    def _catch_up(self, Product) -> None:
+        """Requeue products changed while the new index was being built.
+
+        Incremental writes during the build went to the old index through the
+        alias, so anything touched since the job started is sent again.
+        """
+        from src.search.indexer import index_queue, OP_INDEX
+
+        db = SessionLocal()
+        try:
+            changed = db.query(Product.product_id).filter(
+                Product.updated_at >= self.started_at
+            ).all()
+        finally:
+            db.close()
+        if changed:
+            index_queue.enqueue_many({product_id: OP_INDEX for (product_id,) in changed})
+
+    def _prune_deleted(self, client, Product) -> None:
+        """Remove documents whose product is gone or inactive from the new index.
+
+        A product streamed into the new index and then hard-deleted before the
+        swap had its delete applied to the old index only. The new index's
+        IDs are scanned in chunks and checked against active products.
+        """
+        from elasticsearch.helpers import bulk, scan
+
+        client.indices.refresh(index=self.index_name)
+        hits = scan(client, index=self.index_name, query={"query": {"match_all": {}}},
+                    _source=False, size=self.chunk_size)
+        stale: List[int] = []
+        chunk: List[int] = []
+        for hit in hits:
+            chunk.append(int(hit["_id"]))
+            if len(chunk) >= self.chunk_size:
+                stale.extend(self._missing_products(Product, chunk))
+                chunk = []
+        if chunk:
+            stale.extend(self._missing_products(Product, chunk))
+        if not stale:
+            return
+
+        success, _ = bulk(client, (
+            {"_op_type": "delete", "_index": self.index_name, "_id": product_id}
+            for product_id in stale
+        ), raise_on_error=False)
+        self.pruned = success
+        logger.info(f"Reindex {self.job_id}: removed {success} products deleted during the build")
+
+    @staticmethod
+    def _missing_products(Product, product_ids: List[int]) -> List[int]:
+        db = SessionLocal()
+        try:
+            found = {pid for (pid,) in db.query(Product.product_id).filter(
+                Product.product_id.in_(product_ids),
+                Product.is_active == True,
+            )}
+        finally:
+            db.close()
+        return [pid for pid in product_ids if pid not in found]
+
+
+class ReindexJobRegistry:
+    """In-process registry of reindex jobs, at most one running at a time"""
+
+    def __init__(self, keep: int = 20):
+        self._jobs: Dict[str, ReindexJob] = {}
+        self._lock = threading.Lock()
+        self._keep = keep
+
+    def start(self) -> ReindexJob:
+        with self._lock:
+            running = self._running()
+            if running is not None:
+                return running
+            job = ReindexJob()
+            self._jobs[job.job_id] = job
+            self._prune()
+        threading.Thread(target=job.run, name=f"reindex-{job.job_id[:8]}", daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[ReindexJob]:
+        return self._jobs.get(job_id)
+
+    def _running(self) -> Optional[ReindexJob]:
+        return next((j for j in self._jobs.values() if j.status in ("pending", "running")), None)
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.status in ("completed", "failed")]
+        for job in finished[:max(0, len(self._jobs) - self._keep)]:
+            self._jobs.pop(job.job_id, None)
+
+
+reindex_jobs = ReindexJobRegistry()
@@ -0,0 +1,269 @@
+# src/search/specs.py
+"""
+Typed product specifications for search.
+
+`Product.specifications` is free-form JSON. For search, each spec that has an
+active SpecificationTemplate on the product's subcategory is indexed by the
+template's `spec_type`:
+
+  - select / boolean -> `spec_keywords`  (nested {name, value} keywords)
+  - number           -> `spec_numbers`   (nested {name, value} doubles;
+                        "8GB" or "6.5 inch" index as 8 and 6.5)
+  - text             -> full-text only, via the `specifications` text field
+
+Nested name/value pairs keep one spec's name tied to its own value, so
+"RAM=8GB" cannot match a product with RAM=4GB and Storage=8GB, and one
+nested terms aggregation yields value counts for every spec at once.
+
+Spec filters come in as `{name: {"values": [...]}}` or
+`{name: {"gte": x, "lte": y}}` (see `parse_spec_filters`). Values of one
+spec are alternatives; a product has to match every named spec, and both
+the values and the range when a spec has both.
+"""
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SPEC_KEYWORD_TYPES = ('select', 'boolean')
+SPEC_NUMBER_TYPE = 'number'
+
+# Facet sizes: specs per response, values per spec.
+SPEC_FACET_NAMES = 20
+SPEC_FACET_VALUES = 10
+
+_NUMBER_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)")
+
+SpecFilters = Dict[str, Dict[str, Any]]
+
+
+def parse_number(value: Any) -> Optional[float]:
+    """Leading number of a spec value: 8 -> 8.0, "8GB" -> 8.0, "abc" -> None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = _NUMBER_RE.match(value)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def _keyword(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value).strip()
+
+
+def spec_types(templates: Iterable[Any]) -> Dict[str, Tuple[str, str]]:
+    """lowercased spec name -> (template spec name, spec type) for active templates"""
+    return {
+        template.spec_name.lower(): (template.spec_name, template.spec_type)
+        for template in templates
+        if template.is_active is not False and template.spec_name
+    }
+
+
+def typed_specs(
+    specifications: Optional[Dict[str, Any]],
+    types: Dict[str, Tuple[str, str]],
+) -> Tuple[List[Dict[str, str]], List[Dict[str, Any]]]:
+    """Split a product's specifications into keyword and numeric name/value pairs"""
+    keywords: List[Dict[str, str]] = []
+    numbers: List[Dict[str, Any]] = []
+    if not isinstance(specifications, dict):
+        return keywords, numbers
+
+    for key, raw in specifications.items():
+        typed = types.get(str(key).lower())
+        if typed is None or raw is None:
+            continue
+        name, spec_type = typed
+        for value in (raw if isinstance(raw, list) else [raw]):
+            if spec_type in SPEC_KEYWORD_TYPES:
+                text = _keyword(value)
+                if text:
+                    keywords.append({'name': name, 'value': text})
+            elif spec_type == SPEC_NUMBER_TYPE:
+                number = parse_number(value)
+                if number is not None:
+                    numbers.append({'name': name, 'value': number})
+    return keywords, numbers
+
+
+def specifications_text(specifications: Optional[Dict[str, Any]]) -> str:
+    """"Name: value" lines for the full-text `specifications` field"""
+    if not isinstance(specifications, dict):
+        return ""
+    return "\n".join(f"{key}: {value}" for key, value in specifications.items() if value is not None)
+
+
+def parse_spec_filters(raw: Optional[List[str]]) -> Optional[SpecFilters]:
+    """Parse repeated `spec` query params.
+
+    "Size:M" and "Size:L" become {"Size": {"values": ["L", "M"]}}; "RAM:4..16",
+    "RAM:8.." and "RAM:..16" become ranges. Raises ValueError on bad input.
+    """
+    if not raw:
+        return None
+    filters: SpecFilters = {}
+    for item in raw:
+        name, sep, value = item.partition(':')
+        name, value = name.strip(), value.strip()
+        if not sep or not name or not value:
+            raise ValueError(f"Invalid spec filter '{item}', expected name:value or name:min..max")
+
+        if '..' in value:
+            low, _, high = value.partition('..')
+            bounds = {}
+            for key, bound in (('gte', low.strip()), ('lte', high.strip())):
+                if bound:
+                    number = parse_number(bound)
+                    if number is None:
+                        raise ValueError(f"Invalid number '{bound}' in spec filter '{item}'")
+                    bounds[key] = number
+            if not bounds:
+                raise ValueError(f"Empty range in spec filter '{item}'")
+            filters.setdefault(name, {}).update(bounds)
+        else:
+            values = filters.setdefault(name, {}).setdefault('values', [])
+            if value not in values:
+                values.append(value)
+
+    for spec in filters.values():
+        if 'values' in spec:
+            spec['values'].sort()
+    return filters
+
+
+# ----------------------------------------------------------------------
+# Elasticsearch
+# ----------------------------------------------------------------------
+
+def es_spec_filter_queries(Q, spec_filters: Optional[SpecFilters]) -> List[Any]:
+    """Filter clauses for every named spec"""
+    clauses = []
+    for name, spec in (spec_filters or {}).items():
+        if spec.get('values'):
+            options = []
+            options.append(Q('nested', path='spec_keywords', query=Q('bool', filter=[
+                Q('term', **{'spec_keywords.name': name}),
+                Q('terms', **{'spec_keywords.value': spec['values']}),
+            ])))
+            numbers = [n for n in (parse_number(v) for v in spec['values']) if n is not None]
+            if numbers:
+                options.append(Q('nested', path='spec_numbers', query=Q('bool', filter=[
+                    Q('term', **{'spec_numbers.name': name}),
+                    Q('terms', **{'spec_numbers.value': numbers}),
+                ])))
+            clauses.append(options[0] if len(options) == 1 else Q('bool', should=options, minimum_should_match=1))
+        bounds = {k: spec[k] for k in ('gte', 'lte') if k in spec}
+        if bounds:
+            clauses.append(Q('nested', path='spec_numbers', query=Q('bool', filter=[
+                Q('term', **{'spec_numbers.name': name}),
+                Q('range', **{'spec_numbers.value': bounds}),
+            ])))
+    return clauses
+
+
+def add_es_spec_aggregations(search, values: int = SPEC_FACET_VALUES) -> None:
+    """Per-spec value counts and numeric min/max, in the search's own request"""
+    search.aggs.bucket('spec_keywords', 'nested', path='spec_keywords') \
+        .bucket('names', 'terms', field='spec_keywords.name', size=SPEC_FACET_NAMES) \
+        .bucket('values', 'terms', field='spec_keywords.value', size=values) \
+        .bucket('products', 'reverse_nested')
+    names = search.aggs.bucket('spec_numbers', 'nested', path='spec_numbers') \
+        .bucket('names', 'terms', field='spec_numbers.name', size=SPEC_FACET_NAMES)
+    names.metric('min', 'min', field='spec_numbers.value')
+    names.metric('max', 'max', field='spec_numbers.value')
+    names.bucket('values', 'terms', field='spec_numbers.value', size=values) \
+        .bucket('products', 'reverse_nested')
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def es_spec_facets(aggregations) -> Dict[str, Any]:
+    """`specifications` facet from the aggregations added above.
+
+    {name: {"type": "keyword", "values": [{"value", "count"}]}} or
+    {name: {"type": "number", "min", "max", "values": [...]}}; counts are
+    products, not nested spec entries.
+    """
+    facets: Dict[str, Any] = {}
+    if hasattr(aggregations, 'spec_keywords'):
+        for bucket in aggregations.spec_keywords.names.buckets:
+            facets[bucket.key] = {
+                'type': 'keyword',
+                'values': [
+                    {'value': value.key, 'count': value.products.doc_count}
+                    for value in bucket['values'].buckets
+                ],
+            }
+    if hasattr(aggregations, 'spec_numbers'):
+        for bucket in aggregations.spec_numbers.names.buckets:
+            facets[bucket.key] = {
+                'type': 'number',
+                'min': bucket['min'].value,
+                'max': bucket['max'].value,
+                'values': [
+                    {'value': _format_number(value.key), 'count': value.products.doc_count}
+                    for value in bucket['values'].buckets
+                ],
+            }
+    return facets
+
+
+# ----------------------------------------------------------------------
+# In-process matching (memory backend)
+# ----------------------------------------------------------------------
+
+def matches_spec_filters(doc: Dict[str, Any], spec_filters: Optional[SpecFilters]) -> bool:
+    for name, spec in (spec_filters or {}).items():
+        keywords = [kv['value'] for kv in doc.get('spec_keywords') or () if kv['name'] == name]
+        numbers = [kv['value'] for kv in doc.get('spec_numbers') or () if kv['name'] == name]
+        if spec.get('values'):
+            wanted = set(spec['values'])
+            wanted_numbers = {n for n in (parse_number(v) for v in wanted) if n is not None}
+            if not (any(v in wanted for v in keywords) or any(n in wanted_numbers for n in numbers)):
+                return False
+        if ('gte' in spec or 'lte' in spec) and not any(
+            ('gte' not in spec or n >= spec['gte']) and ('lte' not in spec or n <= spec['lte'])
+            for n in numbers
+        ):
+            return False
+    return True
+
+
+def spec_facets(docs: Iterable[Dict[str, Any]], values: int = SPEC_FACET_VALUES) -> Dict[str, Any]:
+    """Same shape as `es_spec_facets`, counted over in-process documents"""
+    keyword_counts: Dict[str, Counter] = defaultdict(Counter)
+    number_counts: Dict[str, Counter] = defaultdict(Counter)
+    names: Counter = Counter()
+    for doc in docs:
+        for field, counts in (('spec_keywords', keyword_counts), ('spec_numbers', number_counts)):
+            seen = {(kv['name'], kv['value']) for kv in doc.get(field) or ()}
+            for name, value in seen:
+                counts[name][value] += 1
+            for name in {name for name, _ in seen}:
+                names[name] += 1
+
+    facets: Dict[str, Any] = {}
+    for name, _ in names.most_common(SPEC_FACET_NAMES):
+        if name in keyword_counts:
+            facets[name] = {
+                'type': 'keyword',
+                'values': [{'value': v, 'count': c} for v, c in keyword_counts[name].most_common(values)],
+            }
+        else:
+            counts = number_counts[name]
+            facets[name] = {
+                'type': 'number',
+                'min': min(counts),
+                'max': max(counts),
+                'values': [
+                    {'value': _format_number(v), 'count': c} for v, c in counts.most_common(values)
+                ],
+            }
+    return facets
@@ -0,0 +1,437 @@
+# src/search/suggestions.py
+"""
+Autocomplete for /search/suggestions.
+
+Suggestions come from product names, category names, brands and popular past
+queries, each with a weight:
+
+  - products: their popularity_score (decayed sales/cart/click velocity,
+    see src/search/popularity.py), so best sellers complete first
+  - categories and brands: how many active products carry them
+  - queries: clicks on results of that query in search_clicks over the
+    popularity window, so they survive restarts and are shared by workers
+
+They are served from:
+
+  - Elasticsearch: a dedicated `ecommerce_suggestions` index with a
+    `completion` field (SuggestionDocument). Lookups hit the in-memory FST
+    and come back ordered by weight, without running a search.
+  - Everything else (ES down, postgres backend): an in-process prefix trie
+    that keeps the top entries at every node, so a lookup is a walk down
+    len(prefix) nodes.
+
+Both are rebuilt together by `suggestion_index.rebuild()`, on startup and
+then every SEARCH_SUGGEST_REFRESH_SECONDS by a background thread. A request
+that arrives before the first build only builds the trie (`ensure_local`).
+"""
+import bisect
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from config.database import SessionLocal
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_ALIAS = "ecommerce_suggestions"
+
+KIND_PRODUCT = "product"
+KIND_CATEGORY = "category"
+KIND_BRAND = "brand"
+KIND_QUERY = "query"
+
+# Weight of a product with no popularity yet; every point of
+# popularity_score (about one recent sale) adds PRODUCT_POPULARITY_WEIGHT.
+PRODUCT_BASE_WEIGHT = 1
+PRODUCT_POPULARITY_WEIGHT = 10
+
+# A click on a query's results counts this many times a product with no
+# popularity does.
+QUERY_WEIGHT = 5
+
+# Distinct past queries offered as suggestions.
+MAX_POPULAR_QUERIES = 1000
+
+# Entries kept per trie node; /search/suggestions allows size <= 20.
+TRIE_TOP_K = 20
+
+# Trie depth cap, which keeps memory bounded for long product names. Nodes
+# at this depth keep every entry below them (not just the top K), so longer
+# prefixes walk here and filter the full list.
+TRIE_MAX_DEPTH = 16
+
+MAX_SUGGEST_WEIGHT = 2 ** 31 - 1
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _inputs(text: str) -> List[str]:
+    """Completion inputs: the full text plus every suffix starting at a word,
+    so "Galaxy S24 Ultra" also completes on "s24" and "ultra"."""
+    words = _normalize(text).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def popular_queries(
+    db: Session,
+    window_days: int,
+    limit: int = MAX_POPULAR_QUERIES,
+) -> List[Tuple[str, int]]:
+    """(query, clicks) of the most clicked-through queries of the last window_days"""
+    from src.models.search_click import SearchClick
+
+    # Spellings are merged here; each query shows as its most clicked one.
+    clicks = func.count(SearchClick.click_id)
+    rows = db.query(SearchClick.query, clicks).filter(
+        SearchClick.query.isnot(None),
+        SearchClick.clicked_at >= datetime.utcnow() - timedelta(days=window_days),
+    ).group_by(SearchClick.query).order_by(clicks.desc()).limit(limit * 4)
+
+    counts: Counter = Counter()
+    display: Dict[str, str] = {}
+    for query, count in rows:
+        key = _normalize(query)
+        if len(key) < 2:
+            continue
+        counts[key] += count
+        display.setdefault(key, query.strip())
+    return [(display[k], n) for k, n in counts.most_common(limit)]
+
+
+class SuggestionTrie:
+    """Prefix trie holding the top-K (weight, text) entries at every node,
+    and all of them at the depth cap"""
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self):
+        # node = (children, top) where top is sorted by (-weight, text)
+        self._root: Tuple[Dict[str, Any], List[Tuple[int, str]]] = ({}, [])
+        self._size = 0
+
+    def insert(self, text: str, weight: int) -> None:
+        entry = (-weight, text)
+        for key in _inputs(text):
+            node = self._root
+            self._offer(node, entry, TRIE_TOP_K)
+            for depth, ch in enumerate(key[:TRIE_MAX_DEPTH], 1):
+                children = node[0]
+                child = children.get(ch)
+                if child is None:
+                    child = children[ch] = ({}, [])
+                node = child
+                self._offer(node, entry, None if depth == TRIE_MAX_DEPTH else TRIE_TOP_K)
+        self._size += 1
+
+    @staticmethod
+    def _offer(node, entry: Tuple[int, str], limit: Optional[int]) -> None:
+        top = node[1]
+        i = bisect.bisect_left(top, entry)
+        if i < len(top) and top[i] == entry:
+            return
+        if limit is not None and i >= limit:
+            return
+        top.insert(i, entry)
+        if limit is not None and len(top) > limit:
+            top.pop()
+
+    def lookup(self, prefix: str, size: int = 10) -> List[str]:
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        node = self._root
+        for ch in prefix[:TRIE_MAX_DEPTH]:
+            node = node[0].get(ch)
+            if node is None:
+                return []
+        if len(prefix) <= TRIE_MAX_DEPTH:
+            return [text for _, text in node[1][:size]]
+        matches = []
+        for _, text in node[1]:
+            if any(key.startswith(prefix) for key in _inputs(text)):
+                matches.append(text)
+                if len(matches) == size:
+                    break
+        return matches
+
+    def __len__(self) -> int:
+        return self._size
+
+
+def collect_suggestions(db: Session, popular: Optional[List[Tuple[str, int]]] = None) -> List[Dict[str, Any]]:
+    """Weighted suggestion entries, de-duplicated case-insensitively"""
+    from src.models.category import Category
+    from src.models.product import Product
+
+    entries: Dict[str, Dict[str, Any]] = {}
+
+    def add(text: Optional[str], kind: str, weight: int) -> None:
+        if not text or not text.strip() or weight <= 0:
+            return
+        key = _normalize(text)
+        entry = entries.get(key)
+        if entry is None:
+            entries[key] = {"text": text.strip(), "kind": kind, "weight": weight}
+        else:
+            entry["weight"] = min(entry["weight"] + weight, MAX_SUGGEST_WEIGHT)
+
+    brands: Counter = Counter()
+    names: Counter = Counter()
+    rows = db.query(Product.name, Product.specifications, Product.popularity_score).filter(Product.is_active == True)
+    for name, specs, score in rows.yield_per(1000):
+        names[name] += PRODUCT_BASE_WEIGHT + round((score or 0.0) * PRODUCT_POPULARITY_WEIGHT)
+        if isinstance(specs, dict):
+            brand = specs.get('Brand') or specs.get('brand')
+            if isinstance(brand, str):
+                brands[brand] += 1
+
+    category_counts = db.query(Category.name, func.count(Product.product_id)).join(
+        Product, Product.category_id == Category.category_id
+    ).filter(Product.is_active == True, Category.is_active == True).group_by(Category.name).all()
+
+    for name, count in category_counts:
+        add(name, KIND_CATEGORY, count)
+    for brand, count in brands.items():
+        add(brand, KIND_BRAND, count)
+    for name, count in names.items():
+        add(name, KIND_PRODUCT, count)
+    for query, count in popular or []:
+        add(query, KIND_QUERY, count * QUERY_WEIGHT)
+
+    return list(entries.values())
+
+
+class SuggestionIndex:
+    """Builds and serves suggestions from Elasticsearch or the local trie"""
+
+    def __init__(self, refresh_seconds: int = 900):
+        self.refresh_seconds = refresh_seconds
+        self._trie = SuggestionTrie()
+        self._trie_ready = False
+        self._es_ready = False
+        self._build_lock = threading.Lock()
+        self._es_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            "entries": 0,
+            "popular_queries": 0,
+            "last_build_at": None,
+            "last_build_ms": 0.0,
+            "es_lookups": 0,
+            "trie_lookups": 0,
+            "es_errors": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def rebuild(self, db: Optional[Session] = None) -> int:
+        """Rebuild the trie and, when Elasticsearch is up, the suggestion index.
+
+        Run by the background thread. The trie is swapped in before the
+        Elasticsearch index is rebuilt, so lookups waiting on the trie
+        (`ensure_local`) never wait for the cluster.
+        """
+        started = time.perf_counter()
+        with self._build_lock:
+            entries = self._build_trie(db)
+
+        with self._es_lock:
+            try:
+                self._es_ready = self._rebuild_es_index(entries)
+            except Exception as e:
+                self._es_ready = False
+                logger.error(f"Suggestion index rebuild failed: {str(e)}")
+
+        self._stats["last_build_at"] = time.time()
+        self._stats["last_build_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Suggestions rebuilt: {len(entries)} entries (es={self._es_ready})")
+        return len(entries)
+
+    def ensure_local(self, db: Optional[Session] = None) -> None:
+        """Build the trie if no build has finished yet; Elasticsearch is left
+        to the background thread. Requests queued behind a build reuse it."""
+        if self._trie_ready:
+            return
+        with self._build_lock:
+            if not self._trie_ready:
+                self._build_trie(db)
+
+    def _build_trie(self, db: Optional[Session]) -> List[Dict[str, Any]]:
+        """Collect the entries and swap in a new trie; caller holds _build_lock"""
+        own_session = db is None
+        if own_session:
+            db = SessionLocal()
+        try:
+            popular = popular_queries(db, settings.search_popularity_window_days)
+            entries = collect_suggestions(db, popular)
+        finally:
+            if own_session:
+                db.close()
+
+        trie = SuggestionTrie()
+        for entry in entries:
+            trie.insert(entry["text"], entry["weight"])
+        self._trie = trie
+        self._trie_ready = True
+        self._stats["entries"] = len(entries)
+        self._stats["popular_queries"] = len(popular)
+        return entries
+
+    @staticmethod
+    def _rebuild_es_index(entries: List[Dict[str, Any]]) -> bool:
+        from src.services.search import ElasticsearchService
+        if not ElasticsearchService.is_available():
+            return False
+
+        from elasticsearch.helpers import bulk
+        from src.documents.search import SuggestionDocument
+        from src.search.reindex import _es
+
+        client = _es()
+        new_index = f"{SUGGEST_ALIAS}_v{int(time.time() * 1000)}"
+        SuggestionDocument._index.clone(name=new_index).create(using=client)
+
+        bulk(client, (
+            {
+                "_index": new_index,
+                "_source": {
+                    "text": entry["text"],
+                    "kind": entry["kind"],
+                    "weight": entry["weight"],
+                    "suggest": {"input": _inputs(entry["text"]), "weight": entry["weight"]},
+                },
+            }
+            for entry in entries
+        ), refresh=True)
+
+        old_indices = []
+        if client.indices.exists_alias(name=SUGGEST_ALIAS):
+            old_indices = list(client.indices.get_alias(name=SUGGEST_ALIAS).keys())
+        actions = [{"add": {"index": new_index, "alias": SUGGEST_ALIAS}}]
+        actions.extend({"remove": {"index": old, "alias": SUGGEST_ALIAS}} for old in old_indices)
+        client.indices.update_aliases(actions=actions)
+        for old in old_indices:
+            client.indices.delete(index=old, ignore_unavailable=True)
+        return True
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def suggest(self, query: str, size: int = 10, db: Optional[Session] = None) -> List[str]:
+        """Completion suggester when available, else the local trie"""
+        if not query or len(query.strip()) < 2:
+            return []
+        from src.search.breaker import es_breaker
+        if self._es_ready and es_breaker.allow():
+            try:
+                return self._suggest_es(query, size)
+            except Exception as e:
+                self._stats["es_errors"] += 1
+                logger.warning(f"Completion suggester failed, using local trie: {str(e)}")
+        return self.suggest_local(query, size, db)
+
+    async def suggest_async(self, query: str, size: int = 10, db: Optional[Session] = None) -> List[str]:
+        """`suggest` for async handlers: the completion suggester runs on the
+        pooled AsyncElasticsearch client, and the first trie build (the only
+        blocking part of a local lookup) runs in the threadpool."""
+        if not query or len(query.strip()) < 2:
+            return []
+        from config.elasticsearch import get_async_client
+        from src.search.breaker import es_breaker
+        if self._es_ready and es_breaker.allow():
+            try:
+                async_client = get_async_client()
+                if async_client is None:
+                    return await run_in_threadpool(self._suggest_es, query, size)
+                return await self._suggest_es_async(query, size, async_client)
+            except Exception as e:
+                self._stats["es_errors"] += 1
+                logger.warning(f"Completion suggester failed, using local trie: {str(e)}")
+        if not self._trie_ready:
+            await run_in_threadpool(self.ensure_local, db)
+        return self.suggest_local(query, size, db)
+
+    @staticmethod
+    def _completion_request(query: str, size: int) -> Dict[str, Any]:
+        return {
+            "index": SUGGEST_ALIAS,
+            "size": 0,
+            "source": ["text"],
+            "suggest": {
+                "autocomplete": {
+                    "prefix": _normalize(query),
+                    "completion": {"field": "suggest", "size": size, "skip_duplicates": True},
+                }
+            },
+        }
+
+    def _completion_texts(self, response, size: int) -> List[str]:
+        self._stats["es_lookups"] += 1
+        options = response["suggest"]["autocomplete"][0]["options"]
+        return list(dict.fromkeys(option["_source"]["text"] for option in options))[:size]
+
+    def _suggest_es(self, query: str, size: int) -> List[str]:
+        from config.elasticsearch import client_for
+        from src.search.breaker import es_breaker
+
+        with es_breaker.guard():
+            response = client_for("suggest").search(**self._completion_request(query, size))
+        return self._completion_texts(response, size)
+
+    async def _suggest_es_async(self, query: str, size: int, async_client) -> List[str]:
+        from config.elasticsearch import client_for
+        from src.search.breaker import es_breaker
+
+        with es_breaker.guard():
+            response = await client_for("suggest", async_client).search(**self._completion_request(query, size))
+        return self._completion_texts(response, size)
+
+    def suggest_local(self, query: str, size: int = 10, db: Optional[Session] = None) -> List[str]:
+        self.ensure_local(db)
+        self._stats["trie_lookups"] += 1
+        return self._trie.lookup(query, size)
+
+    # ------------------------------------------------------------------
+    # Background refresh
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="search-suggestions", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.error(f"Suggestion refresh failed: {str(e)}")
+            self._stop.wait(self.refresh_seconds)
+
+    def metrics(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["es_ready"] = self._es_ready
+        stats["trie_entries"] = len(self._trie)
+        return stats
+
+
+suggestion_index = SuggestionIndex(refresh_seconds=settings.search_suggest_refresh_seconds)
@@ -0,0 +1,320 @@
+# src/services/cart_cache.py
+"""
+Per-customer cart cache.
+
+Each entry is the customer's cart reduced to (product_id, quantity,
+price_at_time) tuples, which is all the header badge (GET /cart/count) and
+the cart summaries need. CartService writes the entry through after every
+cart mutation it commits, so those reads never go to the database.
+
+Product changes are caught with version checks instead of by finding every
+cart that holds the product. A global epoch counter is bumped whenever the
+price or stock of products changes, and each product records the epoch of
+its last change. An entry remembers the epoch read *before* its rows were
+loaded, and is stale as soon as any of its products has a newer version. A
+change that commits while an entry is being built therefore still
+invalidates it.
+
+Bumps happen after commit: ORM changes to price/stock columns are picked up
+by a Session after_flush hook, and Core updates (InventoryService.apply_deltas)
+call `mark_products`. Cart writes outside CartService (checkout emptying
+the cart) call `mark_customers` to drop the entry.
+
+With CART_CACHE_REDIS_URL the entries, epoch and versions live in Redis and
+are shared by all workers; otherwise they are kept in-process, which is only
+coherent when a single worker serves the API. Redis errors count as misses.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from src.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # the shared tier is optional
+    redis = None
+
+_EPOCH_KEY = "cart_cache:epoch"
+_VERSIONS_KEY = "cart_cache:product_versions"
+
+# Key under Session.info for changes to apply once the transaction commits
+_SESSION_KEY = "cart_cache_pending"
+
+# Product columns that make cached carts stale
+WATCHED_ATTRIBUTES = ("price", "base_price", "calculated_price", "discount_percent", "stock_quantity", "is_active")
+
+CartRow = Tuple[int, int, Decimal]
+
+
+class CartSnapshot(NamedTuple):
+    cart_id: Optional[int]  # None: the customer has no cart yet
+    items: Tuple[CartRow, ...]  # (product_id, quantity, price_at_time)
+    epoch: int
+
+    @property
+    def total_items(self) -> int:
+        return len(self.items)
+
+    @property
+    def total_quantity(self) -> int:
+        return sum(quantity for _, quantity, _ in self.items)
+
+    @property
+    def total_amount(self) -> Decimal:
+        return sum((Decimal(quantity) * price for _, quantity, price in self.items), Decimal("0.00"))
+
+
+def _encode(snapshot: CartSnapshot) -> str:
+    return json.dumps({
+        "cart_id": snapshot.cart_id,
+        "items": [[pid, quantity, str(price)] for pid, quantity, price in snapshot.items],
+        "epoch": snapshot.epoch,
+    }, separators=(",", ":"))
+
+
+def _decode(raw: Any) -> CartSnapshot:
+    data = json.loads(raw)
+    return CartSnapshot(
+        cart_id=data["cart_id"],
+        items=tuple((pid, quantity, Decimal(price)) for pid, quantity, price in data["items"]),
+        epoch=data["epoch"],
+    )
+
+
+class CartCache:
+    """Cart snapshots per customer, invalidated by product versions"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_entries: int = 10000,
+        ttl: int = 900,
+        redis_url: Optional[str] = None,
+    ):
+        self.enabled = enabled
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[float, CartSnapshot]]" = OrderedDict()
+        self._epoch = 0
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._shared = None
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "writes": 0,
+            "invalidations": 0,
+            "product_bumps": 0,
+            "shared_errors": 0,
+        }
+
+        if enabled and redis_url:
+            if redis is None:
+                logger.warning("CART_CACHE_REDIS_URL is set but the redis package is not installed")
+            else:
+                try:
+                    self._shared = redis.Redis.from_url(
+                        redis_url, socket_timeout=0.05, socket_connect_timeout=0.1
+                    )
+                except Exception as e:
+                    logger.warning(f"Cart cache shared tier disabled: {str(e)}")
+
+    @staticmethod
+    def _key(customer_id: int) -> str:
+        return f"cart_cache:cart:{customer_id}"
+
+    # ------------------------------------------------------------------
+    # Versions
+    # ------------------------------------------------------------------
+
+    def epoch(self) -> Optional[int]:
+        """Current epoch; read it before loading the rows you are going to put()"""
+        if not self.enabled:
+            return None
+        if self._shared is None:
+            return self._epoch
+        try:
+            value = self._shared.get(_EPOCH_KEY)
+            return int(value) if value is not None else 0
+        except Exception:
+            self._count("shared_errors")
+            return None
+
+    def _product_versions(self, product_ids: Sequence[int]) -> Optional[List[int]]:
+        if not product_ids:
+            return []
+        if self._shared is None:
+            return [self._versions.get(pid, 0) for pid in product_ids]
+        try:
+            return [int(v) if v is not None else 0 for v in self._shared.hmget(_VERSIONS_KEY, list(product_ids))]
+        except Exception:
+            self._count("shared_errors")
+            return None
+
+    def bump_products(self, product_ids: Iterable[int]) -> None:
+        """Make every cached cart holding one of these products stale"""
+        ids = sorted(set(product_ids))
+        if not self.enabled or not ids:
+            return
+        self._count("product_bumps")
+        if self._shared is None:
+            with self._lock:
+                self._epoch += 1
+                for pid in ids:
+                    self._versions[pid] = self._epoch
+            return
+        try:
+            epoch = int(self._shared.incr(_EPOCH_KEY))
+            self._shared.hset(_VERSIONS_KEY, mapping={pid: epoch for pid in ids})
+        except Exception:
+            self._count("shared_errors")
+
+    # ------------------------------------------------------------------
+    # Entries
+    # ------------------------------------------------------------------
+
+    def get(self, customer_id: int) -> Optional[CartSnapshot]:
+        if not self.enabled:
+            return None
+        snapshot = None
+        if self._shared is None:
+            with self._lock:
+                entry = self._entries.get(customer_id)
+                if entry is not None:
+                    if entry[0] < time.monotonic():
+                        del self._entries[customer_id]
+                    else:
+                        self._entries.move_to_end(customer_id)
+                        snapshot = entry[1]
+        else:
+            try:
+                raw = self._shared.get(self._key(customer_id))
+                snapshot = _decode(raw) if raw is not None else None
+            except Exception:
+                self._count("shared_errors")
+
+        if snapshot is None:
+            self._count("misses")
+            return None
+        versions = self._product_versions([pid for pid, _, _ in snapshot.items])
+        if versions is None or any(version > snapshot.epoch for version in versions):
+            self._count("stale")
+            self.invalidate(customer_id)
+            return None
+        self._count("hits")
+        return snapshot
+
+    def put(self, customer_id: int, cart_id: Optional[int], items: Iterable[CartRow], epoch: Optional[int]) -> CartSnapshot:
+        """Store the cart loaded after `epoch` was read; returns the snapshot either way"""
+        snapshot = CartSnapshot(
+            cart_id=cart_id,
+            items=tuple((pid, int(quantity), Decimal(str(price))) for pid, quantity, price in items),
+            epoch=epoch if epoch is not None else -1,
+        )
+        if not self.enabled or epoch is None:
+            return snapshot
+        self._count("writes")
+        if self._shared is None:
+            with self._lock:
+                self._entries[customer_id] = (time.monotonic() + self.ttl, snapshot)
+                self._entries.move_to_end(customer_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        else:
+            try:
+                self._shared.set(self._key(customer_id), _encode(snapshot), ex=self.ttl)
+            except Exception:
+                self._count("shared_errors")
+        return snapshot
+
+    def invalidate(self, customer_id: int) -> None:
+        if not self.enabled:
+            return
+        self._count("invalidations")
+        if self._shared is None:
+            with self._lock:
+                self._entries.pop(customer_id, None)
+            return
+        try:
+            self._shared.delete(self._key(customer_id))
+        except Exception:
+            self._count("shared_errors")
+
+    # ------------------------------------------------------------------
+    # After-commit changes
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _pending(session: Session) -> Dict[str, set]:
+        return session.info.setdefault(_SESSION_KEY, {"products": set(), "customers": set()})
+
+    def mark_products(self, session: Session, product_ids: Iterable[int]) -> None:
+        """Bump these products once the session's transaction commits"""
+        self._pending(session)["products"].update(product_ids)
+
+    def mark_customers(self, session: Session, customer_ids: Iterable[int]) -> None:
+        """Drop these customers' entries once the session's transaction commits"""
+        self._pending(session)["customers"].update(customer_ids)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"] + stats["stale"]
+        stats.update({
+            "enabled": self.enabled,
+            "shared_tier": self._shared is not None,
+            "local_entries": len(self._entries),
+            "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+        })
+        return stats
+
+
+cart_cache = CartCache(
+    enabled=settings.cart_cache_enabled,
+    max_entries=settings.cart_cache_max_entries,
+    ttl=settings.cart_cache_ttl_seconds,
+    redis_url=settings.cart_cache_redis_url or None,
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_product_changes(session: Session, flush_context) -> None:
+    changed = [
+        obj.product_id for obj in session.dirty
+        if isinstance(obj, Product) and any(
+            inspect(obj).attrs[name].history.has_changes() for name in WATCHED_ATTRIBUTES
+        )
+    ]
+    if changed:
+        cart_cache.mark_products(session, changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    pending = session.info.pop(_SESSION_KEY, None)
+    if not pending:
+        return
+    cart_cache.bump_products(pending["products"])
+    for customer_id in pending["customers"]:
+        cart_cache.invalidate(customer_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_SESSION_KEY, None)
@@ -0,0 +1,171 @@
+# src/services/cart_repricing.py
+"""
+Cart repricing: keep cart_items.price_at_time equal to the product's price.
+
+price_at_time is copied from the product when a line is written and is what
+checkout charges. When a product's price or discount changes, the product
+update enqueues a cart.reprice outbox event and the handler reprices every
+cart line holding one of those products together:
+
+  - one query over cart_items (idx_cart_items_product_id) joined to carts
+    finds the affected lines
+  - the products' unit prices are computed in one PriceEngine.price_many
+    batch
+  - one UPDATE per changed product price, sent as a single executemany,
+    rewrites the lines that differ
+
+Cart reads therefore never recompute prices. The lines that did change are
+the price-change notifications: one cart.price_changed event per customer.
+
+It can also run on its own, e.g. after a bulk price import:
+
+    python -m src.services.cart_repricing 12 15     # these products
+    python -m src.services.cart_repricing --all     # every product in a cart
+"""
+import argparse
+import logging
+import sys
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, NamedTuple
+
+from sqlalchemy import bindparam, distinct, update
+from sqlalchemy.orm import Session
+
+from config.database import SessionLocal
+from src.models.cart import Cart, CartItem
+from src.models.product import Product
+from src.services.cart_cache import cart_cache
+from src.services.outbox import OutboxService, EVENT_CART_PRICE_CHANGED, EVENT_CART_REPRICE
+from src.services.price_engine import PriceEngine, NO_PRICE
+
+logger = logging.getLogger(__name__)
+
+# Products per pass of a full run
+PRODUCT_CHUNK_SIZE = 500
+
+
+class RepricedLine(NamedTuple):
+    customer_id: int
+    cart_id: int
+    product_id: int
+    old_price: Decimal
+    new_price: Decimal
+
+
+class CartRepricingService:
+
+    @staticmethod
+    def price_fields(product: Product) -> tuple:
+        """The product columns the effective price is computed from"""
+        return (product.price, product.base_price, product.calculated_price, product.discount_percent)
+
+    @staticmethod
+    def mark_products(db: Session, product_ids: Iterable[int]) -> None:
+        """Queue a reprice of the cart lines holding these products"""
+        ids = sorted(set(product_ids))
+        if ids:
+            OutboxService.enqueue(db, EVENT_CART_REPRICE, {"product_ids": ids})
+
+    @staticmethod
+    def current_prices(db: Session, product_ids: Iterable[int]) -> Dict[int, Decimal]:
+        """Unit price per product in rupees, as stored in cart_items"""
+        products = db.query(Product).filter(Product.product_id.in_(list(product_ids))).all()
+        prices = {}
+        for product, paise in zip(products, PriceEngine.price_many(products)):
+            if paise == NO_PRICE:
+                logger.warning(f"Not repricing cart lines: product {product.product_id} has no price set")
+                continue
+            prices[product.product_id] = PriceEngine.to_rupees(paise)
+        return prices
+
+    @staticmethod
+    def reprice_products(db: Session, product_ids: Iterable[int]) -> List[RepricedLine]:
+        """Reprice every cart line holding these products; returns the lines that changed.
+
+        Runs in the caller's transaction and enqueues one cart.price_changed
+        event per affected customer; nothing is committed here.
+        """
+        ids = sorted(set(product_ids))
+        if not ids:
+            return []
+
+        lines = db.query(Cart.customer_id, CartItem.cart_id, CartItem.product_id, CartItem.price_at_time).join(
+            Cart, Cart.cart_id == CartItem.cart_id
+        ).filter(CartItem.product_id.in_(ids)).all()
+        if not lines:
+            return []
+
+        prices = CartRepricingService.current_prices(db, {line.product_id for line in lines})
+        changed = [
+            RepricedLine(line.customer_id, line.cart_id, line.product_id, line.price_at_time, prices[line.product_id])
+            for line in lines
+            if line.product_id in prices and line.price_at_time != prices[line.product_id]
+        ]
+        if not changed:
+            return []
+
+        table = CartItem.__table__
+        stmt = update(table).where(
+            table.c.product_id == bindparam("target_product_id"),
+            table.c.price_at_time != bindparam("new_price"),
+        ).values(price_at_time=bindparam("new_price"), updated_at=datetime.utcnow())
+        db.execute(stmt, [
+            {"target_product_id": pid, "new_price": prices[pid]}
+            for pid in sorted({line.product_id for line in changed})
+        ])
+
+        per_customer: Dict[int, List[RepricedLine]] = defaultdict(list)
+        for line in changed:
+            per_customer[line.customer_id].append(line)
+        for customer_id, customer_lines in per_customer.items():
+            OutboxService.enqueue(db, EVENT_CART_PRICE_CHANGED, {
+                "lines": [
+                    {"product_id": line.product_id, "old_price": str(line.old_price), "new_price": str(line.new_price)}
+                    for line in customer_lines
+                ],
+            }, aggregate_id=customer_id)
+        # Cached snapshots carry price_at_time; drop them once this commits
+        cart_cache.mark_customers(db, per_customer)
+
+        logger.info(f"Repriced {len(changed)} cart lines of {len(per_customer)} customers")
+        return changed
+
+    @staticmethod
+    def reprice_all(db: Session) -> int:
+        """Reprice every product that is in some cart, committing per chunk"""
+        product_ids = [pid for pid, in db.query(distinct(CartItem.product_id)).order_by(CartItem.product_id)]
+        repriced = 0
+        for start in range(0, len(product_ids), PRODUCT_CHUNK_SIZE):
+            repriced += len(CartRepricingService.reprice_products(
+                db, product_ids[start:start + PRODUCT_CHUNK_SIZE]
+            ))
+            db.commit()
+        return repriced
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Reprice cart lines from current product prices")
+    parser.add_argument("product_ids", nargs="*", type=int)
+    parser.add_argument("--all", action="store_true", help="reprice every product that is in a cart")
+    args = parser.parse_args()
+    if not args.all and not args.product_ids:
+        parser.error("give product IDs or --all")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    db = SessionLocal()
+    try:
+        if args.all:
+            repriced = CartRepricingService.reprice_all(db)
+        else:
+            repriced = len(CartRepricingService.reprice_products(db, args.product_ids))
+            db.commit()
+    finally:
+        db.close()
+    print(f"[cart-repricing] repriced {repriced} lines")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
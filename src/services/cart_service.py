@@ -401,8 +401,8 @@
 
 
 # src/services/cart_service.py
+from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 from typing import Optional, List
 from decimal import Decimal
@@ -412,8 +412,12 @@ import logging
 from src.models.cart import Cart, CartItem
 from src.models.product import Product
 from src.models.customer import Customer
+from src.services.inventory import InventoryService
+from src.services.cart_cache import cart_cache, CartSnapshot
+from src.services.upsert import conflict_insert
+from src.services.price_engine import PriceEngine, NO_PRICE
 from src.schemas.cart import (
-    AddToCartRequest, UpdateCartItemRequest,
+    AddToCartRequest, UpdateCartItemRequest, CartItemsPatchRequest,
     CartResponse, CartItemResponse, ProductInCart,
     AddToCartResponse, RemoveFromCartResponse,
     ClearCartResponse, CartSummary
@@ -426,39 +430,44 @@ class CartService:
     
     @staticmethod
     def _get_product_price(product: Product) -> Decimal:
-        """Get the effective price for a product, handling the new pricing structure.
-
-        Applies vendor-set `discount_percent` so the cart snapshot (and downstream
-        order total) reflects what the customer saw on the product page.
-        """
-        if product.calculated_price is not None:
-            price = Decimal(str(product.calculated_price)) / Decimal('100')  # cents → rupees
-        elif product.base_price is not None:
-            price = Decimal(str(product.base_price)) / Decimal('100')
-        elif product.price is not None:
-            price = product.price
-        else:
+        """Unit price in rupees after `discount_percent` (see PriceEngine)"""
+        paise = PriceEngine.price(product)
+        if paise is None:
             raise ValueError(f"Product {product.product_id} has no price set")
+        return PriceEngine.to_rupees(paise)
+    
+    @staticmethod
+    def _ensure_cart_id(customer_id: int, db: Session) -> int:
+        """The customer's cart_id, creating the cart inside the caller's transaction.
 
-        pct = getattr(product, 'discount_percent', 0) or 0
-        if pct > 0:
-            price = (price * Decimal(100 - pct)) / Decimal(100)
-        return price
+        One INSERT ... ON CONFLICT (customer_id) DO UPDATE ... RETURNING, so
+        two requests creating the same cart cannot collide on
+        unique_customer_cart; the update also stamps the cart's updated_at.
+        Nothing is committed here.
+        """
+        now = datetime.utcnow()
+        insert = conflict_insert(db)
+        if insert is not None:
+            stmt = insert(Cart.__table__).values(customer_id=customer_id, created_at=now, updated_at=now)
+            return db.execute(stmt.on_conflict_do_update(
+                index_elements=["customer_id"],
+                set_={"updated_at": stmt.excluded.updated_at}
+            ).returning(Cart.__table__.c.cart_id)).scalar_one()
+        
+        cart = db.query(Cart).filter(Cart.customer_id == customer_id).first()
+        if not cart:
+            cart = Cart(customer_id=customer_id)
+            db.add(cart)
+            logger.info(f"Created new cart for customer {customer_id}")
+        cart.updated_at = now
+        db.flush()
+        return cart.cart_id
     
     @staticmethod
     def get_or_create_cart(customer_id: int, db: Session) -> Cart:
-        """Get existing cart or create new one for customer"""
+        """Get existing cart or create new one for customer (not committed)"""
         try:
-            cart = db.query(Cart).filter(Cart.customer_id == customer_id).first()
-            
-            if not cart:
-                cart = Cart(customer_id=customer_id)
-                db.add(cart)
-                db.commit()
-                db.refresh(cart)
-                logger.info(f"Created new cart for customer {customer_id}")
-            
-            return cart
+            return db.get(Cart, CartService._ensure_cart_id(customer_id, db))
         except Exception as e:
             db.rollback()
             logger.error(f"Error getting/creating cart for customer {customer_id}: {str(e)}")
@@ -467,17 +476,54 @@ class CartService:
                 detail="Failed to get or create cart"
             )
     
+    @staticmethod
+    def _load_snapshot(customer_id: int, db: Session, cart_id: Optional[int] = None) -> CartSnapshot:
+        """Read the cart's (product_id, quantity, price_at_time) rows and cache them.
+
+        Called after every committed cart write (write-through) and on a
+        cache miss. The epoch is read before the rows, see cart_cache.
+        """
+        epoch = cart_cache.epoch()
+        if cart_id is None:
+            cart_id = db.query(Cart.cart_id).filter(Cart.customer_id == customer_id).scalar()
+        rows = []
+        if cart_id is not None:
+            rows = db.query(CartItem.product_id, CartItem.quantity, CartItem.price_at_time).filter(
+                CartItem.cart_id == cart_id
+            ).order_by(CartItem.cart_item_id).all()
+        return cart_cache.put(customer_id, cart_id, rows, epoch)
+
+    @staticmethod
+    def get_cart_snapshot(customer_id: int, db: Session) -> CartSnapshot:
+        """The customer's cart as tuples, from the cache when it is current"""
+        snapshot = cart_cache.get(customer_id)
+        if snapshot is None:
+            snapshot = CartService._load_snapshot(customer_id, db)
+        return snapshot
+
+    @staticmethod
+    def _summary(snapshot: CartSnapshot) -> CartSummary:
+        return CartSummary(
+            total_items=snapshot.total_items,
+            total_quantity=snapshot.total_quantity,
+            total_amount=snapshot.total_amount
+        )
+
     @staticmethod
     def add_to_cart(
         customer_id: int,
         request: AddToCartRequest,
         db: Session
     ) -> AddToCartResponse:
-        """Add product to customer's cart"""
+        """Add product to customer's cart.
+
+        After the product and hold reads the writes are two statements: the
+        cart upsert (see _ensure_cart_id) and an INSERT ... ON CONFLICT
+        (cart_id, product_id) DO UPDATE that adds to the existing quantity
+        only while the total stays within available stock. Double-clicks
+        therefore add twice instead of failing on unique_cart_product.
+        """
         try:
-            # Get or create cart
-            cart = CartService.get_or_create_cart(customer_id, db)
-            
             # Check if product exists and has stock
             product = db.query(Product).options(
                 joinedload(Product.category)
@@ -500,56 +546,75 @@ class CartService:
                     detail=str(e)
                 )
             
-            if product.stock_quantity < request.quantity:
+            # Stock minus what other customers are holding while they pay
+            held = InventoryService.held_quantities(
+                db, [product.product_id], exclude_customer_id=customer_id
+            ).get(product.product_id, 0)
+            available = max(0, (product.stock_quantity or 0) - held)
+            if available < request.quantity:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Insufficient stock. Only {product.stock_quantity} items available"
+                    detail=f"Insufficient stock. Only {available} items available"
                 )
             
-            # Check if item already in cart
-            cart_item = db.query(CartItem).filter(
-                CartItem.cart_id == cart.cart_id,
-                CartItem.product_id == request.product_id
-            ).first()
+            cart_id = CartService._ensure_cart_id(customer_id, db)
+            now = datetime.utcnow()
             
-            if cart_item:
-                # Update quantity if item exists
-                new_quantity = cart_item.quantity + request.quantity
-                
-                if new_quantity > product.stock_quantity:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Cannot add more items. Maximum available: {product.stock_quantity}"
-                    )
-                
-                cart_item.quantity = new_quantity
-                cart_item.price_at_time = product_price
-                cart_item.updated_at = datetime.utcnow()
-                message = "Product quantity updated in cart"
-                logger.info(f"Updated cart item {cart_item.cart_item_id} quantity to {new_quantity}")
+            insert = conflict_insert(db)
+            if insert is not None:
+                table = CartItem.__table__
+                stmt = insert(table).values(
+                    cart_id=cart_id, product_id=request.product_id, quantity=request.quantity,
+                    price_at_time=product_price, added_at=now, updated_at=now
+                )
+                cart_item = db.execute(stmt.on_conflict_do_update(
+                    index_elements=["cart_id", "product_id"],
+                    set_={
+                        "quantity": table.c.quantity + stmt.excluded.quantity,
+                        "price_at_time": stmt.excluded.price_at_time,
+                        "updated_at": stmt.excluded.updated_at,
+                    },
+                    where=(table.c.quantity + stmt.excluded.quantity) <= available
+                ).returning(
+                    table.c.cart_item_id, table.c.quantity, table.c.price_at_time,
+                    table.c.added_at, table.c.updated_at
+                )).first()
             else:
-                # Add new item to cart
-                cart_item = CartItem(
-                    cart_id=cart.cart_id,
-                    product_id=request.product_id,
-                    quantity=request.quantity,
-                    price_at_time=product_price
+                cart_item = db.query(CartItem).filter(
+                    CartItem.cart_id == cart_id,
+                    CartItem.product_id == request.product_id
+                ).with_for_update().first()
+                if cart_item is None:
+                    cart_item = CartItem(cart_id=cart_id, product_id=request.product_id, quantity=0)
+                    db.add(cart_item)
+                if cart_item.quantity + request.quantity > available:
+                    cart_item = None
+                else:
+                    cart_item.quantity += request.quantity
+                    cart_item.price_at_time = product_price
+                    cart_item.updated_at = now
+                    db.flush()
+            
+            # No row back: the line exists and the guard refused the new total
+            if cart_item is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Cannot add more items. Maximum available: {available}"
                 )
-                db.add(cart_item)
-                message = "Product added to cart"
-                logger.info(f"Added new product {request.product_id} to cart {cart.cart_id}")
             
-            # Update cart timestamp
-            cart.updated_at = datetime.utcnow()
+            if cart_item.quantity == request.quantity:
+                message = "Product added to cart"
+                logger.info(f"Added new product {request.product_id} to cart {cart_id}")
+            else:
+                message = "Product quantity updated in cart"
+                logger.info(f"Updated cart item {cart_item.cart_item_id} quantity to {cart_item.quantity}")
             
+            # Build the response before commit expires the ORM fallback's row
+            cart_item_response = CartService._build_cart_item_response(cart_item, product)
             db.commit()
-            db.refresh(cart_item)
-            
-            # Get cart summary
-            cart_summary = CartService.get_cart_summary(cart.cart_id, db)
             
-            # Prepare response
-            cart_item_response = CartService._build_cart_item_response(cart_item, product)
+            # Get cart summary (and write the cart through to the cache)
+            cart_summary = CartService._summary(CartService._load_snapshot(customer_id, db, cart_id))
             
             return AddToCartResponse(
                 success=True,
@@ -561,13 +626,6 @@ class CartService:
         except HTTPException:
             db.rollback()
             raise
-        except IntegrityError as e:
-            db.rollback()
-            logger.error(f"IntegrityError in add_to_cart: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Failed to add product to cart due to data conflict"
-            )
         except Exception as e:
             db.rollback()
             logger.error(f"Unexpected error in add_to_cart: {str(e)}")
@@ -578,16 +636,23 @@ class CartService:
     
     @staticmethod
     def get_cart(customer_id: int, db: Session) -> CartResponse:
-        """Get customer's cart with all items"""
+        """Get customer's cart with all items.
+
+        Carts are created by the first write, so a customer without one gets
+        an empty cart (cart_id None) and nothing is inserted here.
+        """
         try:
-            cart = CartService.get_or_create_cart(customer_id, db)
+            epoch = cart_cache.epoch()
+            cart = db.query(Cart).filter(Cart.customer_id == customer_id).first()
             
             # Get cart items with product details
-            cart_items = db.query(CartItem).filter(
-                CartItem.cart_id == cart.cart_id
-            ).options(
-                joinedload(CartItem.product).joinedload(Product.category)
-            ).all()
+            cart_items = []
+            if cart is not None:
+                cart_items = db.query(CartItem).filter(
+                    CartItem.cart_id == cart.cart_id
+                ).options(
+                    joinedload(CartItem.product).joinedload(Product.category)
+                ).all()
             
             # Build response
             items = []
@@ -599,12 +664,17 @@ class CartService:
                 items.append(cart_item_response)
                 total_quantity += item.quantity
                 total_amount += cart_item_response.subtotal
+            cart_id = cart.cart_id if cart is not None else None
+            cart_cache.put(
+                customer_id, cart_id,
+                [(item.product_id, item.quantity, item.price_at_time) for item in cart_items], epoch
+            )
             
             return CartResponse(
-                cart_id=cart.cart_id,
-                customer_id=cart.customer_id,
-                created_at=cart.created_at,
-                updated_at=cart.updated_at,
+                cart_id=cart_id,
+                customer_id=customer_id,
+                created_at=cart.created_at if cart is not None else None,
+                updated_at=cart.updated_at if cart is not None else None,
                 items=items,
                 total_items=len(items),
                 total_quantity=total_quantity,
@@ -661,10 +731,13 @@ class CartService:
                     detail=str(e)
                 )
                 
-            if request.quantity > product.stock_quantity:
+            available = InventoryService.available_to_sell(
+                db, [product.product_id], customer_id=customer_id
+            ).get(product.product_id, 0)
+            if request.quantity > available:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Insufficient stock. Only {product.stock_quantity} items available"
+                    detail=f"Insufficient stock. Only {available} items available"
                 )
             
             # Update quantity and price (in case product price changed)
@@ -675,6 +748,7 @@ class CartService:
             
             db.commit()
             db.refresh(cart_item)
+            CartService._load_snapshot(customer_id, db, cart.cart_id)
             
             logger.info(f"Updated cart item {cart_item.cart_item_id} quantity to {request.quantity}")
             
@@ -691,6 +765,125 @@ class CartService:
                 detail="Failed to update cart item"
             )
     
+    @staticmethod
+    def apply_operations(
+        customer_id: int,
+        request: CartItemsPatchRequest,
+        db: Session
+    ) -> CartResponse:
+        """Apply a batch of add/set/remove line changes in one transaction.
+
+        The products are loaded with one IN query and the resulting
+        quantities are checked against available-to-sell stock together,
+        so the batch applies completely or not at all. Changed lines go in
+        with one INSERT ... ON CONFLICT (cart_id, product_id) DO UPDATE,
+        removed ones with one DELETE.
+        """
+        try:
+            cart_id = CartService._ensure_cart_id(customer_id, db)
+            product_ids = sorted({operation.product_id for operation in request.operations})
+            
+            products = {
+                product.product_id: product
+                for product in db.query(Product).filter(Product.product_id.in_(product_ids))
+            }
+            missing = [pid for pid in product_ids if pid not in products]
+            if missing:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Products not found: {missing}"
+                )
+            
+            # Current lines of these products; locked so concurrent batches serialize
+            quantities = dict(db.query(CartItem.product_id, CartItem.quantity).filter(
+                CartItem.cart_id == cart_id,
+                CartItem.product_id.in_(product_ids)
+            ).with_for_update())
+            before = dict(quantities)
+            for operation in request.operations:
+                if operation.op == "add":
+                    quantities[operation.product_id] = quantities.get(operation.product_id, 0) + operation.quantity
+                elif operation.op == "set":
+                    quantities[operation.product_id] = operation.quantity
+                else:
+                    quantities[operation.product_id] = 0
+            
+            changed = {pid: qty for pid, qty in quantities.items() if qty > 0 and qty != before.get(pid)}
+            removed = [pid for pid, qty in quantities.items() if qty == 0 and pid in before]
+            
+            # Stock minus what other customers are holding while they pay
+            available = InventoryService.available_to_sell(db, list(changed), customer_id=customer_id)
+            shortages = [
+                f"{products[pid].name}: only {available.get(pid, 0)} available"
+                for pid, qty in sorted(changed.items()) if qty > available.get(pid, 0)
+            ]
+            if shortages:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Insufficient stock. {'; '.join(shortages)}"
+                )
+            
+            now = datetime.utcnow()
+            changed_ids = sorted(changed)
+            unit_paise = PriceEngine.price_many([products[pid] for pid in changed_ids])
+            unpriced = [pid for pid, paise in zip(changed_ids, unit_paise) if paise == NO_PRICE]
+            if unpriced:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Products have no price set: {unpriced}"
+                )
+            rows = []
+            for pid, paise in zip(changed_ids, unit_paise):
+                rows.append({
+                    "cart_id": cart_id, "product_id": pid, "quantity": changed[pid],
+                    "price_at_time": PriceEngine.to_rupees(paise), "added_at": now, "updated_at": now
+                })
+            
+            if rows:
+                insert = conflict_insert(db)
+                if insert is not None:
+                    stmt = insert(CartItem.__table__).values(rows)
+                    db.execute(stmt.on_conflict_do_update(
+                        index_elements=["cart_id", "product_id"],
+                        set_={
+                            "quantity": stmt.excluded.quantity,
+                            "price_at_time": stmt.excluded.price_at_time,
+                            "updated_at": stmt.excluded.updated_at,
+                        }
+                    ))
+                else:
+                    for row in rows:
+                        item = db.query(CartItem).filter(
+                            CartItem.cart_id == cart_id, CartItem.product_id == row["product_id"]
+                        ).first() or CartItem(cart_id=cart_id, product_id=row["product_id"])
+                        item.quantity, item.price_at_time = row["quantity"], row["price_at_time"]
+                        db.add(item)
+            if removed:
+                db.query(CartItem).filter(
+                    CartItem.cart_id == cart_id,
+                    CartItem.product_id.in_(removed)
+                ).delete(synchronize_session=False)
+            
+            db.commit()
+            logger.info(
+                f"Cart {cart_id}: batch of {len(request.operations)} operations, "
+                f"{len(rows)} lines written, {len(removed)} removed"
+            )
+            
+            # Fresh cart for the response (also writes it through to the cache)
+            return CartService.get_cart(customer_id, db)
+            
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error applying cart operations: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to update cart"
+            )
+    
     @staticmethod
     def remove_from_cart(
         customer_id: int,
@@ -727,8 +920,8 @@ class CartService:
             
             logger.info(f"Removed product {product_id} from cart {cart.cart_id}")
             
-            # Get updated cart summary
-            cart_summary = CartService.get_cart_summary(cart.cart_id, db)
+            # Get updated cart summary (and write the cart through to the cache)
+            cart_summary = CartService._summary(CartService._load_snapshot(customer_id, db, cart.cart_id))
             
             return RemoveFromCartResponse(
                 success=True,
@@ -767,6 +960,7 @@ class CartService:
             db.query(CartItem).filter(CartItem.cart_id == cart.cart_id).delete()
             cart.updated_at = datetime.utcnow()
             db.commit()
+            CartService._load_snapshot(customer_id, db, cart.cart_id)
             
             logger.info(f"Cleared {item_count} items from cart {cart.cart_id}")
             
@@ -817,17 +1011,13 @@ class CartService:
             subtotal = Decimal(str(cart_item.quantity)) * cart_item.price_at_time
 
             # Build product data with safe field access and null checks
-            # Get display price for frontend
-            try:
-                display_price = CartService._get_product_price(product)
-            except ValueError:
-                display_price = Decimal('0.00')  # Fallback to 0 if no price
-            
+            # price_at_time is kept current by cart repricing, so it doubles
+            # as the display price instead of recomputing it per line
             product_data = ProductInCart(
                 product_id=product.product_id,
                 name=product.name or "Unknown Product",
                 description=product.description,
-                price=display_price,  # Use the calculated display price
+                price=cart_item.price_at_time,
                 stock_quantity=product.stock_quantity or 0,
                 storage_capacity=product.storage_capacity,
                 primary_image_url=product.primary_image_url,
@@ -855,22 +1045,25 @@ class CartService:
     def validate_cart_item_stock(cart_id: int, db: Session) -> List[dict]:
         """Validate stock availability for all items in cart before checkout"""
         try:
-            cart_items = db.query(CartItem).options(
-                joinedload(CartItem.product)
-            ).filter(CartItem.cart_id == cart_id).all()
-            
-            stock_issues = []
-            
-            for item in cart_items:
-                if item.quantity > item.product.stock_quantity:
-                    stock_issues.append({
-                        "product_id": item.product_id,
-                        "product_name": item.product.name,
-                        "requested_quantity": item.quantity,
-                        "available_stock": item.product.stock_quantity
-                    })
-            
-            return stock_issues
+            # Only the short lines come back; the comparison runs in SQL
+            rows = db.query(
+                CartItem.product_id, Product.name, CartItem.quantity, Product.stock_quantity
+            ).join(
+                Product, Product.product_id == CartItem.product_id
+            ).filter(
+                CartItem.cart_id == cart_id,
+                CartItem.quantity > func.coalesce(Product.stock_quantity, 0)
+            ).order_by(CartItem.cart_item_id)
+            
+            return [
+                {
+                    "product_id": product_id,
+                    "product_name": name,
+                    "requested_quantity": quantity,
+                    "available_stock": stock or 0
+                }
+                for product_id, name, quantity, stock in rows
+            ]
         except Exception as e:
             logger.error(f"Error validating cart stock: {str(e)}")
             raise HTTPException(
@@ -878,20 +1071,20 @@ class CartService:
                 detail="Failed to validate cart stock"
             )
     
+    @staticmethod
+    def get_customer_cart_summary(customer_id: int, db: Session) -> CartSummary:
+        """Cart totals by customer (served from the cart cache)"""
+        return CartService._summary(CartService.get_cart_snapshot(customer_id, db))
+    
     @staticmethod
     def get_cart_item_count(customer_id: int, db: Session) -> dict:
-        """Get quick cart count for navbar/header display"""
+        """Get quick cart count for navbar/header display (served from the cart cache)"""
         try:
-            cart = db.query(Cart).filter(Cart.customer_id == customer_id).first()
-            
-            if not cart:
-                return {"total_items": 0, "total_quantity": 0}
-            
-            cart_summary = CartService.get_cart_summary(cart.cart_id, db)
+            snapshot = CartService.get_cart_snapshot(customer_id, db)
             
             return {
-                "total_items": cart_summary.total_items,
-                "total_quantity": cart_summary.total_quantity
+                "total_items": snapshot.total_items,
+                "total_quantity": snapshot.total_quantity
             }
         except Exception as e:
             logger.error(f"Error getting cart count: {str(e)}")
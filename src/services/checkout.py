@@ -0,0 +1,255 @@
+# src/services/checkout.py
+"""
+Checkout: turn a customer's cart into an order in one transaction.
+
+Concurrency model: the customer's cart row is locked first (one checkout per
+cart at a time), then every product in the cart with SELECT ... FOR UPDATE in
+ascending product_id order. Every checkout takes product locks in the same
+order, so two carts sharing products queue behind each other instead of
+deadlocking, and stock is checked against rows nobody else can change until
+we commit. Order, order lines, stock decrements and the cart clear-out are
+flushed together and committed once.
+
+Stock is taken off with one batched UPDATE and logged to the inventory
+ledger (src/services/inventory.py). Work that can wait (search stock
+refresh, payment method lookup, vendor notification) is written to the transactional outbox in the same commit
+and run by the outbox worker (src/services/outbox.py).
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import logging
+import secrets
+import string
+
+from sqlalchemy.orm import Session
+
+from src.models.cart import Cart, CartItem
+from src.models.idempotency import IdempotencyRecord
+from src.models.order import Order, OrderItem, PaymentMethod, PaymentStatus
+from src.models.product import Product
+from src.services.idempotency import IdempotencyService
+from src.services.inventory import InventoryService, REASON_CHECKOUT, REASON_CANCEL
+from src.services.outbox import OutboxService, EVENT_PAYMENT_DETAILS, EVENT_VENDOR_ORDER
+from src.services.vendor_stats import VendorStatsService
+from src.services.cart_cache import cart_cache
+from src.services.price_engine import PriceEngine, NO_PRICE
+
+logger = logging.getLogger(__name__)
+
+# Discounts, tax and shipping are PriceEngine's (src/services/price_engine.py)
+DELIVERY_DAYS = 5
+
+ORDER_PLACED_MESSAGE = "Order placed successfully!"
+
+
+class CheckoutError(Exception):
+    """A checkout that cannot go through; maps to HTTP 400"""
+
+
+class EmptyCartError(CheckoutError):
+    def __init__(self):
+        super().__init__("Cart is empty")
+
+
+class InsufficientStockError(CheckoutError):
+    def __init__(self, product_id: int, name: str, available: int, requested: int):
+        self.product_id = product_id
+        self.available = available
+        self.requested = requested
+        super().__init__(
+            f"Insufficient stock for {name}. Available: {available}, Requested: {requested}"
+        )
+
+
+def get_product_price(product: Product) -> Decimal:
+    """Unit price in rupees after the product's discount (see PriceEngine)"""
+    paise = PriceEngine.price(product)
+    if paise is None:
+        raise CheckoutError(f"Product {product.product_id} has no price set")
+    return PriceEngine.to_rupees(paise)
+
+
+def order_created_response(order: Order) -> Dict[str, Any]:
+    """Body of the POST /orders response (OrderCreateResponse)"""
+    return {
+        "order_id": order.order_id,
+        "order_number": order.order_number,
+        "message": ORDER_PLACED_MESSAGE,
+        "total_amount": float(order.total_amount),
+    }
+
+
+def generate_order_number() -> str:
+    timestamp = datetime.now().strftime("%Y%m%d")
+    random_part = ''.join(secrets.choice(string.digits) for _ in range(6))
+    return f"ORD{timestamp}{random_part}"
+
+
+class CheckoutService:
+
+    @staticmethod
+    def lock_products(db: Session, product_ids: Iterable[int]) -> Dict[int, Product]:
+        """SELECT ... FOR UPDATE on the products, in ascending ID order"""
+        return InventoryService.lock_products(db, product_ids)
+
+    @staticmethod
+    def check_stock(
+        db: Session,
+        quantities: Dict[int, int],
+        customer_id: Optional[int] = None,
+    ) -> Dict[int, Product]:
+        """Lock the products and make sure each has `quantities` available.
+
+        Available is stock minus other customers' live holds; the buyer's
+        own holds (`customer_id`) count as theirs. Raises
+        InsufficientStockError if any product is short; the caller rolls
+        back to release the locks.
+        """
+        products = CheckoutService.lock_products(db, quantities)
+        held = InventoryService.held_quantities(db, quantities, exclude_customer_id=customer_id)
+        for product_id in sorted(quantities):
+            product = products.get(product_id)
+            requested = quantities[product_id]
+            if product is None or not product.is_active:
+                raise InsufficientStockError(product_id, f"product {product_id}", 0, requested)
+            available = max(0, (product.stock_quantity or 0) - held.get(product_id, 0))
+            if available < requested:
+                raise InsufficientStockError(product_id, product.name, available, requested)
+        return products
+
+    @staticmethod
+    def reserve_stock(db: Session, quantities: Dict[int, int], order_id: Optional[int] = None) -> Dict[int, Product]:
+        """check_stock, then take `quantities` off in one batched UPDATE"""
+        products = CheckoutService.check_stock(db, quantities)
+        InventoryService.apply_deltas(
+            db, {pid: -qty for pid, qty in quantities.items()}, REASON_CHECKOUT, order_id=order_id
+        )
+        return products
+
+    @staticmethod
+    def restore_stock(
+        db: Session,
+        quantities: Dict[int, int],
+        reason: str = REASON_CANCEL,
+        order_id: Optional[int] = None,
+    ) -> Dict[int, int]:
+        """Give stock back (cancellations, returns); returns the new levels"""
+        return InventoryService.apply_deltas(db, quantities, reason, order_id=order_id)
+
+    @staticmethod
+    def place_order(
+        db: Session,
+        customer_id: int,
+        order_data,
+        payment_gateway_response: Optional[str] = None,
+        idempotency_records: Sequence[IdempotencyRecord] = (),
+    ) -> Order:
+        """Create the order from the customer's cart and commit once.
+
+        Payment verification and any other network calls must happen before
+        this is called, so row locks are only held for the database work.
+        `idempotency_records` are claimed before anything else is touched and
+        committed with the order's response (see services/idempotency.py).
+        """
+        try:
+            IdempotencyService.claim(db, idempotency_records)
+
+            cart = db.query(Cart).filter(
+                Cart.customer_id == customer_id
+            ).with_for_update().populate_existing().first()
+            cart_items: List[CartItem] = []
+            if cart is not None:
+                cart_items = db.query(CartItem).filter(
+                    CartItem.cart_id == cart.cart_id
+                ).order_by(CartItem.product_id).populate_existing().all()
+            if not cart_items:
+                raise EmptyCartError()
+
+            quantities: Dict[int, int] = {}
+            for item in cart_items:
+                quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+            products = CheckoutService.check_stock(db, quantities, customer_id=customer_id)
+
+            line_products = [products[item.product_id] for item in cart_items]
+            prices = PriceEngine.price_columns(line_products)
+            order_items = []
+            unit_paise = []
+            for item, product, current in zip(cart_items, line_products, prices.unit_paise):
+                # Price when the item was added to the cart, else the current price
+                if item.price_at_time is not None:
+                    paise = PriceEngine.to_paise(item.price_at_time)
+                elif current != NO_PRICE:
+                    paise = current
+                else:
+                    raise CheckoutError(f"Product {product.product_id} has no price set")
+                unit_paise.append(paise)
+                order_items.append(OrderItem(
+                    product_id=item.product_id,
+                    vendor_id=product.vendor_id,
+                    quantity=item.quantity,
+                    unit_price=paise / 100,
+                    total_price=paise * item.quantity / 100,
+                    product_name=product.name,
+                    product_description=product.description
+                ))
+
+            totals = PriceEngine.order_totals(
+                prices.list_paise, unit_paise, [item.quantity for item in cart_items]
+            )
+            subtotal = totals.subtotal / 100
+            discount_amount = totals.discount / 100
+            tax_amount = totals.tax / 100
+            shipping_amount = totals.shipping / 100
+            total_amount = totals.total / 100
+
+            order = Order(
+                order_number=generate_order_number(),
+                customer_id=customer_id,
+                delivery_address_id=order_data.delivery_address_id,
+                subtotal=subtotal,
+                tax_amount=tax_amount,
+                shipping_amount=shipping_amount,
+                discount_amount=discount_amount,
+                total_amount=total_amount,
+                payment_method=order_data.payment_method,
+                special_instructions=order_data.special_instructions,
+                estimated_delivery_date=datetime.now() + timedelta(days=DELIVERY_DAYS)
+            )
+            if order_data.payment_method == PaymentMethod.RAZORPAY:
+                order.payment_status = PaymentStatus.PAID
+                order.payment_reference = order_data.razorpay_payment_id
+                order.payment_gateway_response = payment_gateway_response
+
+            # Lines are inserted in one batched INSERT with the order's flush
+            order.order_items = order_items
+            db.add(order)
+            db.flush()
+            if idempotency_records:
+                IdempotencyService.complete(idempotency_records, order.order_id, 201, order_created_response(order))
+
+            # Products are still locked from check_stock
+            InventoryService.apply_deltas(
+                db, {pid: -qty for pid, qty in quantities.items()}, REASON_CHECKOUT, order_id=order.order_id
+            )
+
+            db.query(CartItem).filter(CartItem.cart_id == cart.cart_id).delete(synchronize_session=False)
+            cart_cache.mark_customers(db, [customer_id])
+            # The stock they held while paying is now sold
+            InventoryService.release_holds(db, customer_id)
+
+            if order_data.payment_method == PaymentMethod.RAZORPAY:
+                OutboxService.enqueue(db, EVENT_PAYMENT_DETAILS,
+                                      {"payment_id": order_data.razorpay_payment_id}, aggregate_id=order.order_id)
+            OutboxService.enqueue(db, EVENT_VENDOR_ORDER, {"order_number": order.order_number},
+                                  aggregate_id=order.order_id)
+            VendorStatsService.mark_orders(db, [order.order_id])
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        db.refresh(order)
+        logger.info(f"Order {order.order_number} placed for customer {customer_id} ({len(order_items)} lines)")
+        return order
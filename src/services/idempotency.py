@@ -0,0 +1,165 @@
+# src/services/idempotency.py
+"""
+Idempotent POST /orders.
+
+A request is identified by up to two keys:
+
+  - the client's Idempotency-Key header, scoped to the customer
+  - the Razorpay payment ID, which can only ever pay for one order
+
+Before checkout the route looks both up; a live record replays the stored
+OrderCreateResponse without touching the cart or stock. Otherwise the new
+records are inserted first thing in the checkout transaction and completed
+with the response before its single commit. A concurrent duplicate blocks
+on the unique (scope, key) index until the first request commits, then gets
+DuplicateRequestError and replays the now-stored response.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+import hashlib
+import json
+import logging
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from src.models.idempotency import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_SCOPE = "razorpay_payment"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyError(Exception):
+    """A request that clashes with an earlier one; maps to HTTP 409/422"""
+    status_code = 409
+
+
+class KeyReusedError(IdempotencyError):
+    """Same Idempotency-Key, different request body"""
+    status_code = 422
+
+    def __init__(self):
+        super().__init__("Idempotency-Key was already used with a different request")
+
+
+class PaymentAlreadyUsedError(IdempotencyError):
+    def __init__(self):
+        super().__init__("This payment has already been used for another order")
+
+
+class DuplicateRequestError(IdempotencyError):
+    """Lost the race for a key to a concurrent request; the caller replays"""
+
+    def __init__(self):
+        super().__init__("A request with the same idempotency key is already being processed")
+
+
+def order_scope(customer_id: int) -> str:
+    return f"orders:{customer_id}"
+
+
+def request_hash(payload: Dict[str, Any]) -> str:
+    body = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class IdempotencyService:
+
+    @staticmethod
+    def new_records(
+        customer_id: int,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+        payment_id: Optional[str] = None,
+    ) -> List[IdempotencyRecord]:
+        """Unsaved records for this request; place_order inserts them"""
+        now = datetime.utcnow()
+        digest = request_hash(payload)
+        records = []
+        # Payment first: one payment is one order, whatever the header says
+        if payment_id:
+            records.append(IdempotencyRecord(
+                scope=PAYMENT_SCOPE,
+                key=payment_id,
+                customer_id=customer_id,
+                request_hash=digest,
+                created_at=now,
+                expires_at=now + timedelta(days=settings.payment_dedup_ttl_days),
+            ))
+        if idempotency_key:
+            records.append(IdempotencyRecord(
+                scope=order_scope(customer_id),
+                key=idempotency_key,
+                customer_id=customer_id,
+                request_hash=digest,
+                created_at=now,
+                expires_at=now + timedelta(hours=settings.idempotency_key_ttl_hours),
+            ))
+        return records
+
+    @staticmethod
+    def find_replay(db: Session, records: Sequence[IdempotencyRecord]) -> Optional[Dict[str, Any]]:
+        """Stored response for any of `records`' keys, or None if this is a new request.
+
+        Raises KeyReusedError / PaymentAlreadyUsedError when a key is live
+        but belongs to a different request or customer.
+        """
+        now = datetime.utcnow()
+        for record in records:
+            stored = db.query(IdempotencyRecord).filter(
+                IdempotencyRecord.scope == record.scope,
+                IdempotencyRecord.key == record.key,
+                IdempotencyRecord.expires_at > now
+            ).first()
+            if stored is None or stored.response_body is None:
+                continue
+            if record.scope == PAYMENT_SCOPE:
+                # Whatever the body says, a payment pays for one order only
+                if stored.customer_id != record.customer_id:
+                    raise PaymentAlreadyUsedError()
+            elif stored.request_hash != record.request_hash:
+                raise KeyReusedError()
+            logger.info(f"Replaying response for {record.scope} key {record.key}")
+            return stored.response_body
+        return None
+
+    @staticmethod
+    def claim(db: Session, records: Sequence[IdempotencyRecord]) -> None:
+        """Insert `records` inside the caller's transaction.
+
+        Expired rows for the same keys are dropped first. Raises
+        DuplicateRequestError if a live row exists; the caller must roll back.
+        """
+        if not records:
+            return
+        now = datetime.utcnow()
+        for record in records:
+            db.query(IdempotencyRecord).filter(
+                IdempotencyRecord.scope == record.scope,
+                IdempotencyRecord.key == record.key,
+                IdempotencyRecord.expires_at <= now
+            ).delete(synchronize_session=False)
+        db.add_all(records)
+        try:
+            db.flush()
+        except IntegrityError:
+            raise DuplicateRequestError()
+
+    @staticmethod
+    def complete(records: Sequence[IdempotencyRecord], order_id: int, status_code: int, body: Dict[str, Any]) -> None:
+        """Attach the response; written by the same commit as the order"""
+        for record in records:
+            record.order_id = order_id
+            record.status_code = status_code
+            record.response_body = body
+
+    @staticmethod
+    def purge_expired(db: Session) -> int:
+        deleted = db.query(IdempotencyRecord).filter(
+            IdempotencyRecord.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
@@ -0,0 +1,289 @@
+# src/services/inventory.py
+"""
+Stock changes as (product_id, delta) batches.
+
+`InventoryService.apply_deltas` is the only code that writes
+products.stock_quantity after a product is created. A batch is one UPDATE
+... FROM (VALUES ...) statement that locks the rows in product_id order
+(the same order checkout locks them in), refuses to take any product below
+zero, and returns the new stock levels; the matching inventory_ledger rows
+go in with one multi-row INSERT. Restocking an order is therefore two round
+trips whatever its size, and there is no read-modify-write in Python to
+race with concurrent checkouts.
+
+The statement bypasses the ORM, so instead of the mapper's index hooks the
+batch writes a search.stock_changed outbox event (src/services/outbox.py),
+plus a vendor.stats_changed one for the vendors' stock buckets.
+
+Holds: when a customer starts paying (a Razorpay order is created for their
+cart) their cart quantities are set aside in inventory_holds for
+INVENTORY_HOLD_TTL_SECONDS. Available-to-sell is stock minus other
+customers' live holds; checkout checks against that and consumes the
+customer's own holds, so the last units go to whoever started paying first
+instead of failing after payment. Expired holds simply stop counting.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import logging
+
+from sqlalchemy import bindparam, func, insert, text, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from config.settings import settings
+from src.models.inventory import InventoryLedger, InventoryHold
+from src.models.product import Product
+from src.services.outbox import OutboxService, EVENT_SEARCH_STOCK
+from src.services.vendor_stats import VendorStatsService
+from src.services.cart_cache import cart_cache
+
+logger = logging.getLogger(__name__)
+
+REASON_CHECKOUT = "checkout"
+REASON_CANCEL = "cancel"
+REASON_RETURN = "return"
+REASON_ADJUSTMENT = "adjustment"
+
+Deltas = Union[Dict[int, int], Iterable[Tuple[int, int]]]
+
+
+class StockUnderflowError(Exception):
+    """A batch would have taken products below zero (or they don't exist).
+
+    The rest of the batch may already be applied; the caller must roll back.
+    """
+
+    def __init__(self, product_ids: List[int]):
+        self.product_ids = product_ids
+        super().__init__(f"Not enough stock for products {product_ids}")
+
+
+class StockUnavailableError(Exception):
+    """Not enough available-to-sell stock to hold"""
+
+    def __init__(self, product_id: int, name: str, available: int, requested: int):
+        self.product_id = product_id
+        self.available = available
+        self.requested = requested
+        super().__init__(
+            f"Insufficient stock for {name}. Available: {available}, Requested: {requested}"
+        )
+
+
+def _merge(deltas: Deltas) -> Dict[int, int]:
+    pairs = deltas.items() if isinstance(deltas, dict) else deltas
+    merged: Dict[int, int] = {}
+    for product_id, delta in pairs:
+        merged[product_id] = merged.get(product_id, 0) + int(delta)
+    return {pid: delta for pid, delta in merged.items() if delta}
+
+
+class InventoryService:
+
+    @staticmethod
+    def lock_products(db: Session, product_ids: Iterable[int]) -> Dict[int, Product]:
+        """SELECT ... FOR UPDATE on the products, in ascending ID order"""
+        ids = sorted(set(product_ids))
+        if not ids:
+            return {}
+        products = db.query(Product).filter(
+            Product.product_id.in_(ids)
+        ).order_by(Product.product_id).with_for_update().populate_existing().all()
+        return {product.product_id: product for product in products}
+
+    @staticmethod
+    def _update_postgres(db: Session, deltas: Dict[int, int]) -> Dict[int, int]:
+        params = {}
+        rows = []
+        for i, (product_id, delta) in enumerate(sorted(deltas.items())):
+            params[f"p{i}"] = product_id
+            params[f"d{i}"] = delta
+            rows.append(f"(CAST(:p{i} AS INTEGER), CAST(:d{i} AS INTEGER))")
+        stmt = text(f"""
+            UPDATE products AS p
+               SET stock_quantity = COALESCE(p.stock_quantity, 0) + v.delta,
+                   updated_at = now()
+              FROM (VALUES {", ".join(rows)}) AS v (product_id, delta),
+                   (SELECT product_id FROM products
+                     WHERE product_id IN :ids
+                     ORDER BY product_id
+                       FOR UPDATE) AS locked
+             WHERE p.product_id = v.product_id
+               AND locked.product_id = p.product_id
+               AND COALESCE(p.stock_quantity, 0) + v.delta >= 0
+         RETURNING p.product_id, p.stock_quantity
+        """).bindparams(bindparam("ids", expanding=True))
+        params["ids"] = sorted(deltas)
+        return {pid: stock for pid, stock in db.execute(stmt, params)}
+
+    @staticmethod
+    def _update_generic(db: Session, deltas: Dict[int, int]) -> Dict[int, int]:
+        # SQLite (benchmarks/scripts): no UPDATE ... FROM (VALUES) column
+        # aliases, so one guarded UPDATE per product.
+        products = Product.__table__
+        stmt = update(products).where(
+            products.c.product_id == bindparam("b_product_id"),
+            products.c.stock_quantity + bindparam("b_delta") >= 0
+        ).values(stock_quantity=products.c.stock_quantity + bindparam("b_delta"))
+        applied = [
+            pid for pid, delta in sorted(deltas.items())
+            if db.execute(stmt, {"b_product_id": pid, "b_delta": delta}).rowcount
+        ]
+        if not applied:
+            return {}
+        return {pid: stock for pid, stock in db.query(Product.product_id, Product.stock_quantity)
+                .filter(Product.product_id.in_(applied))}
+
+    @staticmethod
+    def apply_deltas(
+        db: Session,
+        deltas: Deltas,
+        reason: str,
+        order_id: Optional[int] = None,
+        actor: Optional[str] = None,
+    ) -> Dict[int, int]:
+        """Apply {product_id: delta} (or pairs) and log them; returns the new stock.
+
+        Does not commit. Raises StockUnderflowError if any product would go
+        negative or is missing.
+        """
+        merged = _merge(deltas)
+        if not merged:
+            return {}
+
+        if db.get_bind().dialect.name == "postgresql":
+            new_stock = InventoryService._update_postgres(db, merged)
+        else:
+            new_stock = InventoryService._update_generic(db, merged)
+
+        missing = sorted(set(merged) - set(new_stock))
+        if missing:
+            raise StockUnderflowError(missing)
+
+        db.execute(insert(InventoryLedger), [
+            {
+                "product_id": pid,
+                "delta": delta,
+                "stock_after": new_stock[pid],
+                "reason": reason,
+                "order_id": order_id,
+                "actor": actor,
+            }
+            for pid, delta in sorted(merged.items())
+        ])
+
+        # Keep loaded Product objects in step without marking them dirty
+        for pid, stock in new_stock.items():
+            product = db.identity_map.get(identity_key(Product, pid))
+            if product is not None:
+                set_committed_value(product, "stock_quantity", stock)
+
+        OutboxService.enqueue(db, EVENT_SEARCH_STOCK, {"product_ids": sorted(new_stock)})
+        VendorStatsService.mark_products(db, new_stock)
+        cart_cache.mark_products(db, new_stock)
+        logger.info(f"Stock {reason}: {len(merged)} products" + (f" (order {order_id})" if order_id else ""))
+        return new_stock
+
+    @staticmethod
+    def set_stock(
+        db: Session,
+        product_id: int,
+        quantity: int,
+        actor: Optional[str] = None,
+    ) -> int:
+        """Manual stock edit: set an absolute level, logged as an adjustment"""
+        if quantity < 0:
+            raise StockUnderflowError([product_id])
+        current = db.query(Product.stock_quantity).filter(
+            Product.product_id == product_id
+        ).with_for_update().scalar()
+        delta = quantity - (current or 0)
+        if delta:
+            InventoryService.apply_deltas(db, {product_id: delta}, REASON_ADJUSTMENT, actor=actor)
+        return quantity
+
+    # ------------------------------------------------------------------
+    # Holds
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def held_quantities(
+        db: Session,
+        product_ids: Iterable[int],
+        exclude_customer_id: Optional[int] = None,
+    ) -> Dict[int, int]:
+        """Live held units per product, optionally not counting one customer's"""
+        ids = list(set(product_ids))
+        if not ids:
+            return {}
+        query = db.query(InventoryHold.product_id, func.sum(InventoryHold.quantity)).filter(
+            InventoryHold.product_id.in_(ids),
+            InventoryHold.expires_at > datetime.utcnow()
+        )
+        if exclude_customer_id is not None:
+            query = query.filter(InventoryHold.customer_id != exclude_customer_id)
+        return {pid: int(held) for pid, held in query.group_by(InventoryHold.product_id)}
+
+    @staticmethod
+    def available_to_sell(
+        db: Session,
+        product_ids: Iterable[int],
+        customer_id: Optional[int] = None,
+    ) -> Dict[int, int]:
+        """Stock minus live holds of everyone but `customer_id`"""
+        ids = list(set(product_ids))
+        if not ids:
+            return {}
+        held = InventoryService.held_quantities(db, ids, exclude_customer_id=customer_id)
+        stock = db.query(Product.product_id, Product.stock_quantity).filter(Product.product_id.in_(ids))
+        return {pid: max(0, (qty or 0) - held.get(pid, 0)) for pid, qty in stock}
+
+    @staticmethod
+    def place_holds(
+        db: Session,
+        customer_id: int,
+        quantities: Dict[int, int],
+        ttl_seconds: Optional[int] = None,
+    ) -> List[InventoryHold]:
+        """Replace the customer's holds with `quantities`; does not commit.
+
+        The products are locked (in product_id order, like checkout) only for
+        the check and the insert. Raises StockUnavailableError if any product
+        is short of available-to-sell stock.
+        """
+        InventoryService.release_holds(db, customer_id)
+        products = InventoryService.lock_products(db, quantities)
+        held = InventoryService.held_quantities(db, quantities, exclude_customer_id=customer_id)
+        for product_id in sorted(quantities):
+            product = products.get(product_id)
+            requested = quantities[product_id]
+            if product is None or not product.is_active:
+                raise StockUnavailableError(product_id, f"product {product_id}", 0, requested)
+            available = max(0, (product.stock_quantity or 0) - held.get(product_id, 0))
+            if available < requested:
+                raise StockUnavailableError(product_id, product.name, available, requested)
+
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds or settings.inventory_hold_ttl_seconds)
+        holds = [
+            InventoryHold(customer_id=customer_id, product_id=pid, quantity=qty, expires_at=expires_at)
+            for pid, qty in sorted(quantities.items()) if qty > 0
+        ]
+        db.add_all(holds)
+        db.flush()
+        return holds
+
+    @staticmethod
+    def release_holds(db: Session, customer_id: int) -> int:
+        """Drop the customer's holds (checkout consumed them, or payment failed)"""
+        return db.query(InventoryHold).filter(
+            InventoryHold.customer_id == customer_id
+        ).delete(synchronize_session=False)
+
+    @staticmethod
+    def sweep_expired_holds(db: Session) -> int:
+        deleted = db.query(InventoryHold).filter(
+            InventoryHold.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
@@ -0,0 +1,417 @@
+# src/services/outbox.py
+"""
+Transactional outbox for side effects of a checkout.
+
+Anything that does not have to be in the order's transaction - pushing new
+stock levels to search, fetching payment method details from Razorpay,
+telling vendors about new orders, refreshing the vendor dashboard rollups,
+repricing carts after a price change - is written as an OutboxEvent row in
+that same transaction (`OutboxService.enqueue`) and run afterwards by
+`OutboxWorker`. A rolled-back checkout leaves no events behind, and a
+committed one cannot lose them, so request latency only covers the database
+work.
+
+The worker claims due events with SELECT ... FOR UPDATE SKIP LOCKED, hands
+them to the handler registered for their type in batches, and marks them
+done in the same transaction as the handler's own writes. A failing event is
+retried with exponential backoff and parked as 'failed' after
+OUTBOX_MAX_ATTEMPTS.
+
+It runs in the API process (started from app.py) or on its own:
+
+    python -m src.services.outbox            # poll forever
+    python -m src.services.outbox --once     # drain what is due and exit
+"""
+import argparse
+import logging
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config.database import SessionLocal
+from config.settings import settings
+from src.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+EVENT_SEARCH_STOCK = "search.stock_changed"
+EVENT_PAYMENT_DETAILS = "payment.details"
+EVENT_VENDOR_ORDER = "vendor.order_placed"
+EVENT_VENDOR_STATS = "vendor.stats_changed"
+EVENT_CART_REPRICE = "cart.reprice"
+EVENT_CART_PRICE_CHANGED = "cart.price_changed"
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# Key under Session.info set when the open transaction wrote events.
+_SESSION_KEY = "outbox_events_written"
+
+# handler(db, events) -> IDs of the events that failed (None: all done).
+# Raising fails the whole batch.
+Handler = Callable[[Session, List[OutboxEvent]], Optional[Iterable[int]]]
+_handlers: Dict[str, Handler] = {}
+
+
+def register_handler(event_type: str) -> Callable[[Handler], Handler]:
+    def decorator(handler: Handler) -> Handler:
+        _handlers[event_type] = handler
+        return handler
+    return decorator
+
+
+class OutboxService:
+
+    @staticmethod
+    def enqueue(
+        db: Session,
+        event_type: str,
+        payload: Dict[str, Any],
+        aggregate_id: Optional[int] = None,
+    ) -> OutboxEvent:
+        """Add an event to the caller's transaction; it runs once that commits"""
+        outbox_event = OutboxEvent(
+            event_type=event_type,
+            aggregate_id=aggregate_id,
+            payload=payload,
+            status=STATUS_PENDING,
+            attempts=0,
+            available_at=datetime.utcnow(),
+        )
+        db.add(outbox_event)
+        db.info[_SESSION_KEY] = True
+        return outbox_event
+
+
+class OutboxWorker:
+    """Drains outbox_events in batches"""
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        poll_seconds: float = 1.0,
+        max_attempts: int = 8,
+        retry_base_seconds: float = 2.0,
+        retention_hours: int = 72,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self.retention_hours = retention_hours
+        self._run_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_purge = 0.0
+        self._stats: Dict[str, Any] = {
+            "batches": 0,
+            "processed": 0,
+            "retried": 0,
+            "failed": 0,
+            "last_batch_size": 0,
+            "last_batch_ms": 0.0,
+            "max_lag_ms": 0.0,
+            "last_error": None,
+        }
+
+    # ------------------------------------------------------------------
+    # Processing
+    # ------------------------------------------------------------------
+
+    def _claim(self, db: Session) -> List[OutboxEvent]:
+        return db.query(OutboxEvent).filter(
+            OutboxEvent.status == STATUS_PENDING,
+            OutboxEvent.available_at <= datetime.utcnow()
+        ).order_by(OutboxEvent.event_id).limit(self.batch_size).with_for_update(skip_locked=True).all()
+
+    def _retry(self, outbox_event: OutboxEvent, error: str) -> None:
+        outbox_event.attempts += 1
+        outbox_event.last_error = error[:2000]
+        if outbox_event.attempts >= self.max_attempts:
+            outbox_event.status = STATUS_FAILED
+            self._stats["failed"] += 1
+            logger.error(
+                f"Outbox event {outbox_event.event_id} ({outbox_event.event_type}) failed "
+                f"after {outbox_event.attempts} attempts: {error}"
+            )
+        else:
+            delay = self.retry_base_seconds * (2 ** (outbox_event.attempts - 1))
+            outbox_event.available_at = datetime.utcnow() + timedelta(seconds=delay)
+            self._stats["retried"] += 1
+
+    def run_once(self, db: Optional[Session] = None) -> int:
+        """Process one batch of due events. Returns how many were claimed."""
+        with self._run_lock:
+            started = time.perf_counter()
+            own_session = db is None
+            if own_session:
+                db = SessionLocal()
+            try:
+                events = self._claim(db)
+                if not events:
+                    db.rollback()
+                    return 0
+
+                by_type: Dict[str, List[OutboxEvent]] = defaultdict(list)
+                for outbox_event in events:
+                    by_type[outbox_event.event_type].append(outbox_event)
+
+                now = datetime.utcnow()
+                for event_type, group in by_type.items():
+                    handler = _handlers.get(event_type)
+                    error = f"No handler for {event_type}"
+                    failed = {outbox_event.event_id for outbox_event in group}
+                    if handler is not None:
+                        try:
+                            # Savepoint: a failing handler's writes go, the
+                            # status updates of the other groups stay.
+                            with db.begin_nested():
+                                failed = set(handler(db, group) or ())
+                            error = f"{event_type} handler reported a failure"
+                        except Exception as e:
+                            error = str(e)
+                            logger.warning(f"Outbox handler {event_type} failed for {len(group)} events: {error}")
+                    for outbox_event in group:
+                        if outbox_event.event_id in failed:
+                            self._retry(outbox_event, error)
+                        else:
+                            outbox_event.status = STATUS_DONE
+                            outbox_event.processed_at = now
+                            self._stats["processed"] += 1
+
+                lag_ms = (now - min(e.created_at for e in events)).total_seconds() * 1000
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self._stats["last_error"] = str(e)
+                raise
+            finally:
+                if own_session:
+                    db.close()
+
+            self._stats["batches"] += 1
+            self._stats["last_batch_size"] = len(events)
+            self._stats["last_batch_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self._stats["max_lag_ms"] = round(max(self._stats["max_lag_ms"], lag_ms), 1)
+            return len(events)
+
+    def drain(self) -> int:
+        """Process batches until nothing is due"""
+        total = 0
+        while True:
+            claimed = self.run_once()
+            total += claimed
+            if claimed < self.batch_size:
+                return total
+
+    def purge(self, db: Optional[Session] = None) -> Dict[str, int]:
+        """Delete done events past retention, expired idempotency keys and holds"""
+        from src.services.idempotency import IdempotencyService
+        from src.services.inventory import InventoryService
+
+        own_session = db is None
+        if own_session:
+            db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - timedelta(hours=self.retention_hours)
+            events = db.query(OutboxEvent).filter(
+                OutboxEvent.status == STATUS_DONE,
+                OutboxEvent.processed_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+            keys = IdempotencyService.purge_expired(db)
+            holds = InventoryService.sweep_expired_holds(db)
+            return {"events": events, "idempotency_keys": keys, "holds": holds}
+        finally:
+            if own_session:
+                db.close()
+
+    # ------------------------------------------------------------------
+    # Background loop
+    # ------------------------------------------------------------------
+
+    def notify(self) -> None:
+        """Wake the worker early (a transaction just committed events)"""
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+        self._thread.start()
+        logger.info(f"Outbox worker started (batch_size={self.batch_size}, poll_seconds={self.poll_seconds})")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.drain()
+                if time.time() - self._last_purge > 3600:
+                    self._last_purge = time.time()
+                    self.purge()
+            except Exception as e:
+                self._stats["last_error"] = str(e)
+                logger.error(f"Outbox worker error: {str(e)}")
+            self._wake.wait(self.poll_seconds)
+
+    def metrics(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["worker_running"] = self._thread is not None and self._thread.is_alive()
+        stats["batch_size"] = self.batch_size
+        return stats
+
+
+outbox_worker = OutboxWorker(
+    batch_size=settings.outbox_batch_size,
+    poll_seconds=settings.outbox_poll_seconds,
+    max_attempts=settings.outbox_max_attempts,
+    retry_base_seconds=settings.outbox_retry_base_seconds,
+    retention_hours=settings.outbox_retention_hours,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_worker(session: Session) -> None:
+    if session.info.pop(_SESSION_KEY, None):
+        outbox_worker.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_wakeup(session: Session) -> None:
+    session.info.pop(_SESSION_KEY, None)
+
+
+# ----------------------------------------------------------------------
+# Handlers
+# ----------------------------------------------------------------------
+
+@register_handler(EVENT_SEARCH_STOCK)
+def refresh_search_stock(db: Session, events: List[OutboxEvent]) -> None:
+    """Reindex every product whose stock changed, in one bulk request"""
+    from src.search.backends import get_search_backend
+
+    product_ids = sorted({pid for e in events for pid in e.payload.get("product_ids", [])})
+    if not product_ids:
+        return
+    backend = get_search_backend(fallback=False)
+    if not backend.is_available():
+        raise RuntimeError(f"Search backend {backend.name} not available")
+    result = backend.index_products(db, product_ids)
+    if result.get("errors"):
+        raise RuntimeError(f"{result['errors']} of {len(product_ids)} products failed to index")
+
+
+@register_handler(EVENT_PAYMENT_DETAILS)
+def record_payment_details(db: Session, events: List[OutboxEvent]) -> List[int]:
+    """Append ", Method: UPI (...)" to the order's payment_gateway_response"""
+    from src.models.order import Order
+    from src.services.payment import PaymentService, get_payment_service
+
+    failed = []
+    for outbox_event in events:
+        payment_info = get_payment_service().fetch_payment(outbox_event.payload["payment_id"])
+        details = PaymentService.describe_payment(payment_info)
+        if not details:
+            failed.append(outbox_event.event_id)
+            continue
+        order = db.query(Order).filter(Order.order_id == outbox_event.aggregate_id).with_for_update().first()
+        if order is None or ", Method:" in (order.payment_gateway_response or ""):
+            continue
+        order.payment_gateway_response = f"{order.payment_gateway_response or ''}{details}"
+    return failed
+
+
+@register_handler(EVENT_VENDOR_ORDER)
+def notify_vendors(db: Session, events: List[OutboxEvent]) -> None:
+    """Tell each vendor which of their products were ordered.
+
+    There is no vendor delivery channel yet, so the notification is logged.
+    """
+    from src.models.order import Order, OrderItem
+
+    order_ids = [e.aggregate_id for e in events]
+    rows = db.query(Order.order_number, OrderItem.vendor_id, OrderItem.quantity).join(
+        OrderItem, OrderItem.order_id == Order.order_id
+    ).filter(Order.order_id.in_(order_ids), OrderItem.vendor_id.isnot(None))
+
+    per_vendor: Dict[Any, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for order_number, vendor, quantity in rows:
+        per_vendor[vendor][order_number] += quantity
+    for vendor, orders in per_vendor.items():
+        summary = ", ".join(f"{number} ({units} units)" for number, units in orders.items())
+        logger.info(f"New orders for vendor {vendor}: {summary}")
+
+
+@register_handler(EVENT_VENDOR_STATS)
+def refresh_vendor_stats(db: Session, events: List[OutboxEvent]) -> None:
+    """Recompute the vendor_daily_stats rows the changed orders/products count towards"""
+    from src.services.vendor_stats import VendorStatsService
+
+    VendorStatsService.refresh_for(
+        db,
+        order_ids={oid for e in events for oid in e.payload.get("order_ids", [])},
+        product_ids={pid for e in events for pid in e.payload.get("product_ids", [])},
+    )
+
+
+@register_handler(EVENT_CART_REPRICE)
+def reprice_carts(db: Session, events: List[OutboxEvent]) -> None:
+    """Bring price_at_time of every cart line holding the changed products up to date"""
+    from src.services.cart_repricing import CartRepricingService
+
+    CartRepricingService.reprice_products(db, {pid for e in events for pid in e.payload.get("product_ids", [])})
+
+
+@register_handler(EVENT_CART_PRICE_CHANGED)
+def notify_price_changes(db: Session, events: List[OutboxEvent]) -> None:
+    """Tell customers that prices in their cart changed.
+
+    There is no customer delivery channel yet, so the notification is logged.
+    """
+    for outbox_event in events:
+        summary = ", ".join(
+            f"product {line['product_id']}: {line['old_price']} -> {line['new_price']}"
+            for line in outbox_event.payload.get("lines", [])
+        )
+        logger.info(f"Cart prices changed for customer {outbox_event.aggregate_id}: {summary}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the outbox worker outside the API process")
+    parser.add_argument("--once", action="store_true", help="drain the due events and exit")
+    parser.add_argument("--batch-size", type=int, default=settings.outbox_batch_size)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    outbox_worker.batch_size = max(1, args.batch_size)
+    if args.once:
+        print(f"[outbox] processed {outbox_worker.drain()} events")
+        return 0
+
+    outbox_worker.start()
+    try:
+        while outbox_worker._thread is not None and outbox_worker._thread.is_alive():
+            outbox_worker._thread.join(1.0)
+    except KeyboardInterrupt:
+        outbox_worker.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+# src/services/pagination.py
+"""
+Keyset (cursor) pagination over (created_at, id), newest first.
+
+A cursor is the opaque, URL-safe encoding of the last row of the previous
+page. The next page is the rows strictly after it in
+(created_at DESC, id DESC) order, which an index on
+(..., created_at DESC, id DESC) serves without OFFSET's skipped-row scans.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps({"t": created_at.isoformat(), "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError for anything that is not a cursor we issued"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["t"]), int(data["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def after_cursor(created_col, id_col, cursor: Optional[str]):
+    """WHERE clause for the rows after `cursor` (None: no restriction)"""
+    if not cursor:
+        return None
+    created_at, row_id = decode_cursor(cursor)
+    return or_(created_col < created_at, and_(created_col == created_at, id_col < row_id))
@@ -1,23 +1,56 @@
-
 import razorpay
 import os
 import hmac
 import hashlib
+import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from fastapi import HTTPException, status
 from dotenv import load_dotenv
 
+from config.settings import settings
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+def _pooled_session() -> requests.Session:
+    """Keep-alive connection pool to the Razorpay API, shared by all requests.
+
+    Only idempotent GETs are retried; order creation is never replayed.
+    """
+    retry = Retry(
+        total=settings.razorpay_max_retries,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.razorpay_pool_size,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return session
+
+
 class PaymentService:
-    def __init__(self):
+    def __init__(self, session: Optional[requests.Session] = None):
         self.key_id = os.getenv('RAZORPAY_KEY_ID')
         self.key_secret = os.getenv('RAZORPAY_KEY_SECRET')
-        
+
         if not self.key_id or not self.key_secret:
             print("Warning: RAZORPAY_KEY_ID or RAZORPAY_KEY_SECRET not set in environment")
             # You might want to raise an error here in production
-            
-        self.client = razorpay.Client(auth=(self.key_id, self.key_secret))
+
+        self.client = razorpay.Client(session=session or _pooled_session(), auth=(self.key_id, self.key_secret))
+        self.timeout = settings.razorpay_timeout_seconds
 
     def create_order(self, amount: float, currency: str = "INR", receipt: str = None, notes: dict = None):
         """
@@ -27,15 +60,15 @@ class PaymentService:
         try:
             # Razorpay expects amount in paise (1 INR = 100 paise)
             amount_paise = int(amount * 100)
-            
+
             data = {
                 "amount": amount_paise,
                 "currency": currency,
                 "receipt": receipt,
                 "notes": notes or {}
             }
-            
-            order = self.client.order.create(data=data)
+
+            order = self.client.order.create(data=data, timeout=self.timeout)
             return order
         except Exception as e:
             raise HTTPException(
@@ -46,33 +79,73 @@ class PaymentService:
     def verify_payment_signature(self, razorpay_order_id: str, razorpay_payment_id: str, razorpay_signature: str):
         """
         Verify the payment signature returned by Razorpay.
+
+        The signature is HMAC-SHA256("<order_id>|<payment_id>") keyed with
+        the API secret, so this is a local check with no network call.
         """
-        try:
-            # The client.utility.verify_payment_signature method is preferred if available,
-            # but sometimes manual verification is clearer or needed if SDK version differs.
-            # Using SDK method:
-            self.client.utility.verify_payment_signature({
-                'razorpay_order_id': razorpay_order_id,
-                'razorpay_payment_id': razorpay_payment_id,
-                'razorpay_signature': razorpay_signature
-            })
-            return True
-        except razorpay.errors.SignatureVerificationError:
+        if not self.key_secret or not razorpay_signature:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Payment signature verification failed"
             )
+        expected = hmac.new(
+            self.key_secret.encode(),
+            f"{razorpay_order_id}|{razorpay_payment_id}".encode(),
+            hashlib.sha256
+        ).hexdigest()
+        if not hmac.compare_digest(expected, razorpay_signature):
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error verifying payment: {str(e)}"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Payment signature verification failed"
             )
+        return True
 
     def fetch_payment(self, payment_id: str):
         """
         Fetch payment details from Razorpay to identify method (upi, card, etc.)
+
+        Blocking HTTP call - keep it off the event loop (the outbox worker
+        calls it after checkout, see src/services/outbox.py).
         """
         try:
-            return self.client.payment.fetch(payment_id)
+            return self.client.payment.fetch(payment_id, timeout=self.timeout)
         except Exception as e:
             print(f"Error fetching payment details: {str(e)}")
             return None
+
+    @staticmethod
+    def describe_payment(payment_info: Optional[dict]) -> str:
+        """", Method: CARD (visa)"-style suffix for Order.payment_gateway_response"""
+        if not payment_info:
+            return ""
+        method = payment_info.get('method', 'unknown')
+        details = f", Method: {method.upper()}"
+
+        # Add extra details if available
+        if method == 'card':
+            card_network = (payment_info.get('card') or {}).get('network', '')
+            if card_network:
+                details += f" ({card_network})"
+        elif method == 'upi':
+            vpa = payment_info.get('vpa', '')
+            if vpa:
+                details += f" ({vpa})"
+        elif method == 'netbanking':
+            bank = payment_info.get('bank', '')
+            if bank:
+                details += f" ({bank})"
+        return details
+
+
+_payment_service: Optional[PaymentService] = None
+_payment_service_lock = threading.Lock()
+
+
+def get_payment_service() -> PaymentService:
+    """Process-wide PaymentService (one Razorpay client and connection pool)"""
+    global _payment_service
+    if _payment_service is None:
+        with _payment_service_lock:
+            if _payment_service is None:
+                _payment_service = PaymentService()
+    return _payment_service
@@ -0,0 +1,243 @@
+# src/services/postgres_search.py
+"""
+Postgres full-text search, used when Elasticsearch is unavailable.
+
+Relies on the generated columns and indexes from migrate_search_fts.py:
+`search_vector` (GIN), a pg_trgm index on `name`, `search_brand` and
+`effective_price_cents`. Matching is full-text (`@@`) or trigram word
+similarity (`<%`, for typos and partial words), ranked with `ts_rank_cd`.
+
+Responses have the same shape as `ElasticsearchService.search_products`.
+Typed spec filters are applied to the raw specifications JSON; per-spec facet
+counts are Elasticsearch/memory only. Other facets: categories, brands and price buckets plus the total come
+from a single GROUPING SETS query over the filtered rows, so a search costs
+two statements regardless of page size.
+"""
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Numeric, and_, case, cast, func, literal, literal_column, nulls_last, or_, select, tuple_
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from src.models.category import Category, Subcategory
+from src.models.product import Product
+from src.search.specs import parse_number
+
+logger = logging.getLogger(__name__)
+
+products = Product.__table__
+categories = Category.__table__
+subcategories = Subcategory.__table__
+
+# Generated columns (migrate_search_fts.py); not mapped on Product because
+# they are maintained by Postgres and only read here. effective_price_cents
+# is PriceEngine's unit price (migrate_effective_price_discount.py).
+search_vector = literal_column("products.search_vector")
+search_brand = literal_column("products.search_brand")
+effective_price_cents = literal_column("products.effective_price_cents")
+
+TEXT_SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+FACET_SIZE = 10
+
+# Leading number of a spec value, matching src/search/specs.parse_number.
+NUMBER_PATTERN = r'^\s*(-?\d+(?:\.\d+)?)'
+
+# Same buckets as the Elasticsearch price_ranges aggregation, in cents.
+PRICE_BUCKETS: List[Tuple[str, int, Optional[int]]] = [
+    ('0-50', 0, 5000),
+    ('50-100', 5000, 10000),
+    ('100-500', 10000, 50000),
+    ('500+', 50000, None),
+]
+
+
+class PostgresSearchService:
+
+    @staticmethod
+    def search_products(
+        db: Session,
+        query: str,
+        category_id: Optional[int] = None,
+        subcategory_id: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        brand: Optional[str] = None,
+        in_stock_only: bool = True,
+        sort_by: str = 'relevance',
+        page: int = 1,
+        size: int = 20,
+        spec_filters: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Full-text product search with filters and facets"""
+        started = time.perf_counter()
+        query = (query or '').strip()
+
+        conditions = [products.c.is_active == True]
+        if query:
+            ts_query = func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, query)
+            conditions.append(or_(
+                search_vector.op('@@')(ts_query),
+                literal(query).op('<%')(products.c.name),
+            ))
+            rank = func.ts_rank_cd(search_vector, ts_query) + func.word_similarity(query, products.c.name)
+            if settings.search_popularity_boost_factor > 0:
+                # Same blend as the Elasticsearch function_score (log2p)
+                rank = rank * func.log(2 + settings.search_popularity_boost_factor * products.c.popularity_score)
+        else:
+            rank = literal(0.0)
+
+        if in_stock_only:
+            conditions.append(products.c.stock_quantity > 0)
+        if category_id:
+            conditions.append(products.c.category_id == category_id)
+        if subcategory_id:
+            conditions.append(products.c.subcategory_id == subcategory_id)
+        if min_price is not None:
+            conditions.append(effective_price_cents >= int(round(min_price * 100)))
+        if max_price is not None:
+            conditions.append(effective_price_cents <= int(round(max_price * 100)))
+        if brand:
+            conditions.append(search_brand == brand)
+        conditions.extend(PostgresSearchService._spec_conditions(spec_filters))
+
+        if sort_by == 'price_low':
+            order_by = [nulls_last(effective_price_cents.asc())]
+        elif sort_by == 'price_high':
+            order_by = [nulls_last(effective_price_cents.desc())]
+        elif sort_by == 'newest':
+            order_by = [products.c.created_at.desc()]
+        elif sort_by == 'popularity':
+            order_by = [products.c.popularity_score.desc(), rank.desc()]
+        else:  # relevance
+            order_by = [rank.desc()]
+        order_by.append(products.c.product_id)
+
+        joined = products.outerjoin(
+            categories, categories.c.category_id == products.c.category_id
+        ).outerjoin(
+            subcategories, subcategories.c.subcategory_id == products.c.subcategory_id
+        )
+
+        page_stmt = select(
+            products.c.product_id,
+            products.c.name,
+            products.c.description,
+            (effective_price_cents / 100.0).label('price'),
+            categories.c.name.label('category_name'),
+            subcategories.c.name.label('subcategory_name'),
+            search_brand.label('brand'),
+            products.c.stock_quantity,
+            products.c.primary_image_url,
+            products.c.sku,
+            rank.label('score'),
+        ).select_from(joined).where(and_(*conditions)).order_by(*order_by) \
+            .offset((page - 1) * size).limit(size)
+
+        rows = db.execute(page_stmt).mappings().all()
+        total, facets = PostgresSearchService._facets(db, joined, conditions)
+
+        result_products = []
+        for row in rows:
+            item = dict(row)
+            item['price'] = float(item['price']) if item['price'] is not None else 0.0
+            item['score'] = float(item['score'] or 0.0)
+            result_products.append(item)
+
+        return {
+            'products': result_products,
+            'total': total,
+            'page': page,
+            'size': size,
+            'total_pages': (total + size - 1) // size if size > 0 else 0,
+            'facets': facets,
+            'took': int((time.perf_counter() - started) * 1000)
+        }
+
+    @staticmethod
+    def _spec_conditions(spec_filters: Optional[Dict[str, Dict[str, Any]]]) -> List[Any]:
+        """Typed spec filters (src/search/specs.py) against the raw JSON.
+
+        Values compare as text; ranges use the leading number of the value,
+        as the Elasticsearch index does ("8GB" -> 8).
+        """
+        conditions = []
+        for name, spec in (spec_filters or {}).items():
+            raw = products.c.specifications[name].as_string()
+            number = cast(func.substring(raw, NUMBER_PATTERN), Numeric)
+            if spec.get('values'):
+                options = [raw.in_(spec['values'])]
+                numbers = [n for n in (parse_number(v) for v in spec['values']) if n is not None]
+                if numbers:
+                    options.append(number.in_(numbers))
+                conditions.append(or_(*options))
+            if 'gte' in spec:
+                conditions.append(number >= spec['gte'])
+            if 'lte' in spec:
+                conditions.append(number <= spec['lte'])
+        return conditions
+
+    @staticmethod
+    def _facets(db: Session, joined, conditions) -> Tuple[int, Dict[str, Any]]:
+        """Total plus category, brand and price-bucket counts in one grouped pass"""
+        bucket = case(
+            (effective_price_cents.is_(None), None),
+            *[
+                (effective_price_cents < upper, key)
+                for key, _, upper in PRICE_BUCKETS if upper is not None
+            ],
+            else_=PRICE_BUCKETS[-1][0],
+        )
+        matched = select(
+            categories.c.name.label('category_name'),
+            search_brand.label('brand'),
+            bucket.label('price_bucket'),
+        ).select_from(joined).where(and_(*conditions)).cte('matched')
+
+        stmt = select(
+            func.grouping(matched.c.category_name).label('by_category'),
+            func.grouping(matched.c.brand).label('by_brand'),
+            func.grouping(matched.c.price_bucket).label('by_price'),
+            matched.c.category_name,
+            matched.c.brand,
+            matched.c.price_bucket,
+            func.count().label('doc_count'),
+        ).group_by(func.grouping_sets(
+            tuple_(matched.c.category_name),
+            tuple_(matched.c.brand),
+            tuple_(matched.c.price_bucket),
+            tuple_(),
+        ))
+
+        total = 0
+        category_counts: List[Dict[str, Any]] = []
+        brand_counts: List[Dict[str, Any]] = []
+        price_counts = {key: 0 for key, _, _ in PRICE_BUCKETS}
+
+        # GROUPING(col) is 0 for the column the row is grouped by.
+        for row in db.execute(stmt).mappings():
+            if row['by_category'] == 0:
+                if row['category_name'] is not None:
+                    category_counts.append({'name': row['category_name'], 'count': row['doc_count']})
+            elif row['by_brand'] == 0:
+                if row['brand'] is not None:
+                    brand_counts.append({'name': row['brand'], 'count': row['doc_count']})
+            elif row['by_price'] == 0:
+                if row['price_bucket'] is not None:
+                    price_counts[row['price_bucket']] = row['doc_count']
+            else:
+                total = row['doc_count']
+
+        def top(counts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            return sorted(counts, key=lambda c: (-c['count'], c['name']))[:FACET_SIZE]
+
+        facets = {
+            'categories': top(category_counts),
+            'brands': top(brand_counts),
+            'price_ranges': [
+                {'range': key, 'count': price_counts[key]} for key, _, _ in PRICE_BUCKETS
+            ],
+        }
+        return total, facets
@@ -0,0 +1,122 @@
+# src/services/price_engine.py
+"""
+PriceEngine: the one place prices are computed.
+
+Everything is integer paise; rupees only appear at the edges (`to_rupees`).
+
+  list price  calculated_price, else base_price (both paise), else the
+              legacy DECIMAL `price` column (rupees) converted to paise
+  unit price  list price less discount_percent, rounded half up to the paise
+  order       subtotal at list price, the product discounts, TAX_RATE_BP on
+              what is left, and SHIPPING_FEE_PAISE unless that is above
+              FREE_SHIPPING_ABOVE_PAISE
+
+Products, cart, checkout, vendor views and the search documents all price
+through `price_many`, which fills array('q') columns in one pass over the
+batch with integer arithmetic only (no Decimal per product). Products
+without any price come back as NO_PRICE.
+
+The Postgres search fallback filters on products.effective_price_cents,
+a generated column with the same unit price formula (see
+migrate_effective_price_discount.py); keep the two in step.
+
+    python check_price_engine.py     # golden values
+    python bench_price_engine.py     # per-product Decimal path vs price_many
+"""
+from array import array
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Iterable, NamedTuple, Optional, Sequence
+
+# 18% GST on the order value after product discounts
+TAX_RATE_BP = 1800            # basis points
+FREE_SHIPPING_ABOVE_PAISE = 49900
+SHIPPING_FEE_PAISE = 4000
+
+NO_PRICE = -1
+
+_PAISE = Decimal("0.01")
+
+
+class PriceColumns(NamedTuple):
+    list_paise: array
+    discount_paise: array
+    unit_paise: array
+
+
+class OrderTotals(NamedTuple):
+    subtotal: int  # list price x quantity
+    discount: int  # product discounts
+    tax: int
+    shipping: int
+    total: int
+
+
+def _legacy_paise(price: Any) -> int:
+    return int((Decimal(str(price)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+class PriceEngine:
+
+    @staticmethod
+    def price_columns(products: Sequence[Any]) -> PriceColumns:
+        """List price, discount and unit price in paise for each product, in order"""
+        list_paise = array("q", bytes(8 * len(products)))
+        discount_paise = array("q", list_paise)
+        unit_paise = array("q", list_paise)
+        for i, product in enumerate(products):
+            price = product.calculated_price
+            if price is None:
+                price = product.base_price
+                if price is None:
+                    legacy = product.price
+                    if legacy is None:
+                        list_paise[i] = unit_paise[i] = NO_PRICE
+                        continue
+                    price = _legacy_paise(legacy)
+            pct = product.discount_percent or 0
+            pct = 0 if pct < 0 else 100 if pct > 100 else pct
+            unit = (price * (100 - pct) + 50) // 100
+            list_paise[i] = price
+            unit_paise[i] = unit
+            discount_paise[i] = price - unit
+        return PriceColumns(list_paise, discount_paise, unit_paise)
+
+    @staticmethod
+    def price_many(products: Sequence[Any]) -> array:
+        """Unit price (after discount_percent) in paise for each product; NO_PRICE if unpriced"""
+        return PriceEngine.price_columns(products).unit_paise
+
+    @staticmethod
+    def price(product: Any) -> Optional[int]:
+        """Unit price in paise of one product, None if it has no price"""
+        unit = PriceEngine.price_many([product])[0]
+        return unit if unit != NO_PRICE else None
+
+    @staticmethod
+    def order_totals(
+        list_paise: Iterable[int],
+        unit_paise: Iterable[int],
+        quantities: Iterable[int],
+    ) -> OrderTotals:
+        """Totals for order lines charged at `unit_paise`.
+
+        A list price below the charged unit price (the price went up since the
+        line was priced) counts as no discount rather than a negative one.
+        """
+        units = array("q", unit_paise)
+        lists = array("q", (max(price, unit) for price, unit in zip(list_paise, units)))
+        qty = array("q", quantities)
+        subtotal = sum(price * q for price, q in zip(lists, qty))
+        charged = sum(unit * q for unit, q in zip(units, qty))
+        discount = subtotal - charged
+        tax = (charged * TAX_RATE_BP + 5000) // 10000
+        shipping = 0 if charged > FREE_SHIPPING_ABOVE_PAISE else SHIPPING_FEE_PAISE
+        return OrderTotals(subtotal, discount, tax, shipping, charged + tax + shipping)
+
+    @staticmethod
+    def to_paise(rupees: Any) -> int:
+        return _legacy_paise(rupees)
+
+    @staticmethod
+    def to_rupees(paise: int) -> Decimal:
+        return (Decimal(paise) / 100).quantize(_PAISE)
@@ -87,12 +87,14 @@
 
 
 
+import json
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy import Text, cast, case, func, literal, true
 from src.models.product import Product
 from src.models.category import Category
-from typing import Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List
 from src.schemas.product import ProductResponse  # Add this import
+from src.services.price_engine import PriceEngine
 
 class ProductService:
     def __init__(self, db: Session):
@@ -218,11 +220,6 @@ class ProductService:
                     # Add any other needed fields for the switcher
                 })
 
-        # Compute discounted_price inline to avoid cross-module imports
-        _base = product.calculated_price if product.calculated_price is not None else product.base_price
-        _pct = product.discount_percent or 0
-        _discounted = int(round(_base * (100 - _pct) / 100)) if _base is not None else 0
-
         # Convert to response format
         response_data = {
             "product_id": product.product_id,
@@ -233,8 +230,8 @@ class ProductService:
             "specifications": product.specifications,
             "base_price": product.base_price,
             "calculated_price": product.calculated_price,
-            "discount_percent": _pct,
-            "discounted_price": _discounted,
+            "discount_percent": product.discount_percent or 0,
+            "discounted_price": PriceEngine.price(product),
             "stock_quantity": product.stock_quantity,
             "sku": product.sku,
             "group_id": product.group_id,  # Add group_id
@@ -292,6 +289,50 @@ class ProductService:
         
         return [suggestion[0] for suggestion in suggestions]
 
+    def get_spec_filters(
+        self,
+        category_id: Optional[int] = None,
+        subcategory_id: Optional[int] = None
+    ) -> Dict[str, List[str]]:
+        """Every spec key of the matching active products with its distinct values,
+        as str() of the raw JSON value: {"Color": ["Blue", "Red"], "RAM": ["8GB"]}.
+
+        On Postgres the distinct (key, value) pairs come from one json_each
+        query, so only the pairs leave the database; elsewhere the JSON of
+        every matching product is scanned here.
+        """
+        filters: Dict[str, set] = {}
+        for key, value in self._spec_pairs(category_id, subcategory_id):
+            filters.setdefault(key, set()).add(str(value))
+        return {k: sorted(v) for k, v in filters.items()}
+
+    def _spec_pairs(self, category_id: Optional[int], subcategory_id: Optional[int]):
+        conditions = [Product.is_active == True]
+        if category_id:
+            conditions.append(Product.category_id == category_id)
+        if subcategory_id:
+            conditions.append(Product.subcategory_id == subcategory_id)
+
+        if self.db.get_bind().dialect.name != "postgresql":
+            for (specs,) in self.db.query(Product.specifications).filter(*conditions):
+                if specs and isinstance(specs, dict):
+                    yield from specs.items()
+            return
+
+        # json_each only accepts objects; anything else contributes no pairs.
+        specs = case(
+            (func.json_typeof(Product.specifications) == 'object', Product.specifications),
+            else_=cast(literal('{}'), Product.specifications.type),
+        )
+        pairs = func.json_each(specs).table_valued("key", "value")
+        # DISTINCT on the JSON text: json has no equality operator, and the
+        # decoded value formats like the Python scan ('true' -> "True").
+        rows = self.db.query(pairs.c.key, cast(pairs.c.value, Text)).select_from(Product).join(
+            pairs, true()
+        ).filter(*conditions).distinct()
+        for key, raw in rows:
+            yield key, json.loads(raw)
+
     def get_price_range(self, category_id: Optional[int] = None) -> dict:
         """Get price range for products"""
         query = self.db.query(Product)
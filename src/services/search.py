@@ -995,12 +995,13 @@ try:
         print(f"❌ Failed to import ProductDocument: {str(e)}")
         raise e
     
-    # Test if client is working
-    if es_client and es_client.ping():
+    # Reachability is tracked by the circuit breaker (src/search/breaker.py),
+    # which pings in the background - never here or on the request path.
+    if es_client is not None:
         ELASTICSEARCH_AVAILABLE = True
-        print("✅ Elasticsearch is available and responding")
+        print("✅ Elasticsearch components ready")
     else:
-        print("❌ Elasticsearch client exists but not responding")
+        print("❌ Elasticsearch client not configured")
         ELASTICSEARCH_AVAILABLE = False
         
 except ImportError as e:
@@ -1012,25 +1013,37 @@ except Exception as e:
     print(f"❌ Configuration error: {str(e)}")
     ELASTICSEARCH_AVAILABLE = False
 
+from config.settings import settings
 from src.models.product import Product
+from src.search.document_builder import build_document, build_documents
+from src.search.cache import search_cache
+from src.search.suggestions import suggestion_index
+from src.search.breaker import es_breaker
+from src.search.specs import add_es_spec_aggregations, es_spec_facets, es_spec_filter_queries
+
+try:
+    from config.elasticsearch import client_for, get_async_client
+    from elasticsearch_dsl.response import Response
+except ImportError:
+    client_for = get_async_client = Response = None
+
+
+def _bulk_item_ids(items: List[Dict[str, Any]]) -> List[int]:
+    """Product IDs of the failed items bulk() returned ({op: {'_id': ...}})"""
+    ids = []
+    for item in items:
+        for info in item.values():
+            if isinstance(info, dict) and info.get('_id') is not None:
+                ids.append(int(info['_id']))
+    return ids
+
 
 class ElasticsearchService:
     
     @staticmethod
     def is_available() -> bool:
-        """Check if Elasticsearch is available"""
-        global ELASTICSEARCH_AVAILABLE, es_client
-        
-        # Re-check availability if not already available
-        if not ELASTICSEARCH_AVAILABLE and es_client:
-            try:
-                if es_client.ping():
-                    ELASTICSEARCH_AVAILABLE = True
-                    print("✅ Elasticsearch reconnected successfully")
-            except:
-                pass
-        
-        return ELASTICSEARCH_AVAILABLE and es_client is not None
+        """Check if Elasticsearch is available (local breaker state, no ping)"""
+        return ELASTICSEARCH_AVAILABLE and es_client is not None and es_breaker.allow()
     
     @staticmethod
     def initialize_index():
@@ -1041,7 +1054,10 @@ class ElasticsearchService:
             
         try:
             if ProductDocument:
-                ProductDocument.init()
+                # Creates a versioned index behind the `ecommerce_products`
+                # alias when neither exists yet.
+                from src.search.reindex import ensure_alias
+                ensure_alias()
                 logger.info("Elasticsearch index initialized successfully")
                 print("✅ Elasticsearch index initialized")
                 return True
@@ -1068,58 +1084,15 @@ class ElasticsearchService:
         try:
             print(f"🔄 Indexing product: {product.name}")
             
-            # Get effective price
-            effective_price = None
-            if product.calculated_price is not None:
-                effective_price = product.calculated_price / 100
-            elif product.base_price is not None:
-                effective_price = product.base_price / 100
-            elif product.price is not None:
-                effective_price = float(product.price)
-            
-            # Create search keywords from various fields
-            search_keywords = []
-            if product.name:
-                search_keywords.append(product.name)
-            if product.description:
-                search_keywords.append(product.description)
-            if hasattr(product, 'category') and product.category and hasattr(product.category, 'name'):
-                search_keywords.append(product.category.name)
-            if hasattr(product, 'subcategory') and product.subcategory and hasattr(product.subcategory, 'name'):
-                search_keywords.append(product.subcategory.name)
-            
-            # Extract brand from specifications or name
-            brand = None
-            if product.specifications and isinstance(product.specifications, dict):
-                brand = product.specifications.get('Brand') or product.specifications.get('brand')
-            
-            # Create document
+            # Same document body as the bulk paths (src/search/document_builder.py)
             doc = ProductDocument(
                 meta={'id': product.product_id},
-                product_id=product.product_id,
-                name=product.name,
-                description=product.description,
-                price=effective_price,
-                base_price=product.base_price,
-                calculated_price=product.calculated_price,
-                category_id=product.category_id,
-                category_name=product.category.name if hasattr(product, 'category') and product.category else None,
-                subcategory_id=product.subcategory_id,
-                subcategory_name=product.subcategory.name if hasattr(product, 'subcategory') and product.subcategory else None,
-                brand=brand,
-                sku=product.sku,
-                stock_quantity=product.stock_quantity,
-                storage_capacity=product.storage_capacity,
-                specifications=str(product.specifications) if product.specifications else "",
-                primary_image_url=product.primary_image_url,
-                search_keywords=' '.join(search_keywords),
-                popularity_score=1.0,
-                is_active=product.is_active,
-                created_at=product.created_at,
-                updated_at=product.updated_at
+                **build_document(product)
             )
             
-            doc.save()
+            with es_breaker.guard():
+                doc.save(using=client_for('bulk'))
+            search_cache.invalidate()
             logger.info(f"Product {product.product_id} indexed successfully")
             print(f"✅ Product {product.product_id} indexed successfully")
             return True
@@ -1158,64 +1131,21 @@ class ElasticsearchService:
         def generate_docs():
             for product in products:
                 try:
-                    # Get effective price
-                    effective_price = None
-                    if product.calculated_price is not None:
-                        effective_price = product.calculated_price / 100
-                    elif product.base_price is not None:
-                        effective_price = product.base_price / 100
-                    elif product.price is not None:
-                        effective_price = float(product.price)
-                    
-                    # Create search keywords
-                    search_keywords = []
-                    if product.name:
-                        search_keywords.append(product.name)
-                    if product.description:
-                        search_keywords.append(product.description)
-                    if hasattr(product, 'category') and product.category and hasattr(product.category, 'name'):
-                        search_keywords.append(product.category.name)
-                    
-                    # Extract brand
-                    brand = None
-                    if product.specifications and isinstance(product.specifications, dict):
-                        brand = product.specifications.get('Brand') or product.specifications.get('brand')
-                    
                     yield {
                         '_index': 'ecommerce_products',
                         '_id': product.product_id,
-                        '_source': {
-                            'product_id': product.product_id,
-                            'name': product.name,
-                            'description': product.description,
-                            'price': effective_price,
-                            'base_price': product.base_price,
-                            'calculated_price': product.calculated_price,
-                            'category_id': product.category_id,
-                            'category_name': product.category.name if hasattr(product, 'category') and product.category else None,
-                            'subcategory_id': product.subcategory_id,
-                            'subcategory_name': product.subcategory.name if hasattr(product, 'subcategory') and product.subcategory else None,
-                            'brand': brand,
-                            'sku': product.sku,
-                            'stock_quantity': product.stock_quantity,
-                            'storage_capacity': product.storage_capacity,
-                            'specifications': str(product.specifications) if product.specifications else "",
-                            'primary_image_url': product.primary_image_url,
-                            'search_keywords': ' '.join(search_keywords),
-                            'popularity_score': 1.0,
-                            'is_active': product.is_active,
-                            'created_at': product.created_at,
-                            'updated_at': product.updated_at
-                        }
+                        '_source': build_document(product)
                     }
                 except Exception as e:
                     logger.error(f"Error preparing product {product.product_id} for indexing: {str(e)}")
                     continue
         
         try:
-            success, failed = bulk(es_client, generate_docs())
+            with es_breaker.guard():
+                success, failed = bulk(client_for('bulk'), generate_docs())
             success_count = success
             error_count = len(failed)
+            search_cache.invalidate()
             
             logger.info(f"Bulk indexing completed: {success_count} success, {error_count} errors")
             print(f"✅ Bulk indexing completed: {success_count} success, {error_count} errors")
@@ -1231,6 +1161,40 @@ class ElasticsearchService:
             'total': len(products)
         }
     
+    @staticmethod
+    def index_products_by_ids(db_session, product_ids: List[int]) -> Dict[str, int]:
+        """Index (or remove) a batch of products by ID.
+
+        Products are loaded with their category and subcategory in one batch
+        query; inactive or missing products are removed from the index.
+        """
+        documents, removed_ids = build_documents(db_session, product_ids)
+        result = {'indexed': 0, 'deleted': 0, 'errors': 0, 'failed_ids': [], 'total': len(product_ids)}
+
+        if documents:
+            try:
+                with es_breaker.guard():
+                    success, failed = bulk(client_for('bulk'), (
+                        {'_index': 'ecommerce_products', '_id': doc['product_id'], '_source': doc}
+                        for doc in documents
+                    ), raise_on_error=False)
+                result['indexed'] = success
+                result['errors'] += len(failed)
+                result['failed_ids'].extend(_bulk_item_ids(failed))
+                search_cache.invalidate()
+            except Exception as e:
+                logger.error(f"Bulk indexing failed: {str(e)}")
+                result['errors'] += len(documents)
+                result['failed_ids'].extend(doc['product_id'] for doc in documents)
+
+        if removed_ids:
+            deleted = ElasticsearchService.bulk_delete_products(removed_ids)
+            result['deleted'] = deleted['success']
+            result['errors'] += deleted['errors']
+            result['failed_ids'].extend(deleted['failed_ids'])
+
+        return result
+    
     @staticmethod
     def search_products(
         query: str,
@@ -1242,227 +1206,397 @@ class ElasticsearchService:
         in_stock_only: bool = True,
         sort_by: str = 'relevance',
         page: int = 1,
-        size: int = 20
+        size: int = 20,
+        spec_filters: Optional[Dict[str, Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
-        """Advanced product search with filters"""
-        
-        if not ElasticsearchService.is_available():
-            logger.warning("Elasticsearch not available - returning empty search results")
-            print("❌ Elasticsearch not available for search")
-            return {
-                'products': [],
-                'total': 0,
-                'page': page,
-                'size': size,
-                'total_pages': 0,
-                'facets': {},
-                'took': 0,
-                'error': 'Elasticsearch search not available. Please start Elasticsearch server.'
-            }
+        """Advanced product search with filters.
+
+        `spec_filters` filters on typed specifications, e.g.
+        {"Size": {"values": ["M"]}, "RAM": {"gte": 8}} (src/search/specs.py);
+        per-spec counts come back in facets["specifications"].
+
+        Results are cached per full parameter set and facets per query +
+        filters (src/search/cache.py), so popular searches and paging through
+        one search skip Elasticsearch or at least its aggregations.
+        """
+        params = dict(
+            category_id=category_id,
+            subcategory_id=subcategory_id,
+            min_price=min_price,
+            max_price=max_price,
+            brand=brand,
+            in_stock_only=in_stock_only,
+            spec_filters=spec_filters,
+        )
+        facet_key, result_key = ElasticsearchService._cache_keys(query, params, sort_by, page, size)
+
+        cached = search_cache.get_results(result_key)
+        if cached is not None:
+            return cached
         
-        if not Search or not Q:
-            logger.warning("Search components not available")
-            print("❌ Search components not available")
-            return {
-                'products': [],
-                'total': 0,
-                'page': page,
-                'size': size,
-                'total_pages': 0,
-                'facets': {},
-                'took': 0,
-                'error': 'Search components not available'
-            }
+        unavailable = ElasticsearchService._unavailable_result(page, size)
+        if unavailable is not None:
+            return unavailable
         
         try:
             print(f"🔍 Searching for: '{query}'")
-            search = Search(using=es_client, index='ecommerce_products')
-            
-            # Base query - multi-field search
-            if query:
-                search_query = Q('multi_match', 
-                               query=query,
-                               fields=[
-                                   'name^3',  # Boost name matches
-                                   'name.autocomplete^2',
-                                   'description',
-                                   'category_name.text',
-                                   'subcategory_name.text',
-                                   'brand.text',
-                                   'search_keywords',
-                                   'specifications'
-                               ],
-                               fuzziness='AUTO',
-                               operator='and')
-            else:
-                search_query = Q('match_all')
-            
-            # Apply filters
-            filters = []
-            
-            # Active products only
-            filters.append(Q('term', is_active=True))
-            
-            # Stock filter
-            if in_stock_only:
-                filters.append(Q('range', stock_quantity={'gt': 0}))
-            
-            # Category filter
-            if category_id:
-                filters.append(Q('term', category_id=category_id))
-            
-            # Subcategory filter
-            if subcategory_id:
-                filters.append(Q('term', subcategory_id=subcategory_id))
-            
-            # Price range filter
-            if min_price is not None or max_price is not None:
-                price_range = {}
-                if min_price is not None:
-                    price_range['gte'] = min_price
-                if max_price is not None:
-                    price_range['lte'] = max_price
-                filters.append(Q('range', price=price_range))
-            
-            # Brand filter
-            if brand:
-                filters.append(Q('term', brand=brand))
-            
-            # Combine query and filters
-            if filters:
-                search = search.query(Q('bool', must=[search_query], filter=filters))
-            else:
-                search = search.query(search_query)
-            
-            # Sorting
-            if sort_by == 'price_low':
-                search = search.sort('price')
-            elif sort_by == 'price_high':
-                search = search.sort('-price')
-            elif sort_by == 'newest':
-                search = search.sort('-created_at')
-            elif sort_by == 'popularity':
-                search = search.sort('-popularity_score', '_score')
-            else:  # relevance (default)
-                search = search.sort('_score')
-            
-            # Pagination
-            start = (page - 1) * size
-            search = search[start:start + size]
-            
-            # Add aggregations for facets
-            search.aggs.bucket('categories', 'terms', field='category_name', size=10)
-            search.aggs.bucket('brands', 'terms', field='brand', size=10)
-            search.aggs.bucket('price_ranges', 'range', field='price', ranges=[
-                {'from': 0, 'to': 50, 'key': '0-50'},
-                {'from': 50, 'to': 100, 'key': '50-100'},
-                {'from': 100, 'to': 500, 'key': '100-500'},
-                {'from': 500, 'key': '500+'}
-            ])
-            
-            response = search.execute()
-            
-            # Process results
-            products = []
-            for hit in response:
-                products.append({
-                    'product_id': hit.product_id,
-                    'name': hit.name,
-                    'description': hit.description,
-                    'price': hit.price,
-                    'category_name': hit.category_name,
-                    'subcategory_name': hit.subcategory_name,
-                    'brand': hit.brand,
-                    'stock_quantity': hit.stock_quantity,
-                    'primary_image_url': hit.primary_image_url,
-                    'sku': hit.sku,
-                    'score': hit.meta.score
-                })
-            
-            # Process aggregations
-            facets = {}
-            if hasattr(response.aggregations, 'categories'):
-                facets['categories'] = [
-                    {'name': bucket.key, 'count': bucket.doc_count}
-                    for bucket in response.aggregations.categories.buckets
-                ]
-            
-            if hasattr(response.aggregations, 'brands'):
-                facets['brands'] = [
-                    {'name': bucket.key, 'count': bucket.doc_count}
-                    for bucket in response.aggregations.brands.buckets
-                ]
-            
-            if hasattr(response.aggregations, 'price_ranges'):
-                facets['price_ranges'] = [
-                    {'range': bucket.key, 'count': bucket.doc_count}
-                    for bucket in response.aggregations.price_ranges.buckets
-                ]
-            
-            print(f"✅ Search completed: {len(products)} products found")
+            cached_facets = search_cache.get_facets(facet_key)
+            search = ElasticsearchService._build_search(
+                query, sort_by=sort_by, page=page, size=size,
+                with_facets=cached_facets is None, **params
+            ).using(client_for('search'))
             
-            return {
-                'products': products,
-                'total': response.hits.total.value,
-                'page': page,
-                'size': size,
-                'total_pages': (response.hits.total.value + size - 1) // size,
-                'facets': facets,
-                'took': response.took
-            }
+            with es_breaker.guard():
+                response = search.execute()
+            
+            return ElasticsearchService._finish_search(
+                response, page, size, facet_key, result_key, cached_facets
+            )
             
         except Exception as e:
             logger.error(f"Search failed: {str(e)}")
             print(f"❌ Search failed: {str(e)}")
-            return {
-                'products': [],
-                'total': 0,
-                'page': page,
-                'size': size,
-                'total_pages': 0,
-                'facets': {},
-                'took': 0,
-                'error': str(e)
+            return ElasticsearchService._empty_result(page, size, str(e))
+    
+    @staticmethod
+    async def search_products_async(
+        query: str,
+        category_id: Optional[int] = None,
+        subcategory_id: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        brand: Optional[str] = None,
+        in_stock_only: bool = True,
+        sort_by: str = 'relevance',
+        page: int = 1,
+        size: int = 20,
+        spec_filters: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """`search_products` for async handlers, on the pooled AsyncElasticsearch client.
+
+        Without the async client (aiohttp not installed) the sync search runs
+        in the threadpool so the event loop is never blocked on the cluster.
+        """
+        params = dict(
+            category_id=category_id,
+            subcategory_id=subcategory_id,
+            min_price=min_price,
+            max_price=max_price,
+            brand=brand,
+            in_stock_only=in_stock_only,
+            spec_filters=spec_filters,
+        )
+        async_client = get_async_client() if get_async_client else None
+        if async_client is None:
+            from starlette.concurrency import run_in_threadpool
+            return await run_in_threadpool(
+                ElasticsearchService.search_products,
+                query, sort_by=sort_by, page=page, size=size, **params
+            )
+
+        facet_key, result_key = ElasticsearchService._cache_keys(query, params, sort_by, page, size)
+
+        cached = search_cache.get_results(result_key)
+        if cached is not None:
+            return cached
+        
+        unavailable = ElasticsearchService._unavailable_result(page, size)
+        if unavailable is not None:
+            return unavailable
+        
+        try:
+            cached_facets = search_cache.get_facets(facet_key)
+            search = ElasticsearchService._build_search(
+                query, sort_by=sort_by, page=page, size=size,
+                with_facets=cached_facets is None, **params
+            )
+            
+            with es_breaker.guard():
+                raw = await client_for('search', async_client).search(
+                    index='ecommerce_products', body=search.to_dict()
+                )
+            
+            return ElasticsearchService._finish_search(
+                Response(search, raw.body), page, size, facet_key, result_key, cached_facets
+            )
+            
+        except Exception as e:
+            logger.error(f"Search failed: {str(e)}")
+            return ElasticsearchService._empty_result(page, size, str(e))
+    
+    @staticmethod
+    def _cache_keys(query: str, params: Dict[str, Any], sort_by: str, page: int, size: int):
+        facet_key = search_cache.filter_params(query, **params)
+        result_key = dict(facet_key, sort_by=sort_by, page=page, size=size)
+        return facet_key, result_key
+    
+    @staticmethod
+    def _empty_result(page: int, size: int, error: str) -> Dict[str, Any]:
+        return {
+            'products': [],
+            'total': 0,
+            'page': page,
+            'size': size,
+            'total_pages': 0,
+            'facets': {},
+            'took': 0,
+            'error': error
+        }
+    
+    @staticmethod
+    def _unavailable_result(page: int, size: int) -> Optional[Dict[str, Any]]:
+        if not ElasticsearchService.is_available():
+            logger.warning("Elasticsearch not available - returning empty search results")
+            print("❌ Elasticsearch not available for search")
+            return ElasticsearchService._empty_result(
+                page, size, 'Elasticsearch search not available. Please start Elasticsearch server.'
+            )
+        
+        if not Search or not Q:
+            logger.warning("Search components not available")
+            print("❌ Search components not available")
+            return ElasticsearchService._empty_result(page, size, 'Search components not available')
+        return None
+    
+    @staticmethod
+    def _build_search(
+        query: str,
+        category_id: Optional[int] = None,
+        subcategory_id: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        brand: Optional[str] = None,
+        in_stock_only: bool = True,
+        sort_by: str = 'relevance',
+        page: int = 1,
+        size: int = 20,
+        spec_filters: Optional[Dict[str, Dict[str, Any]]] = None,
+        with_facets: bool = True
+    ):
+        search = Search(index='ecommerce_products')
+        
+        # Base query - multi-field search
+        if query:
+            search_query = Q('multi_match', 
+                           query=query,
+                           fields=[
+                               'name^3',  # Boost name matches
+                               'name.autocomplete^2',
+                               'description',
+                               'category_name.text',
+                               'subcategory_name.text',
+                               'brand.text',
+                               'search_keywords',
+                               'specifications'
+                           ],
+                           fuzziness='AUTO',
+                           operator='and')
+            # Blend in the popularity signal (src/search/popularity.py): a
+            # doc-values lookup per hit, so it costs next to nothing.
+            if sort_by == 'relevance' and settings.search_popularity_boost_factor > 0:
+                search_query = Q('function_score',
+                                 query=search_query,
+                                 field_value_factor={
+                                     'field': 'popularity_score',
+                                     'factor': settings.search_popularity_boost_factor,
+                                     'modifier': 'log2p',
+                                     'missing': 0
+                                 },
+                                 boost_mode='multiply')
+        else:
+            search_query = Q('match_all')
+        
+        # Apply filters
+        filters = []
+        
+        # Active products only
+        filters.append(Q('term', is_active=True))
+        
+        # Stock filter
+        if in_stock_only:
+            filters.append(Q('range', stock_quantity={'gt': 0}))
+        
+        # Category filter
+        if category_id:
+            filters.append(Q('term', category_id=category_id))
+        
+        # Subcategory filter
+        if subcategory_id:
+            filters.append(Q('term', subcategory_id=subcategory_id))
+        
+        # Price range filter
+        if min_price is not None or max_price is not None:
+            price_range = {}
+            if min_price is not None:
+                price_range['gte'] = min_price
+            if max_price is not None:
+                price_range['lte'] = max_price
+            filters.append(Q('range', price=price_range))
+        
+        # Brand filter
+        if brand:
+            filters.append(Q('term', brand=brand))
+        
+        # Typed specification filters (nested name/value pairs)
+        filters.extend(es_spec_filter_queries(Q, spec_filters))
+        
+        # Combine query and filters
+        if filters:
+            search = search.query(Q('bool', must=[search_query], filter=filters))
+        else:
+            search = search.query(search_query)
+        
+        # Sorting
+        if sort_by == 'price_low':
+            search = search.sort('price')
+        elif sort_by == 'price_high':
+            search = search.sort('-price')
+        elif sort_by == 'newest':
+            search = search.sort('-created_at')
+        elif sort_by == 'popularity':
+            search = search.sort('-popularity_score', '_score')
+        else:  # relevance (default)
+            search = search.sort('_score')
+        
+        # Pagination
+        start = (page - 1) * size
+        search = search[start:start + size]
+        
+        # Add aggregations for facets, unless this filter set already has them
+        if with_facets:
+            ElasticsearchService._add_facet_aggregations(search)
+        return search
+    
+    @staticmethod
+    def _finish_search(response, page: int, size: int, facet_key, result_key, cached_facets) -> Dict[str, Any]:
+        # Process results
+        products = []
+        for hit in response:
+            products.append({
+                'product_id': hit.product_id,
+                'name': hit.name,
+                'description': hit.description,
+                'price': hit.price,
+                'category_name': hit.category_name,
+                'subcategory_name': hit.subcategory_name,
+                'brand': hit.brand,
+                'stock_quantity': hit.stock_quantity,
+                'primary_image_url': hit.primary_image_url,
+                'sku': hit.sku,
+                'score': hit.meta.score
+            })
+        
+        if cached_facets is None:
+            facets = ElasticsearchService._facets_from_response(response)
+            search_cache.set_facets(facet_key, facets)
+        else:
+            facets = cached_facets
+        
+        print(f"✅ Search completed: {len(products)} products found")
+        
+        result = {
+            'products': products,
+            'total': response.hits.total.value,
+            'page': page,
+            'size': size,
+            'total_pages': (response.hits.total.value + size - 1) // size,
+            'facets': facets,
+            'took': response.took
+        }
+        search_cache.set_results(result_key, result)
+        return result
+    
+    @staticmethod
+    def _add_facet_aggregations(search) -> None:
+        search.aggs.bucket('categories', 'terms', field='category_name', size=10)
+        search.aggs.bucket('brands', 'terms', field='brand', size=10)
+        search.aggs.bucket('price_ranges', 'range', field='price', ranges=[
+            {'from': 0, 'to': 50, 'key': '0-50'},
+            {'from': 50, 'to': 100, 'key': '50-100'},
+            {'from': 100, 'to': 500, 'key': '100-500'},
+            {'from': 500, 'key': '500+'}
+        ])
+        add_es_spec_aggregations(search)
+    
+    @staticmethod
+    def _facets_from_response(response) -> Dict[str, Any]:
+        facets = {}
+        if hasattr(response.aggregations, 'categories'):
+            facets['categories'] = [
+                {'name': bucket.key, 'count': bucket.doc_count}
+                for bucket in response.aggregations.categories.buckets
+            ]
+        
+        if hasattr(response.aggregations, 'brands'):
+            facets['brands'] = [
+                {'name': bucket.key, 'count': bucket.doc_count}
+                for bucket in response.aggregations.brands.buckets
+            ]
+        
+        if hasattr(response.aggregations, 'price_ranges'):
+            facets['price_ranges'] = [
+                {'range': bucket.key, 'count': bucket.doc_count}
+                for bucket in response.aggregations.price_ranges.buckets
+            ]
+        
+        facets['specifications'] = es_spec_facets(response.aggregations)
+        return facets
+    
+    @staticmethod
+    def update_popularity_scores(scores: Dict[int, float]) -> Dict[str, int]:
+        """Partial `update` bulk of popularity_score; documents are not resent"""
+        result = {'updated': 0, 'missing': 0, 'errors': 0}
+        if not scores or not ElasticsearchService.is_available():
+            return result
+        
+        actions = (
+            {
+                '_op_type': 'update',
+                '_index': 'ecommerce_products',
+                '_id': product_id,
+                'doc': {'popularity_score': score}
             }
+            for product_id, score in scores.items()
+        )
+        with es_breaker.guard():
+            success, errors = bulk(client_for('bulk'), actions, raise_on_error=False)
+        result['updated'] = success
+        for error in errors:
+            # Products that are not indexed (inactive) have nothing to update
+            if error.get('update', {}).get('status') == 404:
+                result['missing'] += 1
+            else:
+                result['errors'] += 1
+        if success:
+            search_cache.invalidate()
+        logger.info(f"Popularity scores updated: {result}")
+        return result
     
     @staticmethod
     def get_search_suggestions(query: str, size: int = 10) -> List[str]:
-        """Get search suggestions/autocomplete"""
-        if not ElasticsearchService.is_available():
-            logger.debug("Elasticsearch not available - returning empty suggestions")
+        """Get search suggestions/autocomplete.
+
+        Served by the completion suggester on the `ecommerce_suggestions`
+        index (ordered by popularity weight), or the local prefix trie while
+        that index is unavailable. See src/search/suggestions.py.
+        """
+        if not query or len(query) < 2:
             return []
         
-        if not Search or not Q:
-            logger.warning("Search components not available for suggestions")
+        try:
+            return suggestion_index.suggest(query, size)
+        except Exception as e:
+            logger.error(f"Suggestion search failed: {str(e)}")
             return []
-            
+
+    @staticmethod
+    async def get_search_suggestions_async(query: str, size: int = 10) -> List[str]:
+        """`get_search_suggestions` for async handlers, on the pooled AsyncElasticsearch client"""
         if not query or len(query) < 2:
             return []
-        
+
         try:
-            # Get prefix matches
-            prefix_search = Search(using=es_client, index='ecommerce_products')
-            prefix_search = prefix_search.query(
-                Q('multi_match',
-                  query=query,
-                  fields=['name.autocomplete^2', 'category_name.text', 'brand.text'],
-                  type='bool_prefix')
-            )[:size]
-            
-            suggestions = set()
-            
-            # Get prefix matches
-            prefix_response = prefix_search.execute()
-            for hit in prefix_response:
-                if hasattr(hit, 'name') and hit.name:
-                    suggestions.add(hit.name)
-                if hasattr(hit, 'category_name') and hit.category_name:
-                    suggestions.add(hit.category_name)
-                if hasattr(hit, 'brand') and hit.brand:
-                    suggestions.add(hit.brand)
-            
-            return list(suggestions)[:size]
-            
+            return await suggestion_index.suggest_async(query, size)
         except Exception as e:
             logger.error(f"Suggestion search failed: {str(e)}")
             return []
@@ -1479,17 +1613,48 @@ class ElasticsearchService:
             return False
             
         try:
-            doc = ProductDocument.get(id=product_id)
-            doc.delete()
+            client = client_for('bulk')
+            with es_breaker.guard():
+                doc = ProductDocument.get(id=product_id, using=client)
+                doc.delete(using=client)
+            search_cache.invalidate()
             logger.info(f"Product {product_id} deleted from index")
             return True
         except Exception as e:
             logger.error(f"Failed to delete product {product_id}: {str(e)}")
             return False
-    
+
+    @staticmethod
+    def bulk_delete_products(product_ids: List[int]) -> Dict[str, int]:
+        """Remove many products from the index in one bulk request"""
+        if not ElasticsearchService.is_available() or not bulk:
+            logger.warning("Elasticsearch not available - skipping bulk deletion")
+            return {'success': 0, 'errors': len(product_ids), 'failed_ids': list(product_ids), 'total': len(product_ids)}
+
+        actions = (
+            {'_op_type': 'delete', '_index': 'ecommerce_products', '_id': product_id}
+            for product_id in product_ids
+        )
+        try:
+            with es_breaker.guard():
+                success, failed = bulk(client_for('bulk'), actions, raise_on_error=False)
+            search_cache.invalidate()
+            # Deleting a product that was never indexed is not an error.
+            errors = [f for f in failed if f.get('delete', {}).get('status') != 404]
+            return {'success': success, 'errors': len(errors), 'failed_ids': _bulk_item_ids(errors),
+                    'total': len(product_ids)}
+        except Exception as e:
+            logger.error(f"Bulk deletion failed: {str(e)}")
+            return {'success': 0, 'errors': len(product_ids), 'failed_ids': list(product_ids), 'total': len(product_ids)}
+
     @staticmethod
-    def reindex_all_products(db_session) -> Dict[str, int]:
-        """Reindex all products from database"""
+    def reindex_all_products(db_session=None) -> Dict[str, int]:
+        """Rebuild the index blue/green and swap the alias when done.
+
+        Runs synchronously (for scripts); the API starts the same job in the
+        background via `reindex_jobs`. The job streams rows with its own
+        sessions, so `db_session` is accepted only for backward compatibility.
+        """
         if not ElasticsearchService.is_available():
             logger.warning("Elasticsearch not available - cannot reindex products")
             return {
@@ -1499,28 +1664,8 @@ class ElasticsearchService:
                 'message': 'Elasticsearch not available. Please start Elasticsearch server.'
             }
             
-        try:
-            print("🔄 Starting reindex process...")
-            
-            # Delete existing index
-            if es_client.indices.exists(index='ecommerce_products'):
-                es_client.indices.delete(index='ecommerce_products')
-                print("🗑️ Deleted existing index")
-            
-            # Recreate index
-            ElasticsearchService.initialize_index()
-            
-            # Get all products from database
-            products = db_session.query(Product).filter(Product.is_active == True).all()
-            print(f"📊 Found {len(products)} active products to index")
-            
-            # Bulk index
-            result = ElasticsearchService.bulk_index_products(products)
-            
-            logger.info(f"Reindexing completed: {result}")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Reindexing failed: {str(e)}")
-            print(f"❌ Reindexing failed: {str(e)}")
-            return {'success': 0, 'errors': 0, 'total': 0, 'error': str(e)}
\ No newline at end of file
+        from src.search.reindex import ReindexJob
+        print("🔄 Starting reindex process...")
+        result = ReindexJob().run()
+        logger.info(f"Reindexing finished: {result}")
+        return result
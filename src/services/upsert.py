@@ -0,0 +1,21 @@
+# src/services/upsert.py
+"""INSERT ... ON CONFLICT DO UPDATE for the dialects we run on."""
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+
+def conflict_insert(db: Session) -> Optional[Callable]:
+    """The dialect's `insert` (which has on_conflict_do_update), or None.
+
+    Postgres in production, SQLite for scripts and benchmarks; callers fall
+    back to per-row ORM writes on anything else.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
@@ -0,0 +1,352 @@
+# src/services/vendor_stats.py
+"""
+vendor_daily_stats: the rollup behind GET /api/vendor/analytics/summary.
+
+One row per vendor and day holds order counts per status, revenue and units
+of the vendor's lines of orders created that day, plus (on the day it was
+taken) a snapshot of the vendor's product stock buckets. The dashboard sums
+the rows instead of scanning orders.
+
+Rows are never incremented in place. Anything that changes an order's
+status or a product's stock enqueues a vendor.stats_changed outbox event,
+and the handler recomputes just the affected (vendor, day) rows from
+order_items (indexed on vendor_id) and upserts them. A replayed or
+duplicated event therefore cannot double count. A nightly pass
+(`VendorStatsJob`) recomputes the last VENDOR_STATS_RECONCILE_DAYS days for
+every vendor to repair anything an event missed:
+
+    python -m src.services.vendor_stats              # last N days
+    python -m src.services.vendor_stats --all        # full rebuild / backfill
+"""
+import argparse
+import logging
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, distinct, func
+from sqlalchemy.orm import Session
+
+from config.database import SessionLocal
+from config.settings import settings
+from src.models.order import Order, OrderItem, OrderStatus
+from src.models.product import Product
+from src.models.vendor_stats import VendorDailyStats
+from src.services.outbox import OutboxService, EVENT_VENDOR_STATS
+from src.services.upsert import conflict_insert
+
+logger = logging.getLogger(__name__)
+
+# Same buckets the dashboard always used
+LOW_STOCK_THRESHOLD = 5
+
+STATUS_COLUMNS = {
+    OrderStatus.PENDING: "orders_pending",
+    OrderStatus.CONFIRMED: "orders_confirmed",
+    OrderStatus.PROCESSING: "orders_processing",
+    OrderStatus.SHIPPED: "orders_shipped",
+    OrderStatus.DELIVERED: "orders_delivered",
+    OrderStatus.CANCELLED: "orders_cancelled",
+    OrderStatus.RETURNED: "orders_returned",
+    OrderStatus.RETURN_REQUESTED: "orders_return_requested",
+}
+ORDER_COLUMNS = ["orders_total", *STATUS_COLUMNS.values(), "revenue", "units_sold"]
+PRODUCT_COLUMNS = ["products_total", "products_low_stock", "products_out_of_stock"]
+
+# Rows per upsert statement
+WRITE_CHUNK_SIZE = 1000
+
+VendorDays = Dict[int, Set[date]]
+
+
+def _as_date(value: Any) -> date:
+    # func.date() returns a date on Postgres and an ISO string on SQLite.
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _zero_row(vendor_id: int, day: date) -> Dict[str, Any]:
+    row = {"vendor_id": vendor_id, "stat_date": day}
+    row.update({column: 0 for column in ORDER_COLUMNS})
+    return row
+
+
+class VendorStatsService:
+
+    # ------------------------------------------------------------------
+    # Change tracking
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def mark_orders(db: Session, order_ids: Iterable[int]) -> None:
+        """Queue a refresh of the rows these orders count towards (in the caller's transaction)"""
+        ids = sorted(set(order_ids))
+        if ids:
+            OutboxService.enqueue(db, EVENT_VENDOR_STATS, {"order_ids": ids})
+
+    @staticmethod
+    def mark_products(db: Session, product_ids: Iterable[int]) -> None:
+        """Queue a refresh of the owning vendors' stock snapshot"""
+        ids = sorted(set(product_ids))
+        if ids:
+            OutboxService.enqueue(db, EVENT_VENDOR_STATS, {"product_ids": ids})
+
+    # ------------------------------------------------------------------
+    # Recomputing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _order_rows(
+        db: Session,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        vendor_ids: Optional[Iterable[int]] = None,
+    ) -> Dict[Tuple[int, date], Dict[str, Any]]:
+        """Order columns per (vendor, day) for days in [start, end), from order_items"""
+        day = func.date(Order.created_at)
+        not_cancelled = Order.order_status != OrderStatus.CANCELLED
+        query = db.query(
+            OrderItem.vendor_id,
+            day,
+            func.count(distinct(Order.order_id)),
+            *[func.count(distinct(case((Order.order_status == status, Order.order_id))))
+              for status in STATUS_COLUMNS],
+            func.coalesce(func.sum(case((not_cancelled, OrderItem.total_price), else_=0)), 0),
+            func.coalesce(func.sum(case((not_cancelled, OrderItem.quantity), else_=0)), 0),
+        ).join(Order, Order.order_id == OrderItem.order_id)
+        if vendor_ids is not None:
+            query = query.filter(OrderItem.vendor_id.in_(sorted(set(vendor_ids))))
+        else:
+            query = query.filter(OrderItem.vendor_id.isnot(None))
+        if start is not None:
+            query = query.filter(Order.created_at >= datetime.combine(start, dt_time.min))
+        if end is not None:
+            query = query.filter(Order.created_at < datetime.combine(end, dt_time.min))
+
+        rows = {}
+        for vendor_id, stat_day, *values in query.group_by(OrderItem.vendor_id, day):
+            stat_day = _as_date(stat_day)
+            row = {"vendor_id": vendor_id, "stat_date": stat_day}
+            row.update(zip(ORDER_COLUMNS, values))
+            row["revenue"] = float(row["revenue"] or 0)
+            row["units_sold"] = int(row["units_sold"] or 0)
+            rows[(vendor_id, stat_day)] = row
+        return rows
+
+    @staticmethod
+    def _upsert(db: Session, rows: List[Dict[str, Any]], columns: List[str]) -> None:
+        """INSERT ... ON CONFLICT (vendor_id, stat_date) DO UPDATE of `columns`"""
+        if not rows:
+            return
+        insert = conflict_insert(db)
+        if insert is None:
+            for row in rows:
+                db.merge(VendorDailyStats(**row))
+            return
+
+        now = datetime.utcnow()
+        stmt = insert(VendorDailyStats.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["vendor_id", "stat_date"],
+            set_={**{column: stmt.excluded[column] for column in columns}, "updated_at": now},
+        )
+        rows = [{**row, "updated_at": now} for row in rows]
+        for start in range(0, len(rows), WRITE_CHUNK_SIZE):
+            db.execute(stmt, rows[start:start + WRITE_CHUNK_SIZE])
+
+    @staticmethod
+    def refresh_order_days(db: Session, vendor_days: VendorDays) -> int:
+        """Recompute the order columns of these (vendor, day) rows; does not commit"""
+        vendor_days = {vendor_id: days for vendor_id, days in vendor_days.items() if days}
+        if not vendor_days:
+            return 0
+        all_days = set().union(*vendor_days.values())
+        computed = VendorStatsService._order_rows(
+            db, min(all_days), max(all_days) + timedelta(days=1), vendor_ids=vendor_days
+        )
+        rows = [
+            computed.get((vendor_id, day)) or _zero_row(vendor_id, day)
+            for vendor_id, days in sorted(vendor_days.items())
+            for day in sorted(days)
+        ]
+        VendorStatsService._upsert(db, rows, ORDER_COLUMNS)
+        return len(rows)
+
+    @staticmethod
+    def refresh_products(db: Session, vendor_ids: Optional[Iterable[int]] = None) -> int:
+        """Write today's stock snapshot for these vendors (all when None); does not commit"""
+        stock = Product.stock_quantity
+        query = db.query(
+            Product.vendor_id,
+            func.count(Product.product_id),
+            func.sum(case((and_(stock > 0, stock <= LOW_STOCK_THRESHOLD), 1), else_=0)),
+            func.sum(case((stock == 0, 1), else_=0)),
+        )
+        if vendor_ids is not None:
+            vendor_ids = sorted(set(vendor_ids))
+            if not vendor_ids:
+                return 0
+            query = query.filter(Product.vendor_id.in_(vendor_ids))
+        else:
+            query = query.filter(Product.vendor_id.isnot(None))
+
+        today = date.today()
+        counts = {vendor_id: (total, low, out) for vendor_id, total, low, out in query.group_by(Product.vendor_id)}
+        rows = []
+        for vendor_id in (vendor_ids if vendor_ids is not None else sorted(counts)):
+            total, low, out = counts.get(vendor_id, (0, 0, 0))
+            row = _zero_row(vendor_id, today)
+            row.update(products_total=int(total or 0), products_low_stock=int(low or 0),
+                       products_out_of_stock=int(out or 0))
+            rows.append(row)
+        VendorStatsService._upsert(db, rows, PRODUCT_COLUMNS)
+        return len(rows)
+
+    @staticmethod
+    def refresh_for(db: Session, order_ids: Iterable[int] = (), product_ids: Iterable[int] = ()) -> None:
+        """Refresh what these orders and products count towards; does not commit"""
+        order_ids = sorted(set(order_ids))
+        product_ids = sorted(set(product_ids))
+        if order_ids:
+            vendor_days: VendorDays = {}
+            day = func.date(Order.created_at)
+            pairs = db.query(OrderItem.vendor_id, day).join(
+                Order, Order.order_id == OrderItem.order_id
+            ).filter(
+                OrderItem.order_id.in_(order_ids),
+                OrderItem.vendor_id.isnot(None)
+            ).distinct()
+            for vendor_id, stat_day in pairs:
+                vendor_days.setdefault(vendor_id, set()).add(_as_date(stat_day))
+            VendorStatsService.refresh_order_days(db, vendor_days)
+        if product_ids:
+            vendor_ids = [vendor_id for (vendor_id,) in db.query(Product.vendor_id).filter(
+                Product.product_id.in_(product_ids),
+                Product.vendor_id.isnot(None)
+            ).distinct()]
+            VendorStatsService.refresh_products(db, vendor_ids)
+
+    @staticmethod
+    def reconcile(db: Session, days: Optional[int] = None) -> Dict[str, int]:
+        """Recompute every vendor's rows for the last `days` days (all history when None) and commit"""
+        start = date.today() - timedelta(days=days - 1) if days else None
+        computed = VendorStatsService._order_rows(db, start)
+
+        # Rows whose orders have gone (or moved vendor) are zeroed, not left stale
+        stale = db.query(VendorDailyStats.vendor_id, VendorDailyStats.stat_date).filter(
+            VendorDailyStats.orders_total > 0
+        )
+        if start is not None:
+            stale = stale.filter(VendorDailyStats.stat_date >= start)
+        zeroed = [
+            _zero_row(vendor_id, stat_date) for vendor_id, stat_date in stale
+            if (vendor_id, stat_date) not in computed
+        ]
+
+        VendorStatsService._upsert(db, list(computed.values()) + zeroed, ORDER_COLUMNS)
+        products = VendorStatsService.refresh_products(db)
+        db.commit()
+        return {"order_rows": len(computed), "zeroed": len(zeroed), "product_rows": products}
+
+
+class VendorStatsJob:
+    """Nightly reconcile of vendor_daily_stats"""
+
+    def __init__(self, reconcile_hour: int = 2, reconcile_days: int = 7):
+        self.reconcile_hour = reconcile_hour % 24
+        self.reconcile_days = max(1, reconcile_days)
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats: Dict[str, Any] = {
+            "runs": 0,
+            "last_run_at": None,
+            "last_run_ms": 0.0,
+            "last_result": None,
+            "last_error": None,
+        }
+
+    def run_once(self, db: Optional[Session] = None, days: Optional[int] = None, full: bool = False) -> Dict[str, int]:
+        """Reconcile the last `days` days (default reconcile_days), or all history when `full`"""
+        days = None if full else (days or self.reconcile_days)
+        with self._run_lock:
+            started = time.perf_counter()
+            own_session = db is None
+            if own_session:
+                db = SessionLocal()
+            try:
+                result = VendorStatsService.reconcile(db, days)
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                if own_session:
+                    db.close()
+
+            self._stats["runs"] += 1
+            self._stats["last_run_at"] = time.time()
+            self._stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self._stats["last_result"] = result
+            logger.info(f"Vendor stats reconciled ({days or 'all'} days): {result}")
+            return result
+
+    def _seconds_until_next_run(self) -> float:
+        now = datetime.now()
+        next_run = now.replace(hour=self.reconcile_hour, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="vendor-stats", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._seconds_until_next_run()):
+            try:
+                self.run_once()
+            except Exception as e:
+                self._stats["last_error"] = str(e)
+                logger.error(f"Vendor stats reconcile failed: {str(e)}")
+
+    def metrics(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["reconcile_hour"] = self.reconcile_hour
+        stats["reconcile_days"] = self.reconcile_days
+        return stats
+
+
+vendor_stats_job = VendorStatsJob(
+    reconcile_hour=settings.vendor_stats_reconcile_hour,
+    reconcile_days=settings.vendor_stats_reconcile_days,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Recompute vendor_daily_stats")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--days", type=int, default=settings.vendor_stats_reconcile_days,
+                       help="recompute this many days back, including today")
+    group.add_argument("--all", action="store_true", help="recompute all history (backfill)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    result = vendor_stats_job.run_once(days=max(1, args.days), full=args.all)
+    print(f"[vendor-stats] {result}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())